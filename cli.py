@@ -4,6 +4,11 @@ import json
 from pathlib import Path
 
 from .orchestrator import ToolStorePy
+from .search.selection import DEFAULT_REPO_SLACK
+from .search.profiles import DEFAULT_PROFILE, SEARCH_PROFILES
+
+# Hand-labelled eval queries shipped with the repo
+EVAL_QUERIES_FILE = Path(__file__).parent / "testing" / "eval_set" / "queries.json"
 
 
 def main():
@@ -31,12 +36,14 @@ def main():
 
     build_parser.add_argument(
         "--index",
-        help="Name of built-in tool index"
+        action="append",
+        help="Name of built-in tool index (repeat to search several indexes)"
     )
 
     build_parser.add_argument(
         "--index-url",
-        help="Direct URL to downloadable vector index archive"
+        action="append",
+        help="Direct URL to downloadable vector index archive (repeatable)"
     )
 
     build_parser.add_argument(
@@ -51,6 +58,149 @@ def main():
         help="Install requirements.txt from cloned repositories"
     )
 
+    build_parser.add_argument(
+        "--profile",
+        choices=list(SEARCH_PROFILES),
+        default=DEFAULT_PROFILE,
+        help="Search profile: retrieval depth, rerank depth, HNSW breadth and models; "
+             f"see `toolstorepy profiles` (default: {DEFAULT_PROFILE})"
+    )
+
+    build_parser.add_argument(
+        "--search-cache-mb",
+        type=int,
+        default=256,
+        help="Size budget for the on-disk search cache in MB, 0 disables it (default: 256)"
+    )
+
+    build_parser.add_argument(
+        "--search-backend",
+        choices=["chroma", "numpy", "sharded", "int8", "pq"],
+        default="chroma",
+        help="Retrieval engine: Chroma HNSW, in-process NumPy exact search, "
+             "lazily loaded shards, or int8 / product-quantised codes (default: chroma)"
+    )
+
+    build_parser.add_argument(
+        "--shard-cache",
+        type=int,
+        default=4,
+        help="Maximum shards held in memory with --search-backend sharded (default: 4)"
+    )
+
+    build_parser.add_argument(
+        "--inference-backend",
+        choices=["torch", "onnx-int8"],
+        default="torch",
+        help="Model runtime: PyTorch fp32 or dynamically quantised ONNX int8 (default: torch)"
+    )
+
+    build_parser.add_argument(
+        "--rerank-margin",
+        type=float,
+        default=None,
+        help="Skip reranking when the top dense hit leads by at least this distance "
+             "(calibrate with testing/calibrate_rerank_gate.py)"
+    )
+
+    build_parser.add_argument(
+        "--cascade-model",
+        default=None,
+        help="Small cross-encoder that pre-scores all candidates before the full reranker "
+             "(e.g. cross-encoder/ms-marco-TinyBERT-L-2-v2)"
+    )
+
+    build_parser.add_argument(
+        "--cascade-depth",
+        type=int,
+        default=3,
+        help="Candidates per query passed from the cascade model to the full reranker (default: 3)"
+    )
+
+    build_parser.add_argument(
+        "--hybrid",
+        action="store_true",
+        help="Fuse a BM25 lexical index with dense retrieval (reciprocal-rank fusion)"
+    )
+
+    build_parser.add_argument(
+        "--hybrid-depth",
+        type=int,
+        default=None,
+        help="Fused candidates per query passed to the reranker with --hybrid (default: 10)"
+    )
+
+    build_parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=0,
+        help="Encoder worker processes for large query batches, 0 encodes in-process (default: 0)"
+    )
+
+    build_parser.add_argument(
+        "--encode-threads",
+        type=int,
+        default=1,
+        help="Intra-op threads per encoder worker with --encode-workers (default: 1)"
+    )
+
+    build_parser.add_argument(
+        "--rerank-repos",
+        type=int,
+        default=None,
+        help="Rerank budget in distinct repos: keep the best chunk per git link and "
+             "over-fetch until this many repos are found"
+    )
+
+    build_parser.add_argument(
+        "--rerank-mode",
+        choices=["cross", "maxsim"],
+        default="cross",
+        help="Reranker: joint cross-encoder, or late-interaction MaxSim over precomputed "
+             "document token embeddings (CPU-friendly) (default: cross)"
+    )
+
+    build_parser.add_argument(
+        "--maxsim-model",
+        default=None,
+        help="Sentence-transformers model for --rerank-mode maxsim (default: the retrieval encoder)"
+    )
+
+    build_parser.add_argument(
+        "--minimize-repos",
+        action="store_true",
+        help="Pick the smallest set of repos that covers every query within --repo-slack "
+             "of its best score"
+    )
+
+    build_parser.add_argument(
+        "--repo-slack",
+        type=float,
+        default=DEFAULT_REPO_SLACK,
+        help=f"Rerank score a query may give up for a shared repo with --minimize-repos "
+             f"(default: {DEFAULT_REPO_SLACK})"
+    )
+
+    build_parser.add_argument(
+        "--pretokenized",
+        action="store_true",
+        help="Rerank from pre-tokenised index documents (built once per cross-encoder)"
+    )
+
+    build_parser.add_argument(
+        "--collapse-threshold",
+        type=float,
+        default=None,
+        help="Search near-duplicate queries once when their embeddings reach this cosine "
+             "similarity (e.g. 0.95); exact repeats are always folded"
+    )
+
+    build_parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always search in-process, even if a search daemon is running"
+    )
+
     build_parser.add_argument(
         "--force-refresh",
         action="store_true",
@@ -91,6 +241,196 @@ def main():
     cache_subparsers.add_parser("list",  help="List all cached repos")
     cache_subparsers.add_parser("clear", help="Clear all cached repos")
 
+    # --------------------------------------------------
+    # INDEX COMMAND
+    # --------------------------------------------------
+
+    index_parser = subparsers.add_parser(
+        "index",
+        help="Prepare downloaded tool indexes"
+    )
+    index_subparsers = index_parser.add_subparsers(dest="index_command")
+
+    shard_parser = index_subparsers.add_parser(
+        "shard",
+        help="Split an extracted index into shards for --search-backend sharded"
+    )
+    shard_parser.add_argument(
+        "--index-dir",
+        required=True,
+        help="Path to an extracted index directory (contains chroma.sqlite3)"
+    )
+    shard_parser.add_argument(
+        "--shards",
+        type=int,
+        required=True,
+        help="Number of shards to create"
+    )
+
+    quantize_parser = index_subparsers.add_parser(
+        "quantize",
+        help="Build int8 / product-quantised codes and report recall against float search"
+    )
+    quantize_parser.add_argument(
+        "--index-dir",
+        required=True,
+        help="Path to an extracted index directory (contains chroma.sqlite3)"
+    )
+    quantize_parser.add_argument(
+        "--scheme",
+        choices=["int8", "pq", "all"],
+        default="all",
+        help="Code format to build (default: all)"
+    )
+    quantize_parser.add_argument(
+        "--top-k",
+        type=int,
+        default=10,
+        help="k used for the recall@k comparison (default: 10)"
+    )
+    quantize_parser.add_argument(
+        "--queries",
+        default=str(EVAL_QUERIES_FILE),
+        help="Queries to measure recall with, a JSON list of {\"query\"} or "
+             "{\"tool_description\"} items (default: testing/eval_set/queries.json)"
+    )
+    quantize_parser.add_argument(
+        "--encoder-model",
+        default="all-MiniLM-L6-v2",
+        help="Encoder the index is searched with (default: all-MiniLM-L6-v2)"
+    )
+
+    bm25_parser = index_subparsers.add_parser(
+        "bm25",
+        help="Build or incrementally update the BM25 index used by --hybrid"
+    )
+    bm25_parser.add_argument(
+        "--index-dir",
+        required=True,
+        help="Path to an extracted index directory (contains chroma.sqlite3)"
+    )
+
+    tokenize_parser = index_subparsers.add_parser(
+        "tokenize",
+        help="Pre-tokenise index documents for a cross-encoder (used by --pretokenized)"
+    )
+    tokenize_parser.add_argument(
+        "--index-dir",
+        required=True,
+        help="Path to an extracted index directory (contains chroma.sqlite3)"
+    )
+    tokenize_parser.add_argument(
+        "--model",
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        help="Cross-encoder whose tokenizer to use (default: cross-encoder/ms-marco-MiniLM-L-6-v2)"
+    )
+
+    late_parser = index_subparsers.add_parser(
+        "late",
+        help="Precompute per-token document embeddings for --rerank-mode maxsim"
+    )
+    late_parser.add_argument(
+        "--index-dir",
+        required=True,
+        help="Path to an extracted index directory (contains chroma.sqlite3)"
+    )
+    late_parser.add_argument(
+        "--model",
+        default="all-MiniLM-L6-v2",
+        help="Sentence-transformers model to embed tokens with (default: all-MiniLM-L6-v2)"
+    )
+
+    tier_parser = index_subparsers.add_parser(
+        "tier",
+        help="Add an embedding tier (same records, another encoder) used by search profiles"
+    )
+    tier_parser.add_argument(
+        "--index-dir",
+        required=True,
+        help="Path to an extracted index directory (contains chroma.sqlite3)"
+    )
+    tier_parser.add_argument(
+        "--tier",
+        default="fast",
+        help="Tier name, as referenced by a search profile (default: fast)"
+    )
+    tier_parser.add_argument(
+        "--encoder-model",
+        default="paraphrase-MiniLM-L3-v2",
+        help="Encoder to embed the tier with (default: paraphrase-MiniLM-L3-v2)"
+    )
+
+    # --------------------------------------------------
+    # PROFILES COMMAND
+    # --------------------------------------------------
+
+    profiles_parser = subparsers.add_parser(
+        "profiles",
+        help="List search profiles with their measured recall"
+    )
+    profiles_parser.add_argument(
+        "--workspace",
+        default="toolstorepy_workspace",
+        help="Workspace holding measurements from testing/eval_profiles.py "
+             "(default: toolstorepy_workspace)"
+    )
+
+    # --------------------------------------------------
+    # QUERIES COMMAND
+    # --------------------------------------------------
+
+    queries_parser = subparsers.add_parser(
+        "queries",
+        help="Prepare query sets"
+    )
+    queries_subparsers = queries_parser.add_subparsers(dest="queries_command")
+
+    compile_parser = queries_subparsers.add_parser(
+        "compile",
+        help="Embed a queries.json into a sidecar so builds skip the encoder"
+    )
+    compile_parser.add_argument(
+        "--queries",
+        required=True,
+        help="Path to queries.json"
+    )
+    compile_parser.add_argument(
+        "--encoder-model",
+        default="all-MiniLM-L6-v2",
+        help="Encoder the index is searched with (default: all-MiniLM-L6-v2)"
+    )
+    compile_parser.add_argument(
+        "--inference-backend",
+        choices=["torch", "onnx-int8"],
+        default="torch",
+        help="Model runtime, must match the build's --inference-backend (default: torch)"
+    )
+
+    # --------------------------------------------------
+    # SERVE-SEARCH COMMAND
+    # --------------------------------------------------
+
+    serve_parser = subparsers.add_parser(
+        "serve-search",
+        help="Run a search daemon that keeps models and indexes warm for later builds"
+    )
+    serve_parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to bind (default: 127.0.0.1)"
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Port to bind, 0 picks a free one (default: 8765)"
+    )
+    serve_parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Enable verbose logging"
+    )
+
     # --------------------------------------------------
     # PARSE
     # --------------------------------------------------
@@ -104,17 +444,33 @@ def main():
     if args.command == "build":
 
         if not args.index and not args.index_url:
-            print("Error: You must provide either --index or --index-url.")
-            sys.exit(1)
-
-        if args.index and args.index_url:
-            print("Error: Provide either --index or --index-url, not both.")
+            print("Error: You must provide at least one --index or --index-url.")
             sys.exit(1)
 
         try:
             toolstore = ToolStorePy(
                 workspace=args.workspace,
+                profile=args.profile,
                 install_requirements=args.install_requirements,
+                search_cache_mb=args.search_cache_mb,
+                search_backend=args.search_backend,
+                shard_cache=args.shard_cache,
+                inference_backend=args.inference_backend,
+                rerank_margin=args.rerank_margin,
+                cascade_model=args.cascade_model,
+                cascade_depth=args.cascade_depth,
+                rerank_mode=args.rerank_mode,
+                maxsim_model=args.maxsim_model,
+                collapse_threshold=args.collapse_threshold,
+                hybrid=args.hybrid,
+                hybrid_depth=args.hybrid_depth,
+                pretokenized=args.pretokenized,
+                rerank_repos=args.rerank_repos,
+                encode_workers=args.encode_workers,
+                encode_threads=args.encode_threads,
+                minimize_repos=args.minimize_repos,
+                repo_slack=args.repo_slack,
+                use_daemon=not args.no_daemon,
                 verbose=args.verbose,
             )
 
@@ -163,5 +519,160 @@ def main():
         else:
             cache_parser.print_help()
 
+    # --------------------------------------------------
+    # HANDLE INDEX
+    # --------------------------------------------------
+
+    elif args.command == "index":
+
+        if args.index_command == "shard":
+            from .search.shards import build_shards
+
+            out_dir = build_shards(Path(args.index_dir), args.shards)
+            print(f"Wrote {args.shards} shard(s) → {out_dir}")
+
+        elif args.index_command == "quantize":
+            from .search.models import registry
+            from .search.quantize import compare_recall
+
+            with open(args.queries, encoding="utf-8") as f:
+                data = json.load(f)
+            queries = [item.get("query") or item["tool_description"] for item in data]
+            embeddings = registry.encoder(args.encoder_model).encode(queries)
+
+            schemes = ("int8", "pq") if args.scheme == "all" else (args.scheme,)
+            report = compare_recall(Path(args.index_dir), embeddings, k=args.top_k, schemes=schemes)
+
+            print(f"{'format':<15}  {'recall@' + str(args.top_k):>10}  {'bytes/vec':>10}  {'ms/query':>10}")
+            for row in report:
+                print(
+                    f"{row['format']:<15}  {row['recall_at_k']:>10}  "
+                    f"{row['bytes_per_vector']:>10}  {row['ms_per_query']:>10}"
+                )
+
+        elif args.index_command == "bm25":
+            from .search.backends import open_backend
+            from .search.cache import index_version
+            from .search.lexical import LexicalIndex, lexical_dir
+            from .search.records import ToolRecords
+
+            index_dir = Path(args.index_dir)
+            records = ToolRecords.load(index_dir, open_backend("chroma", index_dir))
+            stats = LexicalIndex.update(
+                lexical_dir(index_dir), records.iter_documents(), version=index_version(index_dir),
+            )
+            print(
+                f"BM25 index → {lexical_dir(index_dir)}  "
+                f"(+{stats['added']} / -{stats['removed']} / ={stats['unchanged']})"
+            )
+
+        elif args.index_command == "tokenize":
+            from .search.backends import open_backend
+            from .search.doctokens import DocumentTokens
+            from .search.models import registry
+            from .search.records import ToolRecords
+
+            index_dir = Path(args.index_dir)
+            records = ToolRecords.load(index_dir, open_backend("chroma", index_dir))
+            tokens = DocumentTokens.open(
+                index_dir, args.model, lambda: registry.cross_encoder(args.model),
+                records.iter_documents(),
+            )
+            print(
+                f"Document tokens → {tokens.directory}  "
+                f"({tokens.manifest['rows']:,} docs, ≤{tokens.manifest['max_tokens']} tokens each)"
+            )
+
+        elif args.index_command == "late":
+            from .search.backends import open_backend
+            from .search.late_interaction import DocumentTokenEmbeddings
+            from .search.models import registry
+            from .search.records import ToolRecords
+
+            index_dir = Path(args.index_dir)
+            records = ToolRecords.load(index_dir, open_backend("chroma", index_dir))
+            table = DocumentTokenEmbeddings.open(
+                index_dir, args.model, lambda: registry.encoder(args.model),
+                records.iter_documents(),
+            )
+            print(
+                f"Token embeddings → {table.directory}  "
+                f"({table.manifest['rows']:,} docs, {table.manifest['tokens']:,} tokens × "
+                f"{table.manifest['dim']} dims, int8)"
+            )
+
+        elif args.index_command == "tier":
+            from .search.profiles import build_tier, tier_collection
+
+            written = build_tier(Path(args.index_dir), args.tier, args.encoder_model)
+            print(
+                f"Embedding tier '{args.tier}' → collection {tier_collection(args.tier)}  "
+                f"({written:,} records, {args.encoder_model})"
+            )
+
+        else:
+            index_parser.print_help()
+
+    # --------------------------------------------------
+    # HANDLE PROFILES
+    # --------------------------------------------------
+
+    elif args.command == "profiles":
+        from .search.profiles import load_measurements
+
+        measured = load_measurements(Path(args.workspace))
+
+        print(f"{'profile':<10}  {'top_k':>5}  {'rerank':>6}  {'ef':>5}  {'tier':<6}  "
+              f"{'recall@k':>8}  {'top-1':>7}  {'ms/query':>8}")
+        for name, profile in SEARCH_PROFILES.items():
+            m = measured.get(name, {})
+            rerank = "all" if profile.rerank_depth is None else profile.rerank_depth
+            print(
+                f"{name:<10}  {profile.top_k:>5}  {rerank:>6}  {profile.search_ef or '-':>5}  "
+                f"{profile.tier or '-':<6}  {m.get('recall_at_k', '-'):>8}  "
+                f"{m.get('accuracy_pct', '-'):>7}  {m.get('ms_per_query', '-'):>8}"
+            )
+            print(f"{'':<10}  {profile.description}")
+        if not measured:
+            print("\nNo measurements yet: run testing/eval_profiles.py.")
+
+    # --------------------------------------------------
+    # HANDLE QUERIES
+    # --------------------------------------------------
+
+    elif args.command == "queries":
+
+        if args.queries_command == "compile":
+            from .search.query_vectors import compile_queries
+
+            with open(args.queries, encoding="utf-8") as f:
+                data = json.load(f)
+            queries = [item["tool_description"] for item in data]
+
+            path = compile_queries(
+                args.queries, queries, args.encoder_model, args.inference_backend,
+            )
+            print(f"Query embeddings → {path}  ({len(queries):,} queries)")
+
+        else:
+            queries_parser.print_help()
+
+    # --------------------------------------------------
+    # HANDLE SERVE-SEARCH
+    # --------------------------------------------------
+
+    elif args.command == "serve-search":
+        import logging
+        from .config import configure_external_logging
+        from .search.daemon import SearchDaemon
+
+        logging.basicConfig(
+            level=logging.DEBUG if args.verbose else logging.INFO,
+            format="%(levelname)s | %(message)s",
+        )
+        configure_external_logging(verbose=args.verbose)
+
+        SearchDaemon(host=args.host, port=args.port).serve_forever()
+
     else:
         parser.print_help()
\ No newline at end of file
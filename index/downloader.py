@@ -1,22 +1,88 @@
+import json
+import time
 import shutil
+import logging
 import zipfile
 import tarfile
 import hashlib
+import threading
 import requests
 from pathlib import Path
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.exceptions import HTTPError as TransportError
+
+logger = logging.getLogger("ToolStorePy")
+
+DOWNLOAD_WORKERS = 4                 # parallel Range segments per archive
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024   # smaller archives download in one segment
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 0.25          # chunk size adapts so each read takes about this long
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 30
+PROGRESS_INTERVAL = 2.0
+CHECKSUM_SUFFIX = ".sha256"
+
+
+class _Progress:
+    """
+    Thread-safe byte counter shared by the segments of one download.
+    """
+
+    def __init__(self, name: str, total: Optional[int], resumed: int):
+        self.name = name
+        self.total = total
+        self.resumed = resumed
+        self.done = resumed
+        self.start = time.perf_counter()
+        self._last_report = self.start
+        self._lock = threading.Lock()
+
+    def add(self, n: int):
+        with self._lock:
+            self.done += n
+            now = time.perf_counter()
+            if now - self._last_report < PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+        logger.info(f"[INDEX] {self.name}: {self._describe(now)}")
+
+    def summary(self) -> str:
+        return self._describe(time.perf_counter())
+
+    def _describe(self, now: float) -> str:
+        elapsed = max(now - self.start, 1e-9)
+        rate = (self.done - self.resumed) / elapsed / 1e6
+        size = f"{self.done / 1e6:.1f}"
+        if self.total:
+            size += f"/{self.total / 1e6:.1f} MB ({self.done / self.total:.0%})"
+        else:
+            size += " MB"
+        return f"{size} in {elapsed:.1f}s, {rate:.2f} MB/s"
 
 
 class IndexDownloader:
     """
     Handles downloading and extracting vector DB archives.
+
+    Archives are fetched in parallel HTTP Range segments when the server
+    supports them. Each segment streams into `<archive>.part<i>`, so an
+    interrupted download resumes where it stopped. The assembled archive
+    is checked before it is trusted: against a sha256 given as a URL
+    fragment (`...zip#sha256=<hex>`) or published next to it
+    (`<url>.sha256`), and by reading the archive through. The digest is
+    recorded in `<archive>.sha256`; a cached archive without one is
+    verified again rather than reused blindly.
     """
 
-    def __init__(self, index_root: Path):
+    def __init__(self, index_root: Path, workers: int = DOWNLOAD_WORKERS):
         """
         index_root: Path to workspace/index_db
         """
         self.index_root = Path(index_root)
         self.archives_dir = self.index_root / "archives"
+        self.workers = max(1, workers)
 
         self.index_root.mkdir(parents=True, exist_ok=True)
         self.archives_dir.mkdir(parents=True, exist_ok=True)
@@ -33,34 +99,304 @@ class IndexDownloader:
             Path to extracted DB directory.
         """
 
-        archive_path = self._download_archive(url, force_refresh)
-        extract_path = self._extract_archive(archive_path, force_refresh)
+        archive_path, fresh = self._download_archive(url, force_refresh)
+        extract_path = self._extract_archive(archive_path, force_refresh or fresh)
 
         return extract_path
 
+    def archive_path(self, url: str) -> Path:
+        """
+        Where the archive for url is cached.
+        """
+
+        url, _ = self._split_checksum(url)
+        return self.archives_dir / self._derive_filename(url)
+
     # ------------------------------------------------------------------
     # Internal Methods
     # ------------------------------------------------------------------
 
-    def _download_archive(self, url: str, force_refresh: bool) -> Path:
+    def _download_archive(self, url: str, force_refresh: bool) -> tuple[Path, bool]:
         """
         Download archive into archives directory.
+        Returns the archive path and whether it was (re)downloaded.
         """
 
+        url, expected = self._split_checksum(url)
         filename = self._derive_filename(url)
         archive_path = self.archives_dir / filename
 
         if archive_path.exists() and not force_refresh:
-            return archive_path
+            recorded = self._recorded_checksum(archive_path)
+            if recorded and (expected is None or recorded == expected):
+                return archive_path, False
+            try:
+                digest = self._verify(archive_path, archive_path, expected or self._published_checksum(url))
+                self._record_checksum(archive_path, digest)
+                return archive_path, False
+            except ValueError as e:
+                logger.warning(f"[INDEX] Cached {filename} failed verification ({e}); downloading again")
+
+        if force_refresh:
+            self._discard_parts(archive_path)
+        expected = expected or self._published_checksum(url)
+
+        part_path = self._fetch(url, archive_path)
+        try:
+            digest = self._verify(part_path, archive_path, expected)
+        except ValueError:
+            part_path.unlink()
+            raise
+
+        part_path.replace(archive_path)
+        self._record_checksum(archive_path, digest)
+        return archive_path, True
+
+    def _fetch(self, url: str, archive_path: Path) -> Path:
+        """
+        Download url into `<archive>.part`, resuming any segments left by
+        an earlier attempt at the same file.
+        """
+
+        size, etag, ranged = self._probe(url)
+        segments = self._plan_segments(size, ranged)
+
+        state = {"url": url, "size": size, "etag": etag, "segments": segments}
+        state_path = self._state_path(archive_path)
+        saved = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else None
+        if saved != state:
+            # Different file or layout on the server: old segments are useless
+            self._discard_parts(archive_path)
+            state_path.write_text(json.dumps(state), encoding="utf-8")
+
+        seg_paths = [self._segment_path(archive_path, i) for i in range(len(segments))]
+        resumed = sum(p.stat().st_size for p in seg_paths if p.exists()) if ranged else 0
+        progress = _Progress(archive_path.name, size, resumed)
+
+        logger.info(
+            f"[INDEX] Downloading {archive_path.name}"
+            + (f" ({size / 1e6:.1f} MB" if size else " (unknown size")
+            + f", {len(segments)} segment{'s' if len(segments) != 1 else ''}"
+            + (f", resuming at {resumed / 1e6:.1f} MB)" if resumed else ")")
+        )
+
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            futures = [
+                pool.submit(self._fetch_segment, url, path, start, end, ranged, progress)
+                for path, (start, end) in zip(seg_paths, segments)
+            ]
+            for future in futures:
+                future.result()
+
+        part_path = self._part_path(archive_path)
+        with open(part_path, "wb") as out:
+            for path in seg_paths:
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, out, MAX_CHUNK_SIZE)
+        for path in seg_paths:
+            path.unlink()
+        state_path.unlink()
+
+        logger.info(f"[INDEX] Downloaded {archive_path.name}: {progress.summary()}")
+        return part_path
+
+    def _probe(self, url: str) -> tuple[Optional[int], Optional[str], bool]:
+        """
+        (size, etag, supports ranges) from a HEAD request. Unknown values
+        fall back to a single plain streaming download.
+        """
+
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None, None, False
+
+        length = response.headers.get("Content-Length")
+        size = int(length) if length and length.isdigit() else None
+        etag = response.headers.get("ETag")
+        ranged = size is not None and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return size, etag, ranged
+
+    def _plan_segments(self, size: Optional[int], ranged: bool) -> list:
+        """
+        Inclusive (start, end) byte ranges; end is None when the size is unknown.
+        """
+
+        if size is None:
+            return [[0, None]]
+        if not ranged:
+            return [[0, size - 1]]
+
+        count = max(1, min(self.workers, size // MIN_SEGMENT_SIZE))
+        bounds = [size * i // count for i in range(count + 1)]
+        return [[bounds[i], bounds[i + 1] - 1] for i in range(count)]
+
+    def _fetch_segment(self, url, path: Path, start: int, end: Optional[int], ranged: bool, progress: _Progress):
+        """
+        Stream bytes start..end into path, appending to what is already
+        there. Retries resume from the bytes written so far when the server
+        supports ranges and restart the segment otherwise.
+        """
+
+        length = None if end is None else end - start + 1
+
+        for attempt in range(MAX_RETRIES):
+            have = path.stat().st_size if path.exists() else 0
+            if not ranged and have:
+                path.unlink()
+                # Without ranges nothing was credited as resumed, so only a
+                # retry's own partial bytes are taken back off the counter
+                if attempt:
+                    progress.add(-have)
+                have = 0
+            if length is not None and have >= length:
+                return
+
+            headers = {"Accept-Encoding": "identity"}
+            if ranged:
+                headers["Range"] = f"bytes={start + have}-{end}"
+
+            try:
+                with requests.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if ranged and response.status_code != 206:
+                        raise ValueError(f"Server ignored the Range request for {url}")
+                    with open(path, "ab") as f:
+                        self._stream(response, f, progress)
+            except (requests.RequestException, TransportError, OSError) as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                logger.warning(f"[INDEX] Segment {path.name} interrupted ({e}); retrying")
+                time.sleep(2 ** attempt)
+                continue
+
+            written = path.stat().st_size
+            if length is None or written == length:
+                return
+            logger.warning(f"[INDEX] Segment {path.name} ended early ({written:,}/{length:,} bytes); retrying")
+
+        raise OSError(f"Incomplete download of {url} after {MAX_RETRIES} attempts")
+
+    def _stream(self, response, f, progress: _Progress):
+        """
+        Copy the response body to f, growing the read size while reads
+        come back quickly and shrinking it when they stall.
+        """
+
+        chunk_size = MIN_CHUNK_SIZE
+        while True:
+            t0 = time.perf_counter()
+            data = response.raw.read(chunk_size)
+            if not data:
+                return
+            f.write(data)
+            progress.add(len(data))
+
+            elapsed = time.perf_counter() - t0
+            if elapsed < CHUNK_TARGET_SECONDS / 2:
+                chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+            elif elapsed > CHUNK_TARGET_SECONDS * 2:
+                chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
+
+    def _verify(self, path: Path, archive_path: Path, expected: Optional[str]) -> str:
+        """
+        Check the file at path against the expected sha256 (when known) and
+        read it through as archive_path's format. Returns its sha256.
+        """
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(MAX_CHUNK_SIZE), b""):
+                digest.update(block)
+        actual = digest.hexdigest()
+
+        if expected is not None and actual != expected:
+            raise ValueError(
+                f"Checksum mismatch for {archive_path.name}: "
+                f"expected {expected}, got {actual}"
+            )
+
+        try:
+            if archive_path.suffix == ".zip":
+                with zipfile.ZipFile(path, "r") as z:
+                    bad = z.testzip()
+                if bad is not None:
+                    raise ValueError(f"corrupt member {bad}")
+            elif archive_path.suffixes[-2:] == [".tar", ".gz"]:
+                with tarfile.open(path, "r:gz") as t:
+                    for _ in t:
+                        pass
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            raise ValueError(f"{archive_path.name} is not a readable archive: {e}") from e
+
+        return actual
+
+    def _published_checksum(self, url: str) -> Optional[str]:
+        """
+        sha256 published at `<url>.sha256` (sha256sum format), if any.
+        """
+
+        try:
+            response = requests.get(url + CHECKSUM_SUFFIX, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return self._parse_checksum(response.text)
+
+    def _recorded_checksum(self, archive_path: Path) -> Optional[str]:
+        path = self._checksum_path(archive_path)
+        if not path.exists():
+            return None
+        return self._parse_checksum(path.read_text(encoding="utf-8"))
+
+    def _record_checksum(self, archive_path: Path, digest: str):
+        self._checksum_path(archive_path).write_text(f"{digest}  {archive_path.name}\n", encoding="utf-8")
+
+    @staticmethod
+    def _parse_checksum(text: str) -> Optional[str]:
+        token = text.strip().split()[0].lower() if text.strip() else ""
+        if len(token) == 64 and all(c in "0123456789abcdef" for c in token):
+            return token
+        return None
+
+    @classmethod
+    def _split_checksum(cls, url: str) -> tuple[str, Optional[str]]:
+        """
+        Strip a `#sha256=<hex>` fragment from url.
+        """
+
+        url, _, fragment = url.partition("#")
+        if not fragment:
+            return url, None
+        if not fragment.startswith("sha256="):
+            raise ValueError(f"Unsupported URL fragment '#{fragment}' (expected #sha256=<hex>)")
+        expected = cls._parse_checksum(fragment[len("sha256="):])
+        if expected is None:
+            raise ValueError(f"Invalid sha256 in URL fragment: '{fragment}'")
+        return url, expected
+
+    def _discard_parts(self, archive_path: Path):
+        for path in archive_path.parent.glob(archive_path.name + ".part*"):
+            path.unlink()
+        self._checksum_path(archive_path).unlink(missing_ok=True)
+
+    @staticmethod
+    def _part_path(archive_path: Path) -> Path:
+        return archive_path.with_name(archive_path.name + ".part")
 
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+    @staticmethod
+    def _segment_path(archive_path: Path, index: int) -> Path:
+        return archive_path.with_name(f"{archive_path.name}.part{index}")
 
-        with open(archive_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    @staticmethod
+    def _state_path(archive_path: Path) -> Path:
+        return archive_path.with_name(archive_path.name + ".part.json")
 
-        return archive_path
+    @staticmethod
+    def _checksum_path(archive_path: Path) -> Path:
+        return archive_path.with_name(archive_path.name + CHECKSUM_SUFFIX)
 
     def _extract_archive(self, archive_path: Path, force_refresh: bool) -> Path:
         """
@@ -76,21 +412,28 @@ class IndexDownloader:
             else:
                 return extract_path
 
-        extract_path.mkdir(parents=True, exist_ok=True)
+        # Extract beside the target and rename, so an interrupted extraction
+        # is never mistaken for a complete index
+        tmp_path = extract_path.with_name(folder_name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True, exist_ok=True)
 
         if archive_path.suffix == ".zip":
             with zipfile.ZipFile(archive_path, "r") as z:
-                z.extractall(extract_path)
+                z.extractall(tmp_path)
 
         elif archive_path.suffixes[-2:] == [".tar", ".gz"]:
             with tarfile.open(archive_path, "r:gz") as t:
-                t.extractall(extract_path)
+                t.extractall(tmp_path)
 
         else:
+            shutil.rmtree(tmp_path)
             raise ValueError(
                 f"Unsupported archive format: {archive_path.name}"
             )
 
+        tmp_path.rename(extract_path)
         return extract_path
 
     def _derive_filename(self, url: str) -> str:
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 
 # ------------------------------------------------------------------
@@ -48,3 +48,32 @@ def resolve_index(
         return BUILTIN_INDEXES[index]
 
     return index_url
+
+
+def resolve_indexes(
+    indexes: Optional[List[str]] = None,
+    index_urls: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Resolve several built-in index names and / or direct URLs for a
+    federated build.
+
+    Rules:
+        - At least one index name or URL must be provided.
+        - Every name must exist in BUILTIN_INDEXES.
+        - Returns download URLs in the order given, names first,
+          without duplicates.
+    """
+
+    indexes = list(indexes or [])
+    index_urls = list(index_urls or [])
+
+    if not indexes and not index_urls:
+        raise ValueError(
+            "At least one index name or index URL must be provided."
+        )
+
+    urls = [resolve_index(index=name) for name in indexes]
+    urls += [resolve_index(index_url=url) for url in index_urls]
+
+    return list(dict.fromkeys(urls))
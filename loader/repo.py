@@ -61,6 +61,11 @@ class RepoLoader:
             self._install_requirements(target_path)
 
     def _derive_folder_name(self, repo_url: str) -> str:
+        return self.folder_name(repo_url)
+
+    @staticmethod
+    def folder_name(repo_url: str) -> str:
+        """Directory a repo URL is cloned into under tools_dir."""
         name = repo_url.rstrip("/").split("/")[-1]
         if name.endswith(".git"):
             name = name[:-4]
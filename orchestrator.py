@@ -1,5 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Iterable
+from typing import Optional, List, Iterable, Union
 import json
 import sys
 import subprocess
@@ -7,14 +8,22 @@ import venv
 import logging
 
 from .config import configure_external_logging
-from .index.registry import resolve_index
+from .index.registry import resolve_indexes
 from .index.downloader import IndexDownloader
 from .search.semantic import SemanticSearcher
+from .search.cache import CACHE_DIR_NAME, SearchCache
+from .search.federated import combined_index_version
+from .search.models import registry
+from .search.daemon import DaemonClient
+from .search.selection import DEFAULT_REPO_SLACK, check_score_source, minimize_repos, repo_count
+from .search.query_vectors import load_query_vectors
+from .search.profiles import DEFAULT_PROFILE, get_profile, load_measurements, profile_settings
 from .loader.repo import RepoLoader
 from .loader.cache import RepoCache
 from .builder.mcp_builder import MCPBuilder
 from .utils.env_merger import process_env_examples
 from .utils.security_scanner import (
+    scan_repo,
     scan_all_repos,
     render_report_text,
     prompt_user_for_risky_repos,
@@ -29,19 +38,64 @@ class ToolStorePy:
     def __init__(
         self,
         workspace: str = "toolstorepy_workspace",
-        encoder_model: str = "all-MiniLM-L6-v2",
-        cross_encoder_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        profile: str = DEFAULT_PROFILE,
+        encoder_model: Optional[str] = None,
+        cross_encoder_model: Optional[str] = None,
         install_requirements: bool = False,
+        search_cache_mb: int = 256,
+        search_backend: str = "chroma",
+        shard_cache: int = 4,
+        inference_backend: str = "torch",
+        rerank_margin: Optional[float] = None,
+        cascade_model: Optional[str] = None,
+        cascade_depth: int = 3,
+        rerank_mode: str = "cross",
+        maxsim_model: Optional[str] = None,
+        collapse_threshold: Optional[float] = None,
+        hybrid: bool = False,
+        hybrid_depth: Optional[int] = None,
+        pretokenized: bool = False,
+        rerank_repos: Optional[int] = None,
+        encode_workers: int = 0,
+        encode_threads: int = 1,
+        minimize_repos: bool = False,
+        repo_slack: float = DEFAULT_REPO_SLACK,
+        use_daemon: bool = True,
         verbose: bool = False,
     ):
         self.workspace = Path(workspace)
         self.index_dir = self.workspace / "index_db"
         self.tools_dir = self.workspace / "tools"
         self.output_file = self.workspace / "mcp_unified_server.py"
+        self.search_cache_dir = self.workspace / CACHE_DIR_NAME
 
+        # Explicit models override the search profile's
+        self.profile = profile
+        self.search_profile = get_profile(profile)
         self.encoder_model = encoder_model
         self.cross_encoder_model = cross_encoder_model
         self.install_requirements = install_requirements
+        self.search_cache_mb = search_cache_mb
+        self.search_backend = search_backend
+        self.shard_cache = shard_cache
+        self.inference_backend = inference_backend
+        self.rerank_margin = rerank_margin
+        self.cascade_model = cascade_model
+        self.cascade_depth = cascade_depth
+        self.rerank_mode = rerank_mode
+        self.maxsim_model = maxsim_model
+        self.collapse_threshold = collapse_threshold
+        self.hybrid = hybrid
+        self.hybrid_depth = hybrid_depth
+        self.pretokenized = pretokenized
+        self.rerank_repos = rerank_repos
+        self.encode_workers = encode_workers
+        self.encode_threads = encode_threads
+        self.minimize_repos = minimize_repos
+        self.repo_slack = repo_slack
+        if minimize_repos:
+            check_score_source(rerank_mode, self.search_profile.rerank_depth, rerank_margin)
+        self.use_daemon = use_daemon
         self.verbose = verbose
 
         self._setup_logging()
@@ -108,25 +162,48 @@ class ToolStorePy:
     def build(
         self,
         queries: str,
-        index: Optional[str] = None,
-        index_url: Optional[str] = None,
+        index: Union[str, List[str], None] = None,
+        index_url: Union[str, List[str], None] = None,
         force_refresh: bool = False,
     ) -> Path:
 
         self.logger.info("Resolving index...")
-        resolved_url = resolve_index(index=index, index_url=index_url)
+        resolved_urls = resolve_indexes(
+            indexes=[index] if isinstance(index, str) else index,
+            index_urls=[index_url] if isinstance(index_url, str) else index_url,
+        )
 
-        self.logger.info("Downloading index...")
-        downloader = IndexDownloader(self.index_dir)
-        db_path = downloader.download(resolved_url, force_refresh=force_refresh)
+        self.logger.info(f"Downloading {len(resolved_urls)} index(es)...")
+        db_paths = self._download_indexes(resolved_urls, force_refresh)
+
+        config = self._searcher_config(db_paths)
+        measured = load_measurements(self.workspace).get(self.profile)
+        self.logger.info(
+            f"Search profile '{self.profile}'"
+            + (f" (measured recall@{measured['top_k']} {measured['recall_at_k']}%)" if measured else "")
+        )
 
         self.logger.info("Loading queries...")
         query_list = self._load_queries(queries)
         if not query_list:
             raise ValueError("No queries provided.")
 
+        embeddings = load_query_vectors(
+            queries, query_list, config["encoder_model"], self.inference_backend,
+        )
+        if embeddings is not None:
+            self.logger.info("Using precomputed query embeddings.")
+
         self.logger.info("Running semantic search...")
-        matches = self._run_search(query_list, db_path)
+        matches = self._run_search(query_list, db_paths, config, embeddings)
+
+        if self.minimize_repos:
+            before = repo_count(matches)
+            matches = minimize_repos(matches, slack=self.repo_slack)
+            self.logger.info(
+                f"Repo selection: {before} → {repo_count(matches)} repo(s) "
+                f"within score slack {self.repo_slack}"
+            )
 
         valid_matches = [m for m in matches if m.get("tool_git_link")]
         if not valid_matches:
@@ -174,6 +251,14 @@ class ToolStorePy:
                 + ", ".join(skipped_repos)
             )
 
+            # Fall back to each affected query's next-best clean candidate
+            fallback_reports = self._replace_skipped_tools(
+                valid_matches, allowed_repos, skipped_repos, python_exec,
+            )
+            if fallback_reports:
+                scan_reports += fallback_reports
+                report_path.write_text(render_report_text(scan_reports), encoding="utf-8")
+
         if not allowed_repos:
             raise RuntimeError(
                 "All matched repos were skipped after security review. "
@@ -225,6 +310,78 @@ class ToolStorePy:
 
         return self.output_file
 
+    # --------------------------------------------------
+    # SECURITY FALLBACK
+    # --------------------------------------------------
+
+    def _replace_skipped_tools(
+        self,
+        matches: list,
+        allowed_repos: list,
+        skipped_repos: list,
+        python_exec: Optional[Path],
+    ) -> list:
+        """
+        Give every query whose tool was skipped its next-best candidate
+        from a repo that was not skipped, using the ranked "candidates"
+        returned by search. New repos are cloned and scanned one round at
+        a time; any the user skips in turn send their queries further
+        down the list. Extends allowed_repos / skipped_repos in place and
+        returns the scan reports of the newly cloned repos.
+        """
+        folder = RepoLoader.folder_name
+        reports = []
+
+        pending = [m for m in matches if folder(m["tool_git_link"]) in skipped_repos]
+        while pending:
+            picks = []
+            for match in pending:
+                pick = next(
+                    (
+                        c for c in match.get("candidates", [])
+                        if c.get("tool_git_link")
+                        and folder(c["tool_git_link"]) not in skipped_repos
+                    ),
+                    None,
+                )
+                if pick is None:
+                    self.logger.warning(
+                        f"No clean alternative left for query: {match['query']}"
+                    )
+                    continue
+                self.logger.info(
+                    f"↻ Replacing '{match.get('tool_name')}' with "
+                    f"'{pick.get('tool_name')}' for query: {match['query']}"
+                )
+                picks.append((match, pick))
+
+            new_links = list(dict.fromkeys(
+                pick["tool_git_link"] for _, pick in picks
+                if folder(pick["tool_git_link"]) not in allowed_repos
+            ))
+            if not new_links:
+                break
+
+            self.logger.info(f"Cloning {len(new_links)} fallback repo(s)...")
+            self._clone_repositories(new_links, python_exec)
+
+            new_reports = [scan_repo(self.tools_dir / folder(link)) for link in new_links]
+            print()
+            print(render_report_text(new_reports))
+            reports += new_reports
+
+            allowed, skipped = prompt_user_for_risky_repos(new_reports)
+            allowed_repos += allowed
+            skipped_repos += skipped
+
+            pending = [
+                {**match, "tool_name": pick.get("tool_name")}
+                for match, pick in picks
+                if folder(pick["tool_git_link"]) in skipped
+            ]
+
+        return reports
+
     # --------------------------------------------------
     # RUN PROMPT
     # --------------------------------------------------
@@ -326,6 +483,18 @@ class ToolStorePy:
 
         print()
 
+    # --------------------------------------------------
+    # MODEL LIFECYCLE
+    # --------------------------------------------------
+
+    def release_models(self):
+        """
+        Free the encoder, cross-encoder and Chroma clients shared by every
+        build in this process. They are reloaded lazily on the next build.
+        """
+        registry.release()
+        self.logger.debug("Released shared search models.")
+
     # --------------------------------------------------
     # INTERNAL HELPERS
     # --------------------------------------------------
@@ -341,13 +510,102 @@ class ToolStorePy:
         self.logger.debug(f"Loaded {len(queries)} queries.")
         return queries
 
-    def _run_search(self, queries: List[str], db_path: Path):
-        searcher = SemanticSearcher(
-            persist_dir=db_path,
-            encoder_model=self.encoder_model,
-            cross_encoder_model=self.cross_encoder_model,
+    def _download_indexes(self, urls: List[str], force_refresh: bool) -> List[Path]:
+        # An index is cached in the same place whether it is searched alone
+        # or as part of a federation
+        downloader = IndexDownloader(self.index_dir)
+
+        owners = {}
+        for url in urls:
+            name = downloader.archive_path(url).name
+            if name in owners:
+                raise ValueError(
+                    f"Indexes '{owners[name]}' and '{url}' share the archive name "
+                    f"'{name}' and would overwrite each other's cache."
+                )
+            owners[name] = url
+
+        if len(urls) == 1:
+            return [downloader.download(urls[0], force_refresh=force_refresh)]
+
+        # Federated build: indexes are fetched in parallel
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            return list(pool.map(lambda url: downloader.download(url, force_refresh=force_refresh), urls))
+
+    def _searcher_config(self, db_paths: List[Path]) -> dict:
+        """SemanticSearcher keyword arguments, JSON-safe so a daemon can receive them."""
+        persist_dirs = [str(Path(p).resolve()) for p in db_paths]
+        # An explicit encoder only matches the index's main collection
+        settings = profile_settings(
+            self.search_profile, persist_dirs, self.search_backend,
+            use_tier=self.encoder_model is None,
         )
-        return searcher.batch_search(queries)
+
+        backend_options = settings["backend_options"]
+        if self.search_backend == "sharded":
+            backend_options["max_loaded_shards"] = self.shard_cache
+
+        return {
+            "persist_dir":         persist_dirs[0] if len(persist_dirs) == 1 else persist_dirs,
+            "encoder_model":       self.encoder_model or settings["encoder_model"],
+            "cross_encoder_model": self.cross_encoder_model or settings["cross_encoder_model"],
+            "top_k":               settings["top_k"],
+            "rerank_depth":        settings["rerank_depth"],
+            "backend":             self.search_backend,
+            "backend_options":     backend_options,
+            "inference_backend":   self.inference_backend,
+            "rerank_margin":       self.rerank_margin,
+            "cascade_model":       self.cascade_model,
+            "cascade_depth":       self.cascade_depth,
+            "rerank_mode":         self.rerank_mode,
+            "maxsim_model":        self.maxsim_model,
+            "collapse_threshold":  self.collapse_threshold,
+            "hybrid":              self.hybrid,
+            "hybrid_depth":        self.hybrid_depth,
+            "pretokenized":        self.pretokenized,
+            "rerank_repos":        self.rerank_repos,
+            "encode_workers":      self.encode_workers,
+            "encode_threads":      self.encode_threads,
+        }
+
+    def _run_search(self, queries: List[str], db_paths: List[Path], config: dict, embeddings=None):
+        # The daemon's encoder is already warm, so precomputed embeddings
+        # only matter in-process
+        if self.use_daemon:
+            client = DaemonClient.discover()
+            if client is not None:
+                self.logger.info(f"Using search daemon at {client.base_url}")
+                try:
+                    return client.batch_search(
+                        {
+                            **config,
+                            "cache_dir": str(self.search_cache_dir.resolve()),
+                            "cache_mb":  self.search_cache_mb,
+                        },
+                        queries,
+                    )
+                except (OSError, RuntimeError) as e:
+                    self.logger.warning(f"Search daemon failed ({e}); searching in-process.")
+
+        cache = None
+        if self.search_cache_mb > 0:
+            cache = SearchCache(
+                self.search_cache_dir,
+                index_version=combined_index_version(db_paths),
+                max_bytes=self.search_cache_mb * 1024 * 1024,
+            )
+
+        searcher = None
+        try:
+            searcher = SemanticSearcher(cache=cache, **config)
+            matches = searcher.batch_search(queries, embeddings=embeddings)
+            self.logger.debug(f"Search timings: {searcher.timing_report()}")
+            return matches
+        finally:
+            if searcher is not None:
+                searcher.close()
+            if cache is not None:
+                cache.close()
 
     def _clone_repositories(self, repo_urls: Iterable[str], python_exec: Optional[Path]):
         repo_urls = list(repo_urls)
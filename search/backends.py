@@ -0,0 +1,169 @@
+"""
+search/backends.py
+
+Pluggable retrieval backends for SemanticSearcher.
+
+Every backend answers `query(query_embeddings, n_results)` with the same
+nested-list shape Chroma uses ({"ids": [[...]], "distances": [[...]]}, one
+inner list per query), so the searcher does not care which engine produced
+the candidates. Document text and tool fields are resolved separately
+through search/records.py: backends that store record tables expose them
+with `record_tables()`, and Chroma serves `iter_records()` and
+`documents(ids)` for candidates.
+
+  chroma   — PersistentClient over the extracted index (default)
+  numpy    — exact search over a memory-mapped float32 export of the collection
+  sharded  — lazily loaded shards searched in parallel (see search/shards.py)
+  int8, pq — compressed codes with a float re-score (see search/quantize.py)
+"""
+
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from .cache import index_version
+from .models import registry
+from .matrix import (
+    COLLECTION_NAME,
+    MatrixShard,
+    hits_to_results,
+    iter_collection,
+    normalize,
+    open_collection,
+    read_manifest,
+    write_matrix,
+)
+from .quantize import Int8Backend, PQBackend
+from .records import RECORDS_DIR, RecordTable
+from .shards import ShardedBackend
+
+
+NUMPY_EXPORT_DIR = "numpy_index"
+
+
+class ChromaBackend:
+    """
+    Approximate nearest-neighbour search through Chroma's HNSW index.
+    """
+
+    name = "chroma"
+
+    def __init__(self, persist_dir: Path, collection: str = COLLECTION_NAME, search_ef=None):
+        self.persist_dir = Path(persist_dir)
+        self.client = registry.chroma_client(self.persist_dir)
+        if collection == COLLECTION_NAME:
+            self.collection = self.client.get_or_create_collection(COLLECTION_NAME)
+        else:
+            # Embedding tiers must already exist (see search/profiles.py)
+            self.collection = self.client.get_collection(collection)
+        # Chroma only exposes ef_search as a setting stored on the collection,
+        # and the downloaded index must not be modified. HNSW searches with
+        # max(ef_search, k), so asking for search_ef neighbours and keeping
+        # the first n_results widens the search per query. A value below the
+        # index's own ef_search has no effect.
+        self.search_ef = search_ef
+
+    def query(self, query_embeddings, n_results: int) -> dict:
+        fetch = max(n_results, self.search_ef or 0)
+        results = self.collection.query(
+            query_embeddings=[np.asarray(e).tolist() for e in query_embeddings],
+            n_results=fetch,
+            include=["distances"],
+        )
+        if fetch > n_results:
+            results = {
+                "ids":       [ids[:n_results] for ids in results["ids"]],
+                "distances": [d[:n_results] for d in results["distances"]],
+            }
+        return results
+
+    def iter_records(self) -> Iterable[tuple]:
+        for page in iter_collection(self.collection, include=["documents", "metadatas"]):
+            metadatas = page.get("metadatas") or [None] * len(page["ids"])
+            yield from zip(page["ids"], page["documents"], metadatas)
+
+    def documents(self, record_ids: list[str]) -> list[str]:
+        """Document text for record_ids, in order."""
+        page = self.collection.get(ids=list(record_ids), include=["documents"])
+        found = dict(zip(page["ids"], page["documents"] or []))
+        return [found.get(i) or "" for i in record_ids]
+
+
+class NumpyBackend:
+    """
+    Exact search over a memory-mapped, L2-normalised float32 matrix.
+
+    On first use the Chroma collection is exported once into
+    `<persist_dir>/numpy_index/` (see search/matrix.py for the layout).
+    The matrix is opened with mmap_mode="r", so concurrent processes share
+    the same page-cache pages instead of each holding a private copy.
+    """
+
+    name = "numpy"
+
+    def __init__(self, persist_dir: Path):
+        self.persist_dir = Path(persist_dir)
+        self.export_dir = self.persist_dir / NUMPY_EXPORT_DIR
+
+        if not self._export_is_current():
+            self.export(self.persist_dir, self.export_dir)
+
+        self.matrix = MatrixShard(self.export_dir)
+
+    def query(self, query_embeddings, n_results: int) -> dict:
+        queries = normalize(query_embeddings)
+        return hits_to_results(self.matrix.topk(queries, n_results))
+
+    def record_tables(self) -> list[RecordTable]:
+        return [self.matrix.records]
+
+    def iter_records(self) -> Iterable[tuple]:
+        return self.matrix.iter_records()
+
+    @staticmethod
+    def export(persist_dir: Path, export_dir: Path):
+        """
+        Export the Chroma collection in persist_dir into export_dir.
+        """
+        collection = open_collection(persist_dir)
+        write_matrix(
+            export_dir,
+            iter_collection(collection),
+            total=collection.count(),
+            manifest={"index_version": index_version(persist_dir)},
+        )
+
+    def _export_is_current(self) -> bool:
+        manifest = read_manifest(self.export_dir)
+        return (
+            manifest.get("index_version") == index_version(self.persist_dir)
+            and RecordTable.exists(self.export_dir / RECORDS_DIR)
+        )
+
+
+# ------------------------------------------------------------------
+# Registry
+# ------------------------------------------------------------------
+
+SEARCH_BACKENDS = {
+    "chroma": ChromaBackend,
+    "numpy": NumpyBackend,
+    "sharded": ShardedBackend,
+    "int8": Int8Backend,
+    "pq": PQBackend,
+}
+
+
+def open_backend(name: str, persist_dir: Path, **options):
+    """
+    Instantiate the retrieval backend registered under `name`.
+    Extra keyword options are passed through to the backend.
+    """
+    if name not in SEARCH_BACKENDS:
+        available = ", ".join(SEARCH_BACKENDS.keys())
+        raise ValueError(
+            f"Unknown search backend '{name}'. "
+            f"Available backends: {available}"
+        )
+    return SEARCH_BACKENDS[name](persist_dir, **options)
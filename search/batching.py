@@ -0,0 +1,211 @@
+"""
+search/batching.py
+
+Micro-batching of concurrent search callers.
+
+`AsyncBatcher` collects items submitted from coroutines on the same event
+loop during a short window (or until `max_batch_size` is reached), runs one
+blocking batch call for all of them on a bounded executor, and resolves each
+caller's future with its own slice of the results. The event loop is never
+blocked, so searches overlap with any other I/O the service is doing.
+
+`ThreadBatcher` does the same for plain threads: callers block in `submit`
+while a scheduler thread coalesces everything queued within the window and
+runs one batch at a time. Requests that arrive while a batch is computing
+are already past their window and go out together in the next one. Queue
+wait and compute time are accumulated in `stats`.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable
+
+DEFAULT_BATCH_WINDOW = 0.002      # seconds
+DEFAULT_MAX_BATCH_SIZE = 256
+
+
+class AsyncBatcher:
+    """
+    Coalesces concurrent `submit` calls into batched `fn(items)` calls.
+
+    `fn` takes a list of items and returns a list of results aligned with
+    it. Pending items are tracked per event loop, so one batcher can be
+    shared by several loops.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list], list],
+        executor: Executor,
+        window: float = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ):
+        self.fn = fn
+        self.executor = executor
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = {}      # loop → [(item, future)]
+        self._timers = {}       # loop → TimerHandle
+        self._tasks = set()     # strong refs to in-flight batches
+
+    async def submit(self, items: list) -> list:
+        """Queue items and wait for their results."""
+        if not items:
+            return []
+
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, [])
+
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            pending.append((item, future))
+            futures.append(future)
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(loop)
+        elif loop not in self._timers:
+            self._timers[loop] = loop.call_later(self.window, self._flush, loop)
+
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, loop):
+        timer = self._timers.pop(loop, None)
+        if timer is not None:
+            timer.cancel()
+
+        pending = self._pending.pop(loop, [])
+        for start in range(0, len(pending), self.max_batch_size):
+            task = loop.create_task(self._run(loop, pending[start:start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop, chunk):
+        items = [item for item, _ in chunk]
+        try:
+            results = await loop.run_in_executor(self.executor, self.fn, items)
+        except Exception as e:
+            for _, future in chunk:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(chunk, results):
+            # Callers may have been cancelled while the batch ran
+            if not future.done():
+                future.set_result(result)
+
+
+class ThreadBatcher:
+    """
+    Coalesces concurrent blocking `submit` calls from many threads into
+    batched `fn(items)` calls on one scheduler thread.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list], list],
+        window: float = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ):
+        self.fn = fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = []      # [(item, future, enqueued_at)]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.stats = {
+            "batches":    0,
+            "items":      0,
+            "max_batch":  0,
+            "queue_wait": 0.0,      # seconds, summed over items
+            "compute":    0.0,      # seconds, summed over batches
+        }
+
+    def submit(self, items: list) -> list:
+        """Queue items, block until their batch has run, return their results."""
+        if not items:
+            return []
+
+        enqueued_at = time.perf_counter()
+        futures = []
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ThreadBatcher is closed.")
+            for item in items:
+                future = Future()
+                self._pending.append((item, future, enqueued_at))
+                futures.append(future)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="toolstorepy-batcher", daemon=True,
+                )
+                self._thread.start()
+            self._cond.notify()
+
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Run whatever is still queued, then stop the scheduler thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def report(self) -> str:
+        stats = self.stats
+        if not stats["batches"]:
+            return ""
+        return (
+            f"{stats['batches']} batches (avg {stats['items'] / stats['batches']:.1f}, "
+            f"max {stats['max_batch']}), queue wait "
+            f"{stats['queue_wait'] / stats['items'] * 1000:.2f} ms/query, compute "
+            f"{stats['compute'] / stats['batches'] * 1000:.2f} ms/batch"
+        )
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+
+                # The window opens with the oldest queued item
+                deadline = self._pending[0][2] + self.window
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                chunk = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            self._run(chunk)
+
+    def _run(self, chunk):
+        started = time.perf_counter()
+        try:
+            results = self.fn([item for item, _, _ in chunk])
+        except Exception as e:
+            for _, future, _ in chunk:
+                future.set_exception(e)
+            results = None
+        finished = time.perf_counter()
+
+        with self._cond:
+            self.stats["batches"] += 1
+            self.stats["items"] += len(chunk)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(chunk))
+            self.stats["queue_wait"] += sum(started - enqueued_at for _, _, enqueued_at in chunk)
+            self.stats["compute"] += finished - started
+
+        if results is not None:
+            for (_, future, _), result in zip(chunk, results):
+                future.set_result(result)
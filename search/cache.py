@@ -0,0 +1,199 @@
+import hashlib
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Directory name of the search cache inside a workspace
+CACHE_DIR_NAME = "search_cache"
+
+INDEX_METADATA_FILE = "INDEX_METADATA.json"
+
+
+def index_version(persist_dir: Path) -> str:
+    """
+    Derive a stable version string for an extracted index directory.
+
+    The metadata file is only written when an archive is extracted, so its
+    contents and mtime change on every re-download. Opening the Chroma
+    database can touch chroma.sqlite3, which is why it is only used as a
+    fallback for indexes that ship without metadata.
+    """
+    persist_dir = Path(persist_dir)
+    digest = hashlib.sha256()
+
+    metadata = persist_dir / INDEX_METADATA_FILE
+    if metadata.exists():
+        digest.update(metadata.read_bytes())
+        digest.update(str(metadata.stat().st_mtime_ns).encode())
+    else:
+        db = persist_dir / "chroma.sqlite3"
+        if db.exists():
+            digest.update(f"{db.stat().st_size}".encode())
+
+    return digest.hexdigest()[:16]
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    On-disk cache for SemanticSearcher.
+
+    Stores two levels of results in one SQLite file:
+        - query embeddings keyed by (encoder model, query text)
+        - rerank scores keyed by (cross-encoder model, query, document hash)
+
+    Every key also includes the index version, so entries made against
+    another index (or an older download of this one) are never returned.
+    Builds that alternate between indexes, and daemon searchers sharing one
+    cache_dir, keep their own entries side by side; entries of versions no
+    longer in use age out under the shared byte budget, evicted
+    least-recently-used first.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        index_version: str,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_version = index_version
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.cache_dir / "search_cache.db"),
+            check_same_thread=False,
+        )
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key       TEXT PRIMARY KEY,
+                value     BLOB NOT NULL,
+                size      INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+            """
+        )
+
+    # --------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------
+
+    def get_embeddings(self, model_name: str, queries: list[str]) -> dict:
+        """Return {query: embedding} for every cached query."""
+        keys = {self._embedding_key(model_name, q): q for q in queries}
+        found = self._get_many(list(keys))
+        return {
+            keys[k]: np.frombuffer(blob, dtype=np.float32)
+            for k, blob in found.items()
+        }
+
+    def put_embeddings(self, model_name: str, embeddings: dict):
+        """Store {query: embedding} for model_name."""
+        self._put_many({
+            self._embedding_key(model_name, q): np.asarray(e, dtype=np.float32).tobytes()
+            for q, e in embeddings.items()
+        })
+
+    def get_scores(self, model_name: str, pairs: list) -> list[Optional[float]]:
+        """Return the cached score for each (query, document) pair, or None."""
+        keys = [self._score_key(model_name, q, d) for q, d in pairs]
+        found = self._get_many(keys)
+        return [
+            struct.unpack("<d", found[k])[0] if k in found else None
+            for k in keys
+        ]
+
+    def put_scores(self, model_name: str, pairs: list, scores: list[float]):
+        """Store scores for (query, document) pairs."""
+        self._put_many({
+            self._score_key(model_name, q, d): struct.pack("<d", float(s))
+            for (q, d), s in zip(pairs, scores)
+        })
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --------------------------------------------------
+    # INTERNAL
+    # --------------------------------------------------
+
+    def _embedding_key(self, model_name: str, query: str) -> str:
+        return _hash("emb", self.index_version, model_name, query)
+
+    def _score_key(self, model_name: str, query: str, document: str) -> str:
+        return _hash("score", self.index_version, model_name, query, _hash(document))
+
+    def _get_many(self, keys: list[str]) -> dict:
+        if not keys:
+            return {}
+
+        found = {}
+        now = time.time()
+        with self._lock, self._conn:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({marks})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+        return found
+
+    def _put_many(self, items: dict):
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [(k, v, len(k) + len(v), now) for k, v in items.items()],
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_used ASC"
+        ):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
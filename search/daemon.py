@@ -0,0 +1,474 @@
+"""
+search/daemon.py
+
+Long-lived search daemon with warm models (`toolstorepy serve-search`).
+
+The daemon keeps SemanticSearcher instances resident and answers search
+requests over localhost HTTP:
+
+    GET  /health   → {"status": "ok", "pid": ...}
+    POST /search   → {"config": {...}, "queries": [...]}  →  {"results": [...]}
+
+`config` holds the SemanticSearcher keyword arguments plus optional
+`cache_dir` / `cache_mb` for the on-disk SearchCache. Search requests must
+carry the bearer token the daemon writes to its state file, which only the
+owning user can read (mode 0600). Every `persist_dir` must be an extracted
+index and `cache_dir` a workspace search cache, so a request cannot point
+the daemon at arbitrary paths.
+
+One searcher is kept per distinct config, so repeated builds against the
+same index skip the Python, torch, model and Chroma start-up entirely. At
+most MAX_SEARCHERS stay resident, and one idle for IDLE_SECONDS is closed,
+releasing the models no other searcher uses. A searcher is rebuilt when its
+index version changes (e.g. after a --force-refresh download); the replaced
+one is closed once its in-flight requests finish.
+
+The daemon advertises itself in a per-user state file, one per port, under
+`$XDG_RUNTIME_DIR/toolstorepy/` (or `~/.cache/toolstorepy/` when there is no
+runtime directory). `DaemonClient.discover()` reads them (address and token)
+and health-checks the endpoint so ToolStorePy can use a running daemon
+transparently.
+"""
+
+import hmac
+import inspect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import ExitStack
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from .backends import SEARCH_BACKENDS
+from .cache import CACHE_DIR_NAME, SearchCache
+from .federated import combined_index_version
+from .models import registry
+from .quantize import QUANTIZED_BACKENDS, QUANTIZED_DIR_PREFIX
+from .semantic import SemanticSearcher
+from .shards import SHARDS_FILE
+
+logger = logging.getLogger("ToolStorePy")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+STATE_FILE_PREFIX = "search-daemon-"
+
+HEALTH_TIMEOUT = 0.5
+
+# Covers a first request that loads models; a hung daemon fails over to
+# in-process search instead of blocking the build
+SEARCH_TIMEOUT = 120.0
+
+# Resident searchers: at most MAX_SEARCHERS configs stay loaded, and one
+# unused for IDLE_SECONDS is closed (checked every SWEEP_SECONDS)
+MAX_SEARCHERS = 4
+IDLE_SECONDS = 30 * 60
+SWEEP_SECONDS = 60
+
+# SemanticSearcher arguments a client may set; the daemon supplies the
+# cache and thread batching itself
+SEARCHER_OPTIONS = frozenset({
+    "persist_dir", "encoder_model", "cross_encoder_model", "top_k", "rerank_depth",
+    "backend", "backend_options", "inference_backend", "rerank_margin",
+    "cascade_model", "cascade_depth", "rerank_mode", "maxsim_model",
+    "collapse_threshold", "hybrid", "hybrid_depth", "pretokenized", "rerank_repos",
+    "encode_workers", "encode_threads",
+})
+CACHE_OPTIONS = frozenset({"cache_dir", "cache_mb"})
+
+# Files that mark a directory as an extracted index (codes-only indexes
+# ship just a quantised directory)
+INDEX_MARKERS = (
+    "chroma.sqlite3",
+    SHARDS_FILE,
+    *(f"{QUANTIZED_DIR_PREFIX}{scheme}" for scheme in QUANTIZED_BACKENDS),
+)
+
+
+class _Entry:
+    """
+    A resident searcher and the requests currently using it.
+    """
+
+    def __init__(self, config: dict, version: str, searcher: SemanticSearcher):
+        self.config = config
+        self.version = version
+        self.searcher = searcher
+        self.users = 0
+        self.retired = False
+        self.last_used = time.monotonic()
+
+    def resources(self) -> set:
+        """Registry names (models, index directories) the searcher holds."""
+        names = {
+            self.config.get(option)
+            for option in ("encoder_model", "cross_encoder_model", "cascade_model", "maxsim_model")
+        }
+        names.update(str(Path(d).resolve()) for d in _persist_dirs(self.config))
+        names.discard(None)
+        return names
+
+    def close(self):
+        self.searcher.close()
+        if self.searcher.cache is not None:
+            self.searcher.cache.close()
+
+
+class SearchDaemon:
+    """
+    Holds warm searchers and serves them over localhost HTTP.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        state_dir: Optional[Path] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.state_dir = Path(state_dir) if state_dir else default_state_dir()
+        self.state_file = None
+        self.token = secrets.token_urlsafe(32)
+        self._searchers = {}
+        self._load_locks = {}      # index dir → [lock, threads holding or waiting]
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------
+
+    def serve_forever(self):
+        server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.port = server.server_address[1]
+        self.state_file = state_file_path(self.state_dir, self.port)
+        self._write_state()
+        logger.info(f"[DAEMON] Serving search on http://{self.host}:{self.port}")
+
+        stop = threading.Event()
+        sweeper = threading.Thread(target=self._sweep, args=(stop,), name="daemon-sweep", daemon=True)
+        sweeper.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            server.server_close()
+            self._remove_state()
+            logger.info("[DAEMON] Stopped.")
+
+    def search(self, config: dict, queries: list[str]) -> list[dict]:
+        # Concurrent requests for one searcher are coalesced by its scheduler,
+        # which runs one batch at a time; different indexes run concurrently
+        entry = self._acquire(config)
+        try:
+            return entry.searcher.batched_search(queries)
+        finally:
+            self._release(entry)
+
+    # --------------------------------------------------
+    # INTERNAL
+    # --------------------------------------------------
+
+    def _acquire(self, config: dict) -> _Entry:
+        """Current entry for config, loaded at most once per index version."""
+        validate_config(config)
+        key = json.dumps(config, sort_keys=True)
+        persist_dirs = sorted({str(Path(d).resolve()) for d in _persist_dirs(config)})
+        version = combined_index_version(_persist_dirs(config))
+
+        # Loads are serialised per index directory, not per config: configs
+        # sharing an index build the same side tables (tool_records/,
+        # numpy_index/, the BM25 index) in place. Other indexes load concurrently.
+        with self._lock:
+            load_locks = []
+            for persist_dir in persist_dirs:
+                slot = self._load_locks.setdefault(persist_dir, [threading.Lock(), 0])
+                slot[1] += 1
+                load_locks.append(slot[0])
+
+        retired = []
+        try:
+            with ExitStack() as stack:
+                for load_lock in load_locks:
+                    stack.enter_context(load_lock)
+
+                with self._lock:
+                    entry = self._searchers.get(key)
+                    if entry is not None and entry.version == version:
+                        entry.users += 1
+                        entry.last_used = time.monotonic()
+                        return entry
+
+                fresh = _Entry(config, version, self._load(config, version))
+
+                with self._lock:
+                    stale = self._searchers.pop(key, None)
+                    if stale is not None:
+                        retired.append(stale)
+                    self._searchers[key] = fresh
+                    fresh.users += 1
+                    retired += self._evict()
+        finally:
+            with self._lock:
+                for persist_dir in persist_dirs:
+                    slot = self._load_locks[persist_dir]
+                    slot[1] -= 1
+                    if not slot[1]:
+                        del self._load_locks[persist_dir]
+
+        self._retire(retired)
+        return fresh
+
+    def _release(self, entry: _Entry):
+        with self._lock:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            close_now = entry.retired and entry.users == 0
+        if close_now:
+            entry.close()
+
+    def _evict(self) -> list:
+        """
+        Remove idle entries and, beyond MAX_SEARCHERS, the least recently
+        used ones. Caller holds self._lock and passes the result to _retire.
+        """
+        now = time.monotonic()
+        evicted = [
+            self._searchers.pop(key)
+            for key, entry in list(self._searchers.items())
+            if entry.users == 0 and now - entry.last_used > IDLE_SECONDS
+        ]
+        while len(self._searchers) > MAX_SEARCHERS:
+            key = min(self._searchers, key=lambda k: (self._searchers[k].users > 0, self._searchers[k].last_used))
+            evicted.append(self._searchers.pop(key))
+        return evicted
+
+    def _retire(self, entries: list):
+        """
+        Close entries no longer resident (in-flight ones on release) and drop
+        the models and clients no resident searcher still uses.
+        """
+        if not entries:
+            return
+        with self._lock:
+            closing = []
+            for entry in entries:
+                entry.retired = True
+                if entry.users == 0:
+                    closing.append(entry)
+            in_use = set().union(*(entry.resources() for entry in self._searchers.values()))
+            unused = set().union(*(entry.resources() for entry in entries)) - in_use
+
+        for entry in closing:
+            logger.info(f"[DAEMON] Closing searcher for {entry.config['persist_dir']}")
+            entry.close()
+        for name in unused:
+            registry.release(name)
+
+    def _sweep(self, stop: threading.Event):
+        while not stop.wait(SWEEP_SECONDS):
+            with self._lock:
+                evicted = self._evict()
+            self._retire(evicted)
+
+    def _load(self, config: dict, version: str) -> SemanticSearcher:
+        options = dict(config)
+        cache_dir = options.pop("cache_dir", None)
+        cache_mb = options.pop("cache_mb", 0)
+
+        cache = None
+        if cache_dir and cache_mb > 0:
+            cache = SearchCache(
+                Path(cache_dir),
+                index_version=version,
+                max_bytes=cache_mb * 1024 * 1024,
+            )
+
+        logger.info(f"[DAEMON] Loading searcher for {options['persist_dir']}")
+        return SemanticSearcher(cache=cache, thread_batching=True, **options)
+
+    def _handler_class(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/health":
+                    self._reply(200, {"status": "ok", "pid": os.getpid()})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/search":
+                    self._reply(404, {"error": "not found"})
+                    return
+                supplied = self.headers.get("Authorization", "")
+                if not hmac.compare_digest(supplied.encode(), f"Bearer {daemon.token}".encode()):
+                    self._reply(401, {"error": "missing or invalid token"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length))
+                    results = daemon.search(body["config"], body["queries"])
+                    self._reply(200, {"results": results})
+                except ValueError as e:
+                    self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    logger.error(f"[DAEMON] Search failed: {e}")
+                    self._reply(500, {"error": str(e)})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug("[DAEMON] " + format % args)
+
+        return Handler
+
+    def _write_state(self):
+        # Written 0600 beside the target and renamed, so readers never see
+        # a partial file and other users never see the token
+        self.state_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"host": self.host, "port": self.port, "pid": os.getpid(), "token": self.token}, f)
+        tmp_path.replace(self.state_file)
+
+    def _remove_state(self):
+        try:
+            self.state_file.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _persist_dirs(config: dict) -> list:
+    persist_dir = config["persist_dir"]
+    return persist_dir if isinstance(persist_dir, list) else [persist_dir]
+
+
+def default_state_dir() -> Path:
+    """Per-user directory holding daemon state files."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "toolstorepy"
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    return (Path(cache_home) if cache_home else Path.home() / ".cache") / "toolstorepy"
+
+
+def state_file_path(state_dir: Path, port: int) -> Path:
+    return Path(state_dir) / f"{STATE_FILE_PREFIX}{port}.json"
+
+
+def validate_config(config: dict):
+    """
+    Reject request configs with unknown options, or whose paths are not an
+    extracted index or a workspace search cache. Raises ValueError.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("config must be a JSON object.")
+    unknown = set(config) - SEARCHER_OPTIONS - CACHE_OPTIONS
+    if unknown:
+        raise ValueError(f"Unsupported config option(s): {', '.join(sorted(unknown))}")
+    for required in ("persist_dir", "encoder_model", "cross_encoder_model"):
+        if required not in config:
+            raise ValueError(f"config is missing '{required}'.")
+
+    backend = config.get("backend", "chroma")
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(
+            f"Unknown search backend '{backend}'. "
+            f"Available backends: {', '.join(SEARCH_BACKENDS)}"
+        )
+    backend_options = config.get("backend_options") or {}
+    if not isinstance(backend_options, dict):
+        raise ValueError("backend_options must be a JSON object.")
+    accepted = set(inspect.signature(SEARCH_BACKENDS[backend]).parameters) - {"persist_dir"}
+    unknown = set(backend_options) - accepted
+    if unknown:
+        raise ValueError(f"Unsupported option(s) for backend '{backend}': {', '.join(sorted(unknown))}")
+
+    persist_dirs = config.get("persist_dir")
+    if not isinstance(persist_dirs, list):
+        persist_dirs = [persist_dirs]
+    for persist_dir in persist_dirs:
+        if not isinstance(persist_dir, str) or not persist_dir:
+            raise ValueError("persist_dir must be an index directory path.")
+        path = Path(persist_dir)
+        if not path.is_dir() or not any((path / marker).exists() for marker in INDEX_MARKERS):
+            raise ValueError(f"Not an extracted index directory: {persist_dir}")
+
+    cache_dir = config.get("cache_dir")
+    if cache_dir is not None:
+        path = Path(cache_dir)
+        if not path.is_absolute() or path.name != CACHE_DIR_NAME or not path.parent.is_dir():
+            raise ValueError(
+                f"cache_dir must be an absolute '<workspace>/{CACHE_DIR_NAME}' path "
+                f"in an existing workspace: {cache_dir}"
+            )
+
+
+class DaemonClient:
+    """
+    Minimal client for a running SearchDaemon.
+    """
+
+    def __init__(self, host: str, port: int, token: str = "", timeout: float = SEARCH_TIMEOUT):
+        self.base_url = f"http://{host}:{port}"
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def discover(cls, state_dir: Optional[Path] = None, port: Optional[int] = None) -> Optional["DaemonClient"]:
+        """
+        Return a client for a healthy advertised daemon (the one on `port`
+        when given, else the default port first), or None.
+        """
+        state_dir = Path(state_dir) if state_dir else default_state_dir()
+        if port is not None:
+            candidates = [state_file_path(state_dir, port)]
+        else:
+            candidates = sorted(
+                state_dir.glob(f"{STATE_FILE_PREFIX}*.json"),
+                key=lambda path: path != state_file_path(state_dir, DEFAULT_PORT),
+            )
+
+        for state_file in candidates:
+            try:
+                state = json.loads(state_file.read_text(encoding="utf-8"))
+                client = cls(state["host"], state["port"], state.get("token", ""))
+                with urllib.request.urlopen(client.base_url + "/health", timeout=HEALTH_TIMEOUT) as r:
+                    if json.loads(r.read()).get("status") == "ok":
+                        return client
+            except (OSError, ValueError, KeyError):
+                continue
+
+        return None
+
+    def batch_search(self, config: dict, queries: list[str]) -> list[dict]:
+        request = urllib.request.Request(
+            self.base_url + "/search",
+            data=json.dumps({"config": config, "queries": queries}).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as r:
+                return json.loads(r.read())["results"]
+        except urllib.error.HTTPError as e:
+            detail = json.loads(e.read() or b"{}").get("error", e.reason)
+            raise RuntimeError(f"Search daemon error: {detail}") from e
@@ -0,0 +1,74 @@
+"""
+search/dedupe.py
+
+Query normalisation and duplicate collapsing.
+
+Generated query sets repeat the same intent with trivial wording changes.
+`dedupe_queries` normalises case and whitespace and folds exact repeats, and
+`collapse_near_duplicates` optionally merges queries whose embeddings are
+within a cosine threshold of an earlier one. Both return a position map so
+each group is searched once and its result fanned back out to every
+original query.
+"""
+
+import numpy as np
+
+# Leader matrix growth step for collapse_near_duplicates
+LEADER_BLOCK_ROWS = 1024
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case and collapse runs of whitespace."""
+    return " ".join(text.split()).lower()
+
+
+def dedupe_queries(queries: list[str]) -> tuple[list[str], list[int]]:
+    """
+    Normalise queries and fold exact repeats.
+
+    Returns (unique, positions) where unique keeps first-seen order and
+    positions[i] is the index in unique that query i maps to.
+    """
+    index, unique, positions = {}, [], []
+    for query in queries:
+        key = normalize_query(query)
+        if key not in index:
+            index[key] = len(unique)
+            unique.append(key)
+        positions.append(index[key])
+    return unique, positions
+
+
+def collapse_near_duplicates(embeddings: np.ndarray, threshold: float) -> tuple[list[int], list[int]]:
+    """
+    Greedy leader clustering on cosine similarity.
+
+    Each row joins the first earlier leader it matches with similarity
+    >= threshold, otherwise it becomes a leader itself. Returns
+    (leaders, owner) where leaders are row indices in input order and
+    owner[i] is the position in leaders that row i maps to.
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-12)
+
+    leader_vectors = np.empty((min(len(vectors), LEADER_BLOCK_ROWS), vectors.shape[1]), dtype=np.float32)
+    leaders, owner = [], []
+
+    for i, vector in enumerate(vectors):
+        if leaders:
+            sims = leader_vectors[:len(leaders)] @ vector
+            match = int(np.argmax(sims >= threshold)) if sims.max() >= threshold else -1
+            if match >= 0:
+                owner.append(match)
+                continue
+
+        if len(leaders) == len(leader_vectors):
+            leader_vectors = np.concatenate(
+                [leader_vectors, np.empty((LEADER_BLOCK_ROWS, vectors.shape[1]), dtype=np.float32)]
+            )
+        leader_vectors[len(leaders)] = vector
+        owner.append(len(leaders))
+        leaders.append(i)
+
+    return leaders, owner
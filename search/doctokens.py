@@ -0,0 +1,283 @@
+"""
+search/doctokens.py
+
+Pre-tokenised candidate documents for the cross-encoder.
+
+Index documents never change between builds, yet the reranker re-tokenises
+the same candidates for every query. `DocumentTokens` stores each
+document's token ids once per cross-encoder tokenizer, already truncated
+to what the model can use, and `predict_pretokenized` scores pairs by
+tokenising only the query and concatenating.
+
+Layout of `<persist_dir>/doc_tokens/<model>/`:
+    tokens.npy    — int32, all documents' token ids back to back
+    offsets.npy   — int64, token range per row (rows + 1)
+    hashes.npy    — uint64, sorted document-text hashes
+    rows.npy      — int64, row for each entry of hashes.npy
+    manifest.json — model, token budget, index version, content fingerprint
+
+Documents are looked up by a hash of their text, so callers keep passing
+plain strings. Arrays are memory-mapped. An index archive may ship this
+directory; it is accepted when its content fingerprint matches the index.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from .cache import index_version
+
+logger = logging.getLogger("ToolStorePy")
+
+DOC_TOKENS_DIR = "doc_tokens"
+PREDICT_BATCH_SIZE = 32
+
+
+def _text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+
+
+def _fingerprint(documents: list[tuple]) -> str:
+    digest = hashlib.sha256()
+    for record_id, document in sorted(documents):
+        digest.update(f"{record_id}\0{document}\0".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def model_max_length(model) -> int:
+    """Maximum sequence length the cross-encoder is run with."""
+    max_length = getattr(model, "max_length", None)
+    if not max_length:
+        max_length = min(getattr(model.tokenizer, "model_max_length", 512), 512)
+    return int(max_length)
+
+
+class DocumentTokens:
+    """
+    Memory-mapped document → token ids table for one tokenizer.
+    """
+
+    DIR_NAME = DOC_TOKENS_DIR
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        self.tokens = np.load(self.directory / "tokens.npy", mmap_mode="r")
+        self.offsets = np.load(self.directory / "offsets.npy", mmap_mode="r")
+        self.hashes = np.load(self.directory / "hashes.npy", mmap_mode="r")
+        self.rows = np.load(self.directory / "rows.npy", mmap_mode="r")
+
+    @classmethod
+    def open(
+        cls,
+        persist_dir: Path,
+        model_name: str,
+        load_model: Callable,
+        documents: Iterable[tuple],
+    ) -> "DocumentTokens":
+        """
+        Open the token table for model_name, (re)building it from
+        `documents` — an iterable of (id, document) — when missing or stale.
+        `load_model` is only called when a build is needed.
+        """
+        persist_dir = Path(persist_dir)
+        directory = persist_dir / cls.DIR_NAME / model_name.replace("/", "__")
+        version = index_version(persist_dir)
+        manifest_path = directory / "manifest.json"
+
+        manifest = None
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("model") == model_name and manifest.get("index_version") == version:
+                return cls(directory)
+
+        # Version mismatch: the table may still have shipped with this exact
+        # content in the index archive
+        documents = list(documents)
+        fingerprint = _fingerprint(documents)
+        if manifest and manifest.get("model") == model_name and manifest.get("fingerprint") == fingerprint:
+            manifest["index_version"] = version
+            manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+            return cls(directory)
+
+        model = load_model()
+        logger.info(f"[TOKENS] Building {cls.DIR_NAME}/ for {len(documents):,} documents ({model_name})")
+        cls.build(directory, model, documents, manifest={
+            "model":         model_name,
+            "index_version": version,
+            "fingerprint":   fingerprint,
+        })
+        return cls(directory)
+
+    @staticmethod
+    def build(directory: Path, model, documents: list[tuple], manifest: dict):
+        """
+        Tokenise documents with the model's tokenizer, truncated so that at
+        least one query token still fits, and write the table.
+        """
+        directory = Path(directory)
+        tokenizer = model.tokenizer
+        max_tokens = max(
+            model_max_length(model) - tokenizer.num_special_tokens_to_add(pair=True) - 1, 1,
+        )
+
+        texts = [document for _, document in documents]
+        encoded = tokenizer(texts, add_special_tokens=False, truncation=False)["input_ids"] if texts else []
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        for i, ids in enumerate(encoded):
+            offsets[i + 1] = offsets[i] + min(len(ids), max_tokens)
+        tokens = np.zeros(int(offsets[-1]), dtype=np.int32)
+        for i, ids in enumerate(encoded):
+            tokens[offsets[i]:offsets[i + 1]] = ids[:max_tokens]
+
+        hashes = np.array([_text_hash(t) for t in texts], dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        np.save(tmp_dir / "tokens.npy", tokens)
+        np.save(tmp_dir / "offsets.npy", offsets)
+        np.save(tmp_dir / "hashes.npy", hashes[order])
+        np.save(tmp_dir / "rows.npy", order.astype(np.int64))
+        (tmp_dir / "manifest.json").write_text(
+            json.dumps({**manifest, "max_tokens": max_tokens, "rows": len(texts)}),
+            encoding="utf-8",
+        )
+
+        if directory.exists():
+            shutil.rmtree(directory)
+        tmp_dir.rename(directory)
+
+    def _row(self, document: str) -> Optional[int]:
+        h = np.uint64(_text_hash(document))
+        i = int(np.searchsorted(self.hashes, h))
+        if i < len(self.hashes) and self.hashes[i] == h:
+            return int(self.rows[i])
+        return None
+
+    def lookup(self, document: str) -> Optional[np.ndarray]:
+        """Token ids for document, or None if it is not in the table."""
+        row = self._row(document)
+        if row is None:
+            return None
+        return self.tokens[self.offsets[row]:self.offsets[row + 1]]
+
+
+def truncate_pair(query_len: int, doc_len: int, budget: int) -> tuple[int, int]:
+    """
+    Lengths after "longest_first" truncation of a (query, document) pair
+    to `budget` tokens: trim the longer side until both match, then
+    alternate, document first.
+    """
+    excess = query_len + doc_len - budget
+    if excess <= 0:
+        return query_len, doc_len
+
+    if query_len > doc_len:
+        cut = min(excess, query_len - doc_len)
+        query_len, excess = query_len - cut, excess - cut
+    elif doc_len > query_len:
+        cut = min(excess, doc_len - query_len)
+        doc_len, excess = doc_len - cut, excess - cut
+
+    return query_len - excess // 2, doc_len - (excess + 1) // 2
+
+
+def build_features(tokenizer, max_length: int, queries: list[str], doc_tokens: list) -> list[dict]:
+    """
+    Model inputs for (query, pre-tokenised document) pairs. Each distinct
+    query is tokenised once; documents are only truncated and concatenated.
+    """
+    budget = max_length - tokenizer.num_special_tokens_to_add(pair=True)
+    with_types = "token_type_ids" in getattr(tokenizer, "model_input_names", ())
+
+    query_ids = {}
+    for query in dict.fromkeys(queries):
+        query_ids[query] = tokenizer(query, add_special_tokens=False)["input_ids"]
+
+    features = []
+    for query, doc in zip(queries, doc_tokens):
+        q = query_ids[query]
+        q_len, d_len = truncate_pair(len(q), len(doc), budget)
+        q, d = list(q[:q_len]), [int(t) for t in doc[:d_len]]
+
+        feature = {"input_ids": tokenizer.build_inputs_with_special_tokens(q, d)}
+        if with_types:
+            feature["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(q, d)
+        features.append(feature)
+    return features
+
+
+def predict_pretokenized(
+    model, queries: list[str], doc_tokens: list, batch_size: int = PREDICT_BATCH_SIZE,
+) -> list[float]:
+    """
+    Cross-encoder scores for (query, token ids) pairs, matching
+    `CrossEncoder.predict` for single-label models.
+    """
+    import torch
+
+    features = build_features(model.tokenizer, model_max_length(model), queries, doc_tokens)
+    activation = getattr(model, "activation_fn", None) or getattr(model, "default_activation_function", None)
+
+    scores = []
+    with torch.inference_mode():
+        for start in range(0, len(features), batch_size):
+            batch = model.tokenizer.pad(
+                features[start:start + batch_size], return_tensors="pt",
+            ).to(model.model.device)
+            logits = model.model(**batch, return_dict=True).logits
+            if activation is not None:
+                logits = activation(logits)
+            scores.extend(float(s) for s in logits.view(-1).cpu())
+    return scores
+
+
+def supports_pretokenized(model) -> bool:
+    """Single-label models with a tokenizer that can assemble pairs."""
+    tokenizer = getattr(model, "tokenizer", None)
+    config = getattr(getattr(model, "model", None), "config", None)
+    return (
+        tokenizer is not None
+        and hasattr(tokenizer, "build_inputs_with_special_tokens")
+        and getattr(config, "num_labels", None) == 1
+    )
+
+
+def predict_pairs(
+    model, pairs: list, doc_tokens: Optional[DocumentTokens], batch_size: int = PREDICT_BATCH_SIZE,
+) -> list[float]:
+    """
+    Scores for (query, document) pairs. Documents found in `doc_tokens`
+    skip document tokenisation; the rest go through `model.predict`.
+    """
+    if doc_tokens is None or not supports_pretokenized(model):
+        return [float(s) for s in model.predict(pairs, batch_size=batch_size)]
+
+    tokens = [doc_tokens.lookup(doc) for _, doc in pairs]
+    scores = [None] * len(pairs)
+
+    known = [i for i, t in enumerate(tokens) if t is not None]
+    if known:
+        predicted = predict_pretokenized(
+            model, [pairs[i][0] for i in known], [tokens[i] for i in known], batch_size=batch_size,
+        )
+        for i, s in zip(known, predicted):
+            scores[i] = s
+
+    unknown = [i for i, t in enumerate(tokens) if t is None]
+    if unknown:
+        predicted = model.predict([pairs[i] for i in unknown], batch_size=batch_size)
+        for i, s in zip(unknown, predicted):
+            scores[i] = float(s)
+
+    return scores
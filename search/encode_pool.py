@@ -0,0 +1,97 @@
+"""
+search/encode_pool.py
+
+Multi-process query encoding for very large batches.
+
+A single `encoder.encode` call only uses part of a many-core machine.
+`EncoderPool` starts worker processes that each load the encoder once
+(with a fixed intra-op thread count) and encode shards of the query list.
+`encode_stream` yields shards as they finish, so SemanticSearcher can start
+retrieval and reranking before the whole batch is encoded.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Iterator, Optional
+
+import numpy as np
+
+DEFAULT_SHARD_SIZE = 1024
+
+# Encoder loaded once per worker process by _init_worker
+_worker_encoder = None
+
+
+def _init_worker(model_name: str, device: Optional[str], backend: str, threads: int):
+    global _worker_encoder
+
+    # Must be set before torch / onnxruntime start their thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from .inference import load_encoder
+    _worker_encoder = load_encoder(model_name, device, backend)
+
+
+def _encode_shard(start: int, texts: list[str]):
+    return start, np.asarray(_worker_encoder.encode(texts), dtype=np.float32)
+
+
+class EncoderPool:
+    """
+    Pool of encoder worker processes.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        threads_per_worker: int = 1,
+        device: Optional[str] = None,
+        inference_backend: str = "torch",
+        shard_size: int = DEFAULT_SHARD_SIZE,
+    ):
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.shard_size = shard_size
+        # spawn: forked children would inherit the parent's torch thread pools
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, device, inference_backend, threads_per_worker),
+        )
+
+    def encode_stream(self, texts: list[str]) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Encode texts in shards of `shard_size`, yielding (start, embeddings)
+        in completion order. Rows of each shard line up with
+        texts[start:start + len(embeddings)].
+        """
+        futures = [
+            self._executor.submit(_encode_shard, start, texts[start:start + self.shard_size])
+            for start in range(0, len(texts), self.shard_size)
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Encode texts across the pool, gathered in input order."""
+        shards = sorted(self.encode_stream(texts), key=lambda shard: shard[0])
+        if not shards:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate([embeddings for _, embeddings in shards])
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,174 @@
+"""
+search/federated.py
+
+Federated search across several indexes.
+
+SemanticSearcher treats a list of index directories as one logical index
+through these wrappers:
+
+    FederatedBackend    — queries every member backend in parallel and
+                          merges candidates by distance
+    FederatedRecords    — id → record lookups routed to the owning member
+    FederatedLexical    — BM25 hits fused by per-member rank (for --hybrid)
+    FederatedDocTokens  — pre-tokenised document lookups across members
+
+Candidate ids are namespaced as "<member>:<id>", so identical ids in
+different indexes never collide. Everything downstream (gating, cascade,
+the single rerank over the union, result building) sees ordinary ids.
+Distances are comparable because every member is searched with the same
+encoder and the same squared-L2 metric.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from .cache import index_version
+from .lexical import RRF_K
+
+
+def _split(record_id: str) -> tuple[int, str]:
+    member, _, local_id = str(record_id).partition(":")
+    return int(member), local_id
+
+
+def combined_index_version(persist_dirs: list) -> str:
+    """Version of a federation: changes when any member index changes."""
+    versions = [index_version(d) for d in persist_dirs]
+    if len(versions) == 1:
+        return versions[0]
+    return hashlib.sha256("\0".join(versions).encode()).hexdigest()[:16]
+
+
+class FederatedBackend:
+    """
+    Parallel query over member backends, merged by distance.
+    """
+
+    name = "federated"
+
+    def __init__(self, members: list):
+        self.members = members
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(members), thread_name_prefix="toolstorepy-federated",
+        )
+
+    def query(self, query_embeddings, n_results: int) -> dict:
+        futures = [
+            self._executor.submit(member.query, query_embeddings, n_results)
+            for member in self.members
+        ]
+        results = [future.result() for future in futures]
+
+        merged_ids, merged_distances = [], []
+        for q in range(len(query_embeddings)):
+            hits = []
+            for m, result in enumerate(results):
+                ids = (result.get("ids") or [])
+                distances = (result.get("distances") or [])
+                row_ids = ids[q] if q < len(ids) and ids[q] else []
+                row_distances = distances[q] if q < len(distances) and distances[q] else []
+                hits.extend(
+                    (d, f"{m}:{i}") for i, d in zip(row_ids, row_distances)
+                )
+            hits.sort(key=lambda h: h[0])
+            merged_ids.append([i for _, i in hits[:n_results]])
+            merged_distances.append([d for d, _ in hits[:n_results]])
+
+        return {"ids": merged_ids, "distances": merged_distances}
+
+    def close(self):
+        """Shut down the query threads and those of the members."""
+        self._executor.shutdown(wait=True)
+        for member in self.members:
+            if hasattr(member, "close"):
+                member.close()
+
+    def iter_records(self) -> Iterable[tuple]:
+        for m, member in enumerate(self.members):
+            for record_id, document, metadata in member.iter_records():
+                yield f"{m}:{record_id}", document, metadata
+
+
+class FederatedRecords:
+    """
+    ToolRecords interface over one table per member index.
+    """
+
+    def __init__(self, members: list):
+        self.members = members
+
+    def __len__(self) -> int:
+        return sum(len(member) for member in self.members)
+
+    def fields(self, record_id: str) -> dict:
+        m, local_id = _split(record_id)
+        return self.members[m].fields(local_id)
+
+    def repo(self, record_id: str) -> Optional[str]:
+        m, local_id = _split(record_id)
+        return self.members[m].repo(local_id)
+
+    def iter_documents(self):
+        for m, member in enumerate(self.members):
+            for record_id, document in member.iter_documents():
+                yield f"{m}:{record_id}", document
+
+    def documents(self, record_ids: list[str]) -> list[str]:
+        # One lookup per member, so each index is asked once per batch
+        by_member = {}
+        for position, record_id in enumerate(record_ids):
+            m, local_id = _split(record_id)
+            by_member.setdefault(m, []).append((position, local_id))
+
+        documents = [""] * len(record_ids)
+        for m, entries in by_member.items():
+            texts = self.members[m].documents([local_id for _, local_id in entries])
+            for (position, _), text in zip(entries, texts):
+                documents[position] = text
+        return documents
+
+
+class FederatedLexical:
+    """
+    BM25 search over one LexicalIndex per member, fused by rank.
+
+    Raw BM25 scores are not comparable across members: IDF and average
+    document length are per index, so one index would dominate a merge by
+    score. Member rankings are combined with reciprocal-rank fusion instead.
+    """
+
+    def __init__(self, members: list):
+        self.members = members
+        self.doc_count = sum(member.doc_count for member in members)
+
+    def search(self, query: str, k: int) -> list[tuple]:
+        """Top-k (id, fused score) across members, best first."""
+        hits = []
+        for m, member in enumerate(self.members):
+            hits.extend(
+                (f"{m}:{i}", 1.0 / (RRF_K + rank + 1))
+                for rank, (i, _) in enumerate(member.search(query, k))
+            )
+        # Stable sort: equal ranks interleave in member order
+        hits.sort(key=lambda h: h[1], reverse=True)
+        return hits[:k]
+
+    def search_batch(self, queries: list[str], k: int) -> list[list[str]]:
+        return [[i for i, _ in self.search(q, k)] for q in queries]
+
+
+class FederatedDocTokens:
+    """
+    Pre-tokenised document lookup across member tables.
+    """
+
+    def __init__(self, members: list):
+        self.members = members
+
+    def lookup(self, document: str):
+        for member in self.members:
+            tokens = member.lookup(document)
+            if tokens is not None:
+                return tokens
+        return None
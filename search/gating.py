@@ -0,0 +1,103 @@
+"""
+search/gating.py
+
+Confidence-gated reranking.
+
+When the best dense hit is far ahead of the runner-up, the cross-encoder
+almost never changes the outcome. `gate_candidates` shrinks the rerank set
+to the top hit whenever the distance margin between the first two
+candidates reaches a threshold, and `calibrate_margin` picks the smallest
+such threshold that keeps accuracy within a tolerance on a labelled
+query set.
+"""
+
+from typing import Optional
+
+
+def gate_candidates(ids: list, distances: list, margin: Optional[float]) -> list:
+    """
+    Return the candidate ids that still need reranking.
+
+    Distances are ascending (best first). If the runner-up trails the
+    top hit by at least `margin`, only the top hit is kept.
+    """
+    if margin is None or len(ids) < 2 or len(distances) < 2:
+        return ids
+    if distances[1] - distances[0] >= margin:
+        return ids[:1]
+    return ids
+
+
+def calibrate_margin(
+    searcher,
+    queries: list[str],
+    expected_git_links: list[str],
+    tolerance: float = 0.01,
+) -> dict:
+    """
+    Choose the smallest margin threshold whose gated accuracy stays within
+    `tolerance` (absolute, 0.01 = one point) of full reranking.
+
+    Runs retrieval and a full rerank once, then replays every candidate
+    threshold offline. Returns the chosen threshold together with the full
+    sweep so callers can report the accuracy / work tradeoff.
+    """
+    ids_per_query, distances_per_query = searcher.retrieve(queries)
+    scores_per_query = searcher.rerank(queries, ids_per_query)
+
+    full_picks, dense_picks, margins = [], [], []
+    for ids, distances, scores in zip(ids_per_query, distances_per_query, scores_per_query):
+        if not scores:
+            full_picks.append(None)
+            dense_picks.append(None)
+            margins.append(None)
+            continue
+        best = max(range(len(scores)), key=scores.__getitem__)
+        full_picks.append(_git_link(searcher, ids[best]))
+        dense_picks.append(_git_link(searcher, ids[0]))
+        margins.append(distances[1] - distances[0] if len(distances) > 1 else None)
+
+    total_pairs = sum(len(ids) for ids in ids_per_query)
+    n = len(queries)
+
+    def evaluate(threshold):
+        hits, pairs, gated = 0, 0, 0
+        for ids, margin, full, dense, expected in zip(
+            ids_per_query, margins, full_picks, dense_picks, expected_git_links
+        ):
+            if margin is not None and threshold is not None and margin >= threshold:
+                pick, pairs, gated = dense, pairs + 1, gated + 1
+            else:
+                pick, pairs = full, pairs + len(ids)
+            hits += int(pick is not None and pick == expected)
+        return {
+            "threshold":            threshold,
+            "accuracy":             round(hits / n, 6) if n else 0.0,
+            "gated_fraction":       round(gated / n, 6) if n else 0.0,
+            "pairs_saved_fraction": round(1 - pairs / total_pairs, 6) if total_pairs else 0.0,
+        }
+
+    baseline = evaluate(None)
+    candidates = sorted({m for m in margins if m is not None})
+    sweep = [evaluate(t) for t in candidates]
+
+    chosen = baseline
+    for row in sweep:
+        # Ascending thresholds: the first acceptable one gates the most queries
+        if row["accuracy"] >= baseline["accuracy"] - tolerance:
+            chosen = row
+            break
+
+    return {
+        "threshold":         chosen["threshold"],
+        "accuracy":          chosen["accuracy"],
+        "baseline_accuracy": baseline["accuracy"],
+        "tolerance":         tolerance,
+        "gated_fraction":    chosen["gated_fraction"],
+        "pairs_saved_fraction": chosen["pairs_saved_fraction"],
+        "sweep":             sweep,
+    }
+
+
+def _git_link(searcher, record_id):
+    return searcher.records.fields(record_id)["tool_git_link"]
@@ -0,0 +1,105 @@
+"""
+search/inference.py
+
+Inference backends for the encoder and cross-encoder.
+
+  torch      — stock sentence-transformers PyTorch models (default)
+  onnx-int8  — ONNX graphs with dynamic int8 quantisation, for CPU-only hosts
+
+The quantised graphs are exported once per model and CPU instruction set
+into the local model cache and loaded from there on every later run.
+Requires the optional ONNX extras: pip install "sentence-transformers[onnx]"
+"""
+
+import logging
+import platform
+from pathlib import Path
+
+logger = logging.getLogger("ToolStorePy")
+
+# Default cache location — inside the package, next to the repo cache
+DEFAULT_EXPORT_DIR = Path(__file__).parent.parent / ".model_cache"
+
+INFERENCE_BACKENDS = ("torch", "onnx-int8")
+
+
+def load_encoder(model_name: str, device=None, backend: str = "torch"):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name, device=device)
+    _check_backend(backend)
+    return _load_quantized(SentenceTransformer, model_name, device, "encoder")
+
+
+def load_cross_encoder(model_name: str, device=None, backend: str = "torch"):
+    from sentence_transformers import CrossEncoder
+
+    if backend == "torch":
+        return CrossEncoder(model_name, device=device)
+    _check_backend(backend)
+    return _load_quantized(CrossEncoder, model_name, device, "cross_encoder")
+
+
+# ------------------------------------------------------------------
+# Internal
+# ------------------------------------------------------------------
+
+def _check_backend(backend: str):
+    if backend not in INFERENCE_BACKENDS:
+        available = ", ".join(INFERENCE_BACKENDS)
+        raise ValueError(
+            f"Unknown inference backend '{backend}'. "
+            f"Available backends: {available}"
+        )
+
+
+def _load_quantized(model_cls, model_name: str, device, kind: str):
+    """
+    Load a dynamically quantised ONNX export of model_name, exporting and
+    caching it first if this host has not produced one yet.
+    """
+    try:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+    except ImportError as e:
+        raise RuntimeError(
+            "The onnx-int8 inference backend needs the ONNX extras: "
+            'pip install "sentence-transformers[onnx]"'
+        ) from e
+
+    config = _quantization_config()
+    export_dir = DEFAULT_EXPORT_DIR / kind / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{config}.onnx"
+
+    if not (export_dir / file_name).exists():
+        logger.info(f"[ONNX] Exporting int8 {model_name} ({config}) → {export_dir}")
+        # Loading with backend="onnx" converts the weights to an ONNX graph
+        # when the hub repo does not already ship one.
+        fp32 = model_cls(model_name, device=device, backend="onnx")
+        fp32.save_pretrained(str(export_dir))
+        export_dynamic_quantized_onnx_model(fp32, config, str(export_dir))
+
+    return model_cls(
+        str(export_dir),
+        device=device,
+        backend="onnx",
+        model_kwargs={"file_name": file_name},
+    )
+
+
+def _quantization_config() -> str:
+    """Pick the best ONNX Runtime quantisation preset for this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+
+    flags = ""
+    try:
+        flags = Path("/proc/cpuinfo").read_text()
+    except OSError:
+        pass
+
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
@@ -0,0 +1,172 @@
+"""
+search/late_interaction.py
+
+Late-interaction (MaxSim) reranking, a CPU-friendly alternative to the
+cross-encoder.
+
+A cross-encoder runs the full model over every (query, document) pair.
+Here every document's per-token embeddings are computed once at index
+time, so a search only encodes each query once. A candidate's score is
+the mean, over query tokens, of the best cosine similarity to any of the
+document's tokens: one matrix product per query plus a segmented max.
+
+Token embeddings come from a sentence-transformers model
+(`output_value="token_embeddings"`) and are stored in
+`<persist_dir>/doc_token_embeddings/<model>/` with the same layout,
+versioning and text-hash lookup as search/doctokens.py. Each token is
+L2-normalised and stored as int8 codes with a float32 scale per token
+(tokens.npy / scales.npy), about a quarter of the float32 size.
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .doctokens import DocumentTokens, _text_hash
+from .models import registry
+
+LATE_DIR = "doc_token_embeddings"
+EMBED_BATCH_SIZE = 64
+
+
+def _token_embeddings(model, texts: list[str]) -> list[np.ndarray]:
+    """L2-normalised float32 (tokens, dim) matrix per text."""
+    if not texts:
+        return []
+    out = model.encode(texts, output_value="token_embeddings", batch_size=EMBED_BATCH_SIZE)
+    matrices = []
+    for tokens in out:
+        if hasattr(tokens, "cpu"):
+            tokens = tokens.float().cpu().numpy()
+        tokens = np.asarray(tokens, dtype=np.float32)
+        norms = np.linalg.norm(tokens, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrices.append(tokens / norms)
+    return matrices
+
+
+def _quantize(tokens: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 codes and a scale per token row."""
+    scales = np.abs(tokens).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(tokens / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class DocumentTokenEmbeddings(DocumentTokens):
+    """
+    Memory-mapped document → int8 token embeddings table for one model.
+    """
+
+    DIR_NAME = LATE_DIR
+
+    def __init__(self, directory: Path):
+        super().__init__(directory)
+        self.scales = np.load(self.directory / "scales.npy", mmap_mode="r")
+
+    @staticmethod
+    def build(directory: Path, model, documents: list[tuple], manifest: dict):
+        """Encode every document's tokens and write the table."""
+        directory = Path(directory)
+        texts = [document for _, document in documents]
+
+        codes, scales = [], []
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            for i, tokens in enumerate(_token_embeddings(model, texts[start:start + EMBED_BATCH_SIZE])):
+                c, s = _quantize(tokens)
+                codes.append(c)
+                scales.append(s)
+                offsets[start + i + 1] = offsets[start + i] + len(c)
+
+        dim = codes[0].shape[1] if codes else 0
+        hashes = np.array([_text_hash(t) for t in texts], dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        np.save(tmp_dir / "tokens.npy", np.concatenate(codes) if codes else np.zeros((0, dim), np.int8))
+        np.save(tmp_dir / "scales.npy", np.concatenate(scales) if scales else np.zeros(0, np.float32))
+        np.save(tmp_dir / "offsets.npy", offsets)
+        np.save(tmp_dir / "hashes.npy", hashes[order])
+        np.save(tmp_dir / "rows.npy", order.astype(np.int64))
+        (tmp_dir / "manifest.json").write_text(
+            json.dumps({**manifest, "dim": dim, "rows": len(texts), "tokens": int(offsets[-1])}),
+            encoding="utf-8",
+        )
+
+        if directory.exists():
+            shutil.rmtree(directory)
+        tmp_dir.rename(directory)
+
+    def lookup(self, document: str) -> Optional[tuple]:
+        """(int8 codes, scales) for document, or None if it is not in the table."""
+        row = self._row(document)
+        if row is None:
+            return None
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.tokens[start:end], self.scales[start:end]
+
+
+def maxsim_scores(query_tokens: np.ndarray, doc_tokens: list[tuple]) -> list[float]:
+    """
+    Mean over query tokens of the max similarity to each document's tokens.
+    `doc_tokens` holds (int8 codes, scales) per document.
+    """
+    if not doc_tokens:
+        return []
+    lengths = np.array([len(codes) for codes, _ in doc_tokens])
+    codes = np.concatenate([c for c, _ in doc_tokens]).astype(np.float32)
+    scales = np.concatenate([s for _, s in doc_tokens])
+
+    sims = (query_tokens @ codes.T) * scales                    # (query tokens, all doc tokens)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    best = np.maximum.reduceat(sims, starts, axis=1)             # (query tokens, docs)
+    return [float(s) for s in best.mean(axis=0)]
+
+
+class MaxSimReranker:
+    """
+    Reranker interface (`score_batch`) backed by late-interaction scoring.
+    """
+
+    def __init__(self, model_name: str, device=None, models=None, inference_backend="torch"):
+        self.model_name = model_name
+        self.device = device
+        self.models = models or registry
+        self.inference_backend = inference_backend
+        self.doc_embeddings = None  # DocumentTokenEmbeddings (or federated), optional
+
+    @property
+    def model(self):
+        return self.models.encoder(self.model_name, self.device, self.inference_backend)
+
+    def score_batch(self, queries: list[str], documents: list[list[str]]) -> list[list[float]]:
+        """
+        Score every query against its documents; each distinct query is
+        encoded once. Documents missing from the table are encoded here.
+        """
+        unique = list(dict.fromkeys(q for q, docs in zip(queries, documents) if docs))
+        query_tokens = dict(zip(unique, _token_embeddings(self.model, unique)))
+
+        all_docs = list(dict.fromkeys(doc for docs in documents for doc in docs))
+        tokens = {}
+        if self.doc_embeddings is not None:
+            for doc in all_docs:
+                found = self.doc_embeddings.lookup(doc)
+                if found is not None:
+                    tokens[doc] = found
+        missing = [doc for doc in all_docs if doc not in tokens]
+        for doc, matrix in zip(missing, _token_embeddings(self.model, missing)):
+            tokens[doc] = _quantize(matrix)
+
+        return [
+            maxsim_scores(query_tokens[query], [tokens[doc] for doc in docs]) if docs else []
+            for query, docs in zip(queries, documents)
+        ]
@@ -0,0 +1,370 @@
+"""
+search/lexical.py
+
+BM25 inverted index stored next to the Chroma data, fused with dense
+retrieval by reciprocal-rank fusion.
+
+The index lives beside the extracted index directory rather than inside
+it (`index_db/<index>.bm25_index/` for `index_db/<index>/`), so it survives
+the re-extraction a refreshed download does and the next update only
+tokenises what changed.
+
+Layout of the BM25 directory:
+    manifest.json   — segment list, tombstoned rows, corpus length
+                      statistics and the name of the current docs file
+    docs-NNN.json   — per-document (hash, segment, row), read by updates only
+    seg-NNN/
+        terms.npy       — sorted vocabulary (fixed-width unicode)
+        offsets.npy     — int64, postings range per term (len(terms) + 1)
+        postings.npy    — int32 segment-local row per posting
+        freqs.npy       — float32 term frequency per posting
+        doc_lengths.npy — int32 token count per row
+        doc_ids.npy     — record id per row
+
+All arrays are memory-mapped, and an index already synced with the current
+index version opens with a single read of the small manifest. Updates are
+incremental: only new or changed documents are tokenised into a
+fresh segment and the rows they replace are tombstoned. Segments are
+compacted into one when there are too many or too much is tombstoned.
+Document frequencies include tombstoned rows until the next compaction.
+"""
+
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from .cache import index_version
+
+
+LEXICAL_DIR = "bm25_index"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+MAX_TERM_CHARS = 32
+MAX_SEGMENTS = 8
+MAX_DELETED_FRACTION = 0.25
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased alphanumeric runs, truncated to MAX_TERM_CHARS."""
+    return [t[:MAX_TERM_CHARS] for t in _TOKEN_RE.findall(text.lower())]
+
+
+def _doc_hash(document: str) -> str:
+    return hashlib.sha1(document.encode("utf-8")).hexdigest()[:16]
+
+
+def lexical_dir(persist_dir: Path) -> Path:
+    """BM25 directory for the index extracted at persist_dir."""
+    persist_dir = Path(persist_dir).resolve()
+    return persist_dir.with_name(f"{persist_dir.name}.{LEXICAL_DIR}")
+
+
+def _write_manifest(path: Path, manifest: dict):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def _read_manifest(directory: Path) -> dict:
+    """The manifest plus its "docs" map, or a fresh one."""
+    manifest_path = directory / MANIFEST_FILE
+    manifest = None
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest is None or manifest.get("format") != FORMAT_VERSION:
+        return {
+            "format":       FORMAT_VERSION,
+            "segments":     [],
+            "next_segment": 0,
+            "generation":   0,
+            "docs_file":    None,
+            "docs":         {},
+            "deleted":      {},
+            "doc_count":    0,
+            "total_length": 0,
+        }
+
+    docs_file = manifest["docs_file"]
+    manifest["docs"] = (
+        json.loads((directory / docs_file).read_text(encoding="utf-8")) if docs_file else {}
+    )
+    return manifest
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int = RRF_K) -> list:
+    """Merge ranked id lists; ties keep first-seen order."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+class Segment:
+    """
+    Read-only, memory-mapped view of one BM25 segment.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.terms = np.load(self.directory / "terms.npy", mmap_mode="r")
+        self.offsets = np.load(self.directory / "offsets.npy", mmap_mode="r")
+        self.postings = np.load(self.directory / "postings.npy", mmap_mode="r")
+        self.freqs = np.load(self.directory / "freqs.npy", mmap_mode="r")
+        self.doc_lengths = np.load(self.directory / "doc_lengths.npy", mmap_mode="r")
+        self.doc_ids = np.load(self.directory / "doc_ids.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.doc_lengths.shape[0]
+
+    def lookup(self, term: str):
+        """Postings slice bounds for term, or None."""
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return int(self.offsets[i]), int(self.offsets[i + 1])
+        return None
+
+    @staticmethod
+    def write(directory: Path, documents: list[tuple]):
+        """
+        Write (id, document) pairs as a new segment directory.
+        """
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        postings_by_term = {}
+        doc_lengths = []
+        for row, (_, document) in enumerate(documents):
+            tokens = tokenize(document)
+            doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, count in counts.items():
+                postings_by_term.setdefault(term, []).append((row, count))
+
+        terms = sorted(postings_by_term)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings, freqs = [], []
+        for i, term in enumerate(terms):
+            rows = postings_by_term[term]
+            postings.extend(r for r, _ in rows)
+            freqs.extend(c for _, c in rows)
+            offsets[i + 1] = len(postings)
+
+        np.save(tmp_dir / "terms.npy", np.array(terms, dtype=f"<U{MAX_TERM_CHARS}"))
+        np.save(tmp_dir / "offsets.npy", offsets)
+        np.save(tmp_dir / "postings.npy", np.array(postings, dtype=np.int32))
+        np.save(tmp_dir / "freqs.npy", np.array(freqs, dtype=np.float32))
+        np.save(tmp_dir / "doc_lengths.npy", np.array(doc_lengths, dtype=np.int32))
+        np.save(tmp_dir / "doc_ids.npy", np.array([str(i) for i, _ in documents], dtype=str))
+
+        if directory.exists():
+            shutil.rmtree(directory)
+        tmp_dir.rename(directory)
+
+        return doc_lengths
+
+
+class LexicalIndex:
+    """
+    Segmented BM25 index over the tool documents of one index directory.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+        self.segments = [Segment(self.directory / name) for name in self.manifest["segments"]]
+
+        # Tombstoned rows, as boolean masks aligned with each segment
+        self.deleted = []
+        for name, segment in zip(self.manifest["segments"], self.segments):
+            mask = np.zeros(len(segment), dtype=bool)
+            rows = self.manifest["deleted"].get(name, [])
+            if rows:
+                mask[rows] = True
+            self.deleted.append(mask)
+
+        self.doc_count = self.manifest["doc_count"]
+        self.avg_length = self.manifest["total_length"] / self.doc_count if self.doc_count else 0.0
+
+    # --------------------------------------------------
+    # BUILD / UPDATE
+    # --------------------------------------------------
+
+    @classmethod
+    def open(cls, persist_dir: Path, documents: Iterable[tuple]) -> "LexicalIndex":
+        """
+        Bring the BM25 index for persist_dir up to date with `documents` —
+        an iterable of (id, document) — and open it.
+        """
+        directory = lexical_dir(persist_dir)
+        version = index_version(persist_dir)
+
+        manifest_path = directory / MANIFEST_FILE
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("format") == FORMAT_VERSION and manifest.get("index_version") == version:
+                return cls(directory)
+
+        cls.update(directory, documents, version=version)
+        return cls(directory)
+
+    @staticmethod
+    def update(directory: Path, documents: Iterable[tuple], version: str = None) -> dict:
+        """
+        Incrementally sync the index with `documents` and stamp it with
+        `version`. Returns counts of added, removed and unchanged documents.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = directory / MANIFEST_FILE
+
+        manifest = _read_manifest(directory)
+        old_docs_file = manifest["docs_file"]
+
+        current = {str(i): (doc or "") for i, doc in documents}
+        hashes = {i: _doc_hash(doc) for i, doc in current.items()}
+        known = manifest["docs"]
+
+        added = [i for i, h in hashes.items() if i not in known or known[i][0] != h]
+        removed = [i for i in known if i not in hashes or known[i][0] != hashes[i]]
+        stats = {"added": len(added), "removed": len(removed), "unchanged": len(hashes) - len(added)}
+
+        manifest["index_version"] = version
+
+        if not added and not removed:
+            if old_docs_file is None:
+                # Fresh manifest: the docs map still needs its file
+                LexicalIndex._commit(directory, manifest)
+            else:
+                _write_manifest(manifest_path, {k: v for k, v in manifest.items() if k != "docs"})
+            return stats
+
+        # Tombstone replaced / removed rows
+        lengths_by_segment = {}
+        for record_id in removed:
+            _, name, row = known.pop(record_id)
+            if name not in lengths_by_segment:
+                lengths_by_segment[name] = np.load(directory / name / "doc_lengths.npy", mmap_mode="r")
+            manifest["deleted"].setdefault(name, []).append(row)
+            manifest["total_length"] -= int(lengths_by_segment[name][row])
+            manifest["doc_count"] -= 1
+
+        deleted_rows = sum(len(rows) for rows in manifest["deleted"].values())
+        compact = (
+            len(manifest["segments"]) + 1 > MAX_SEGMENTS
+            or deleted_rows > MAX_DELETED_FRACTION * max(len(hashes), 1)
+        )
+
+        old_segments = list(manifest["segments"])
+        if compact:
+            # Rewrite everything as one segment
+            pending = list(current.items())
+            manifest.update(segments=[], docs={}, deleted={}, doc_count=0, total_length=0)
+        else:
+            pending = [(i, current[i]) for i in added]
+
+        if pending:
+            name = f"seg-{manifest['next_segment']:03d}"
+            manifest["next_segment"] += 1
+            lengths = Segment.write(directory / name, pending)
+            manifest["segments"].append(name)
+            for row, ((record_id, _), length) in enumerate(zip(pending, lengths)):
+                manifest["docs"][record_id] = [hashes[record_id], name, row]
+            manifest["doc_count"] += len(pending)
+            manifest["total_length"] += sum(lengths)
+
+        # Drop segments whose rows are all tombstoned
+        live = {name for _, name, _ in manifest["docs"].values()}
+        manifest["segments"] = [s for s in manifest["segments"] if s in live]
+        manifest["deleted"] = {s: r for s, r in manifest["deleted"].items() if s in live}
+
+        LexicalIndex._commit(directory, manifest)
+
+        for name in old_segments:
+            if name not in manifest["segments"]:
+                shutil.rmtree(directory / name, ignore_errors=True)
+        if old_docs_file:
+            (directory / old_docs_file).unlink(missing_ok=True)
+
+        return stats
+
+    @staticmethod
+    def _commit(directory: Path, manifest: dict):
+        """
+        Write the docs map to a new generation file, then the manifest
+        that points at it; the manifest replace is what commits the update.
+        """
+        manifest["generation"] += 1
+        manifest["docs_file"] = f"docs-{manifest['generation']:03d}.json"
+        (directory / manifest["docs_file"]).write_text(json.dumps(manifest["docs"]), encoding="utf-8")
+        _write_manifest(directory / MANIFEST_FILE, {k: v for k, v in manifest.items() if k != "docs"})
+
+    # --------------------------------------------------
+    # QUERY
+    # --------------------------------------------------
+
+    def search(self, query: str, k: int) -> list[tuple]:
+        """
+        Top-k documents for query by BM25. Returns (id, score), best first.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return []
+
+        # Global document frequency per term, summed over segments
+        bounds = [[segment.lookup(term) for term in terms] for segment in self.segments]
+        df = np.zeros(len(terms), dtype=np.float64)
+        for per_term in bounds:
+            for j, b in enumerate(per_term):
+                if b is not None:
+                    df[j] += b[1] - b[0]
+        df = np.minimum(df, self.doc_count)
+        idf = np.log1p((self.doc_count - df + 0.5) / (df + 0.5))
+
+        hits = []
+        for segment, mask, per_term in zip(self.segments, self.deleted, bounds):
+            scores = np.zeros(len(segment), dtype=np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.doc_lengths / max(self.avg_length, 1e-9))
+            touched = False
+
+            for j, b in enumerate(per_term):
+                if b is None:
+                    continue
+                rows = segment.postings[b[0]:b[1]]
+                tf = segment.freqs[b[0]:b[1]]
+                scores[rows] += idf[j] * tf * (BM25_K1 + 1) / (tf + norm[rows])
+                touched = True
+
+            if not touched:
+                continue
+
+            scores[mask] = 0.0
+            n = min(k, int(np.count_nonzero(scores)))
+            if n == 0:
+                continue
+            top = np.argpartition(-scores, n - 1)[:n]
+            hits.extend((str(segment.doc_ids[r]), float(scores[r])) for r in top)
+
+        hits.sort(key=lambda h: h[1], reverse=True)
+        return hits[:k]
+
+    def search_batch(self, queries: list[str], k: int) -> list[list[str]]:
+        """Top-k ids per query."""
+        return [[i for i, _ in self.search(q, k)] for q in queries]
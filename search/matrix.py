@@ -0,0 +1,206 @@
+"""
+search/matrix.py
+
+On-disk matrix format shared by the NumPy and sharded retrieval backends.
+
+A matrix directory holds:
+    embeddings.npy  — (N, dim) float32, rows L2-normalised
+    records/        — record table, row-aligned with embeddings.npy
+                      (memory-mapped, see search/records.py)
+    manifest.json   — row count, dimension and the index version it came from
+
+Directories are written to a temporary sibling and renamed into place, so
+readers never observe a half-written export.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .records import RECORDS_DIR, RecordTable, RecordWriter
+
+
+COLLECTION_NAME = "tools"
+EXPORT_PAGE_SIZE = 1000
+
+
+class MatrixShard:
+    """
+    Read-only, memory-mapped view of one matrix directory.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = read_manifest(self.directory)
+        self.embeddings = np.load(self.directory / "embeddings.npy", mmap_mode="r")
+        self.records = RecordTable(self.directory / RECORDS_DIR)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def iter_records(self) -> Iterable[tuple]:
+        return self.records.iter_records()
+
+    def topk(self, queries: np.ndarray, k: int) -> list[list[tuple]]:
+        """
+        Exact top-k by cosine similarity for pre-normalised queries.
+
+        Returns one list per query of (similarity, id), best first.
+        """
+        total = len(self)
+        k = min(k, total)
+        if k == 0:
+            return [[] for _ in queries]
+
+        # One matrix product for the whole batch
+        sims = queries @ self.embeddings.T
+
+        if k < total:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(total), (len(queries), total))
+
+        hits = []
+        for row, cand in zip(sims, top):
+            order = cand[np.argsort(-row[cand], kind="stable")]
+            hits.append([(float(row[i]), self.records.id(i)) for i in order])
+        return hits
+
+
+def hits_to_results(hits: list[list[tuple]]) -> dict:
+    """
+    Convert per-query (similarity, id) lists into Chroma's nested-list
+    result shape. Distances are squared L2 between unit vectors, matching
+    Chroma's "l2" space.
+    """
+    return {
+        "ids":       [[h[1] for h in row] for row in hits],
+        "distances": [[2.0 - 2.0 * h[0] for h in row] for row in hits],
+    }
+
+
+# ------------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------------
+
+def open_collection(persist_dir: Path):
+    from .models import registry
+
+    client = registry.chroma_client(persist_dir)
+    return client.get_or_create_collection(COLLECTION_NAME)
+
+
+def iter_collection(
+    collection,
+    start: int = 0,
+    stop: Optional[int] = None,
+    include: Iterable[str] = ("embeddings", "documents", "metadatas"),
+) -> Iterable[dict]:
+    """
+    Page through rows [start, stop) of a Chroma collection.
+    """
+    if stop is None:
+        stop = collection.count()
+    for offset in range(start, stop, EXPORT_PAGE_SIZE):
+        yield collection.get(
+            include=list(include),
+            limit=min(EXPORT_PAGE_SIZE, stop - offset),
+            offset=offset,
+        )
+
+
+def write_matrix(out_dir: Path, pages: Iterable[dict], total: int, manifest: dict):
+    """
+    Stream Chroma-style pages ({"ids", "embeddings", "documents",
+    "metadatas"}) into a matrix directory without holding the whole matrix
+    or its documents in memory.
+    """
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per writer, so concurrent first exports never share a temp dir.
+    # The export is built one level down to get normal directory permissions.
+    staging_dir = Path(tempfile.mkdtemp(prefix=out_dir.name + ".", suffix=".tmp", dir=out_dir.parent))
+    tmp_dir = staging_dir / out_dir.name
+    try:
+        tmp_dir.mkdir()
+        _write_matrix(tmp_dir, pages, total, manifest)
+        _publish(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _write_matrix(tmp_dir: Path, pages: Iterable[dict], total: int, manifest: dict):
+    records = RecordWriter(tmp_dir / RECORDS_DIR)
+    matrix = None
+    row = 0
+    for page in pages:
+        vectors = normalize(np.asarray(page["embeddings"], dtype=np.float32))
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(
+                tmp_dir / "embeddings.npy",
+                mode="w+",
+                dtype=np.float32,
+                shape=(total, vectors.shape[1]),
+            )
+        matrix[row:row + len(vectors)] = vectors
+        row += len(vectors)
+        documents = page.get("documents") or [""] * len(page["ids"])
+        metadatas = page.get("metadatas") or [None] * len(page["ids"])
+        for record_id, document, metadata in zip(page["ids"], documents, metadatas):
+            records.add(record_id, document, metadata)
+
+    dim = 0
+    if matrix is None:
+        np.save(tmp_dir / "embeddings.npy", np.zeros((0, 0), dtype=np.float32))
+    else:
+        dim = matrix.shape[1]
+        matrix.flush()
+        del matrix
+
+    count = records.close()
+    (tmp_dir / "manifest.json").write_text(
+        json.dumps({**manifest, "count": count, "dim": dim}, indent=2),
+        encoding="utf-8",
+    )
+
+
+def _publish(tmp_dir: Path, out_dir: Path):
+    """
+    Move a finished directory into place. An existing directory is moved
+    aside first, since a rename cannot replace a non-empty one; if another
+    writer publishes in between, the move is retried and the last one wins.
+    """
+    while True:
+        try:
+            os.replace(tmp_dir, out_dir)
+            return
+        except OSError:
+            if not out_dir.exists():
+                raise
+        old_dir = Path(tempfile.mkdtemp(prefix=out_dir.name + ".", suffix=".old", dir=out_dir.parent))
+        try:
+            os.replace(out_dir, old_dir / out_dir.name)
+        except FileNotFoundError:
+            pass        # another writer moved it first
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_manifest(directory: Path) -> dict:
+    path = Path(directory) / "manifest.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
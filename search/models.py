@@ -0,0 +1,117 @@
+"""
+search/models.py
+
+Process-wide registry of loaded models and Chroma clients.
+
+Encoders and cross-encoders are keyed by (model name, device, inference
+backend) and loaded lazily on first use; every SemanticSearcher / Reranker
+in the process then shares the same instance, including across threads.
+Chroma clients are shared per persist directory. `release()` drops
+everything (or a single model) so long-running hosts can free memory
+between builds.
+"""
+
+import gc
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .inference import load_cross_encoder, load_encoder
+
+
+class ModelRegistry:
+    """
+    Lazily loads and shares models and clients keyed by name, device and
+    inference backend.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------
+
+    def encoder(self, model_name: str, device: Optional[str] = None, backend: str = "torch"):
+        return self._get(
+            ("encoder", model_name, device, backend),
+            lambda: load_encoder(model_name, device=device, backend=backend),
+        )
+
+    def cross_encoder(self, model_name: str, device: Optional[str] = None, backend: str = "torch"):
+        return self._get(
+            ("cross_encoder", model_name, device, backend),
+            lambda: load_cross_encoder(model_name, device=device, backend=backend),
+        )
+
+    def chroma_client(self, persist_dir: Path):
+        persist_dir = str(Path(persist_dir).resolve())
+
+        def load():
+            from chromadb import PersistentClient
+            return PersistentClient(path=persist_dir)
+
+        return self._get(("chroma", persist_dir, None, None), load)
+
+    def loaded(self) -> list[tuple]:
+        """Keys of every instance currently held."""
+        with self._lock:
+            return list(self._instances)
+
+    def release(self, name: Optional[str] = None):
+        """
+        Drop loaded instances so they can be garbage collected.
+        With `name`, only instances for that model / persist dir are dropped.
+        """
+        with self._lock:
+            for key in list(self._instances):
+                if name is None or key[1] == name:
+                    del self._instances[key]
+                    self._key_locks.pop(key, None)
+
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    # --------------------------------------------------
+    # INTERNAL
+    # --------------------------------------------------
+
+    def _get(self, key: tuple, load):
+        with self._lock:
+            if key in self._instances:
+                return self._instances[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Loading happens outside the registry lock so different models
+        # can load concurrently; the per-key lock stops duplicate loads.
+        with key_lock:
+            with self._lock:
+                if key in self._instances:
+                    return self._instances[key]
+
+            instance = load()
+
+            with self._lock:
+                self._instances[key] = instance
+            return instance
+
+
+def model_cache_key(model_name: str, inference_backend: str) -> str:
+    """
+    Key used for SearchCache entries. Quantised backends produce slightly
+    different outputs, so they get their own entries.
+    """
+    if inference_backend == "torch":
+        return model_name
+    return f"{model_name}@{inference_backend}"
+
+
+# Shared by every searcher in the process
+registry = ModelRegistry()
@@ -0,0 +1,188 @@
+"""
+search/profiles.py
+
+Named search profiles: speed / accuracy presets for a build.
+
+A profile bundles retrieval depth (`top_k`), how many candidates reach the
+cross-encoder (`rerank_depth`, 0 ranks by dense distance alone), HNSW
+search breadth (`search_ef`, Chroma only) and the models. A profile may
+name an embedding tier: an extra Chroma collection shipped in the same
+index, holding the same records embedded with a smaller encoder. The
+tier's encoder is recorded in its collection metadata by `build_tier`.
+
+`testing/eval_profiles.py` measures every profile on the eval set and
+saves the numbers to `<workspace>/profile_recall.json`, which
+`toolstorepy profiles` prints next to the settings.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .matrix import COLLECTION_NAME, iter_collection, open_collection
+from .models import registry
+
+logger = logging.getLogger("ToolStorePy")
+
+DEFAULT_PROFILE = "balanced"
+MEASUREMENTS_FILE = "profile_recall.json"
+TIER_ENCODE_BATCH = 256
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+    top_k: int
+    rerank_depth: Optional[int]     # None reranks every candidate
+    search_ef: Optional[int]        # None keeps the index's HNSW setting; can only widen it
+    encoder_model: str
+    cross_encoder_model: str
+    tier: Optional[str] = None      # embedding tier, falls back to the main collection
+    description: str = ""
+
+
+SEARCH_PROFILES = {
+    "fast": SearchProfile(
+        top_k=5,
+        rerank_depth=0,
+        search_ef=None,
+        encoder_model="all-MiniLM-L6-v2",
+        cross_encoder_model="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        tier="fast",
+        description="Small-encoder tier, top-5 retrieval, no reranking",
+    ),
+    "balanced": SearchProfile(
+        top_k=10,
+        rerank_depth=None,
+        search_ef=None,
+        encoder_model="all-MiniLM-L6-v2",
+        cross_encoder_model="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        description="Default: top-10 retrieval, every candidate reranked",
+    ),
+    "accurate": SearchProfile(
+        top_k=30,
+        rerank_depth=None,
+        search_ef=200,
+        encoder_model="all-MiniLM-L6-v2",
+        cross_encoder_model="cross-encoder/ms-marco-MiniLM-L-12-v2",
+        description="Wide HNSW search, top-30 reranked by a 12-layer cross-encoder",
+    ),
+}
+
+
+def get_profile(name: str) -> SearchProfile:
+    if name not in SEARCH_PROFILES:
+        available = ", ".join(SEARCH_PROFILES.keys())
+        raise ValueError(
+            f"Unknown search profile '{name}'. "
+            f"Available profiles: {available}"
+        )
+    return SEARCH_PROFILES[name]
+
+
+# ------------------------------------------------------------------
+# Embedding tiers
+# ------------------------------------------------------------------
+
+def tier_collection(tier: str) -> str:
+    return f"{COLLECTION_NAME}_{tier}"
+
+
+def tier_encoder(persist_dir: Path, tier: str) -> Optional[str]:
+    """Encoder of an index's embedding tier, or None if it has no such tier."""
+    client = registry.chroma_client(Path(persist_dir))
+    names = {getattr(c, "name", c) for c in client.list_collections()}
+    if tier_collection(tier) not in names:
+        return None
+    metadata = client.get_collection(tier_collection(tier)).metadata or {}
+    return metadata.get("encoder")
+
+
+def build_tier(persist_dir: Path, tier: str, encoder_model: str, device: Optional[str] = None) -> int:
+    """
+    (Re)embed every record of the main collection with `encoder_model`
+    into the tier collection. Returns the number of records written.
+    """
+    persist_dir = Path(persist_dir)
+    client = registry.chroma_client(persist_dir)
+    source = open_collection(persist_dir)
+    encoder = registry.encoder(encoder_model, device)
+
+    name = tier_collection(tier)
+    if name in {getattr(c, "name", c) for c in client.list_collections()}:
+        client.delete_collection(name)
+    target = client.create_collection(name, metadata={"encoder": encoder_model})
+
+    written = 0
+    for page in iter_collection(source, include=["documents", "metadatas"]):
+        documents = page["documents"] or [""] * len(page["ids"])
+        for start in range(0, len(documents), TIER_ENCODE_BATCH):
+            end = start + TIER_ENCODE_BATCH
+            target.add(
+                ids=page["ids"][start:end],
+                embeddings=[e.tolist() for e in encoder.encode(documents[start:end])],
+                documents=documents[start:end],
+                metadatas=(page.get("metadatas") or [None] * len(documents))[start:end],
+            )
+        written += len(documents)
+    return written
+
+
+# ------------------------------------------------------------------
+# Resolution
+# ------------------------------------------------------------------
+
+def profile_settings(
+    profile: SearchProfile, persist_dirs: list, backend: str = "chroma", use_tier: bool = True,
+) -> dict:
+    """
+    SemanticSearcher keyword arguments for a profile over the given
+    indexes. The embedding tier is used only when `use_tier` is set, the
+    backend is Chroma and every index ships the tier with the same
+    encoder; otherwise search falls back to the main collection and the
+    profile's encoder.
+    """
+    settings = {
+        "encoder_model":       profile.encoder_model,
+        "cross_encoder_model": profile.cross_encoder_model,
+        "top_k":               profile.top_k,
+        "rerank_depth":        profile.rerank_depth,
+        "backend_options":     {},
+    }
+    if backend != "chroma":
+        return settings
+
+    if profile.search_ef is not None:
+        settings["backend_options"]["search_ef"] = profile.search_ef
+
+    if profile.tier and use_tier:
+        encoders = {tier_encoder(d, profile.tier) for d in persist_dirs}
+        if len(encoders) == 1 and None not in encoders:
+            settings["encoder_model"] = encoders.pop()
+            settings["backend_options"]["collection"] = tier_collection(profile.tier)
+        else:
+            logger.warning(
+                f"[PROFILE] Index has no '{profile.tier}' embedding tier "
+                f"(build it with `toolstorepy index tier`); using the main collection."
+            )
+    return settings
+
+
+# ------------------------------------------------------------------
+# Measurements
+# ------------------------------------------------------------------
+
+def load_measurements(workspace: Path) -> dict:
+    """Profile name → measured metrics from the last eval run, if any."""
+    path = Path(workspace) / MEASUREMENTS_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_measurements(workspace: Path, measurements: dict):
+    path = Path(workspace) / MEASUREMENTS_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(measurements, indent=2), encoding="utf-8")
+
@@ -0,0 +1,389 @@
+"""
+search/quantize.py
+
+Compressed embedding storage for the tool index.
+
+Two code formats are supported, both built from the float32 matrix export
+(see search/matrix.py) and stored next to it:
+
+  int8  — per-dimension symmetric scalar quantisation, 1 byte per dimension
+  pq    — product quantisation, 1 byte per sub-vector (dim / PQ_SUBVECTOR_DIM)
+
+Search scans the codes with vectorised NumPy, over-fetches
+`rescore_factor * k` candidates and, when the float matrix is available,
+re-scores only those candidates with exact float similarities.
+
+Codes carry a content fingerprint of their records, so codes shipped in an
+index archive are accepted after extraction (which changes the index
+version) as long as they match the index content. An index that ships
+codes alone is used as-is.
+"""
+
+import abc
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .cache import index_version
+from .matrix import MatrixShard, hits_to_results, normalize, read_manifest
+from .records import RECORDS_DIR, RecordTable, content_fingerprint
+
+logger = logging.getLogger("ToolStorePy")
+
+QUANTIZED_DIR_PREFIX = "quantized_"
+SCAN_BLOCK_ROWS = 16384
+ENCODE_BLOCK_ROWS = 1024
+
+PQ_SUBVECTOR_DIM = 8
+PQ_CENTROIDS = 256
+PQ_TRAIN_ROWS = 20000
+PQ_KMEANS_ITERS = 20
+RANDOM_SEED = 42
+
+
+class QuantizedBackend(abc.ABC):
+    """
+    Retrieval over int8 or product-quantised codes with optional float re-score.
+    """
+
+    name = "quantized"
+    scheme = None
+
+    def __init__(self, persist_dir: Path, rescore: bool = True, rescore_factor: int = 4):
+        from .backends import NumpyBackend
+
+        self.persist_dir = Path(persist_dir)
+        self.codes_dir = self.persist_dir / f"{QUANTIZED_DIR_PREFIX}{self.scheme}"
+        self.rescore_factor = max(1, rescore_factor)
+
+        version = index_version(self.persist_dir)
+        if not self._codes_current(version):
+            build_codes(NumpyBackend(self.persist_dir).matrix, self.codes_dir, self.scheme, version)
+
+        self.codes = np.load(self.codes_dir / "codes.npy", mmap_mode="r")
+        self.params = dict(np.load(self.codes_dir / "params.npz"))
+        self.records = RecordTable(self.codes_dir / RECORDS_DIR)
+
+        # Float vectors are only read for the final candidates; an index
+        # shipped with codes alone simply skips the re-score step.
+        self.float_matrix = None
+        if rescore:
+            self.float_matrix = self._open_float_matrix(version)
+
+    def query(self, query_embeddings, n_results: int) -> dict:
+        queries = normalize(query_embeddings)
+        total = len(self.records)
+        k = min(n_results, total)
+        if k == 0:
+            return hits_to_results([[] for _ in queries])
+
+        fetch = min(total, k * self.rescore_factor) if self.float_matrix is not None else k
+        approx = self._scan(queries, fetch)
+
+        hits = []
+        for q, cand in zip(queries, approx):
+            if self.float_matrix is not None:
+                cand = np.sort(cand)
+                exact = np.asarray(self.float_matrix.embeddings[cand]) @ q
+                top = np.argsort(-exact, kind="stable")[:k]
+                order, sims = cand[top], exact[top]
+            else:
+                order = cand[:k]
+                sims = self._approx_scores(q[None, :], order)[0]
+            hits.append([(float(s), self.records.id(i)) for s, i in zip(sims, order)])
+        return hits_to_results(hits)
+
+    def record_tables(self) -> list[RecordTable]:
+        return [self.records]
+
+    def _open_float_matrix(self, version: str) -> Optional[MatrixShard]:
+        """
+        The float export, if it is current and row-aligned with the codes.
+        Re-scoring indexes it by code row, so anything else would mix rows up.
+        """
+        from .backends import NumpyBackend
+
+        float_dir = self.persist_dir / "numpy_index"
+        if (self.persist_dir / "chroma.sqlite3").exists():
+            # Re-exported from Chroma when stale
+            matrix = NumpyBackend(self.persist_dir).matrix
+        elif (float_dir / "embeddings.npy").exists() and RecordTable.exists(float_dir / RECORDS_DIR):
+            matrix = MatrixShard(float_dir)
+        else:
+            return None
+        if matrix.manifest.get("index_version") != version or not matrix.records.same_ids(self.records):
+            logger.warning(
+                f"[QUANTIZE] {float_dir} does not match {self.codes_dir.name}; searching without re-score"
+            )
+            return None
+        return matrix
+
+    def _codes_current(self, version: str) -> bool:
+        manifest = read_manifest(self.codes_dir)
+        if not RecordTable.exists(self.codes_dir / RECORDS_DIR):
+            return False
+        if manifest.get("index_version") == version:
+            return True
+        if not manifest.get("fingerprint"):
+            return False
+
+        # Version mismatch: the codes may still have shipped with this exact
+        # content in the index archive
+        source = _index_records(self.persist_dir)
+        if source is not None and content_fingerprint(source) != manifest["fingerprint"]:
+            return False
+        manifest["index_version"] = version
+        (self.codes_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        return True
+
+    def iter_records(self):
+        return self.records.iter_records()
+
+    # --------------------------------------------------
+    # CODE SCAN
+    # --------------------------------------------------
+
+    def _scan(self, queries: np.ndarray, k: int) -> np.ndarray:
+        """Top-k row indices per query by approximate score, best first."""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        total = len(self.records)
+        for start in range(0, total, SCAN_BLOCK_ROWS):
+            rows = np.arange(start, min(start + SCAN_BLOCK_ROWS, total))
+            scores = self._approx_scores(queries, rows)
+            all_scores = np.concatenate([best_scores, scores], axis=1)
+            all_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+            keep = min(k, all_scores.shape[1])
+            top = np.argpartition(-all_scores, keep - 1, axis=1)[:, :keep]
+            best_scores = np.take_along_axis(all_scores, top, axis=1)
+            best_rows = np.take_along_axis(all_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1)
+
+    @abc.abstractmethod
+    def _approx_scores(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Approximate similarities, shape (len(queries), len(rows))."""
+
+
+class Int8Backend(QuantizedBackend):
+    """
+    Scalar int8 codes: x ≈ codes * scale, so q·x ≈ codes · (q * scale).
+    """
+
+    name = "int8"
+    scheme = "int8"
+
+    def _approx_scores(self, queries, rows):
+        scaled = queries * self.params["scale"]
+        block = np.asarray(self.codes[rows], dtype=np.float32)
+        return scaled @ block.T
+
+
+class PQBackend(QuantizedBackend):
+    """
+    Product-quantised codes scored with asymmetric distance tables.
+    """
+
+    name = "pq"
+    scheme = "pq"
+
+    def _approx_scores(self, queries, rows):
+        centroids = self.params["centroids"]          # (M, C, dsub)
+        m, _, dsub = centroids.shape
+        subq = queries.reshape(len(queries), m, dsub)
+        # (nq, M, C) inner products of each query sub-vector with each centroid
+        tables = np.einsum("qmd,mcd->qmc", subq, centroids)
+        codes = np.asarray(self.codes[rows], dtype=np.intp)     # (n, M)
+        sub_index = np.arange(m)
+        return np.stack([t[sub_index, codes].sum(axis=1) for t in tables])
+
+
+QUANTIZED_BACKENDS = {
+    "int8": Int8Backend,
+    "pq": PQBackend,
+}
+
+
+# ------------------------------------------------------------------
+# Building
+# ------------------------------------------------------------------
+
+def build_codes(matrix: MatrixShard, out_dir: Path, scheme: str, version: str):
+    """
+    Quantise a float matrix export into out_dir.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    vectors = matrix.embeddings
+    if scheme == "int8":
+        params, encode = _train_int8(vectors)
+    elif scheme == "pq":
+        params, encode = _train_pq(vectors)
+    else:
+        raise ValueError(f"Unknown quantisation scheme '{scheme}'.")
+
+    first = encode(np.asarray(vectors[:1])) if len(vectors) else np.zeros((1, 0), np.uint8)
+    codes = np.lib.format.open_memmap(
+        tmp_dir / "codes.npy",
+        mode="w+",
+        dtype=first.dtype,
+        shape=(len(vectors), first.shape[1]),
+    )
+    for start in range(0, len(vectors), ENCODE_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ENCODE_BLOCK_ROWS], dtype=np.float32)
+        codes[start:start + len(block)] = encode(block)
+    codes.flush()
+    del codes
+
+    np.savez(tmp_dir / "params.npz", **params)
+    # Codes are self-contained, so an index can ship them without the matrix
+    shutil.copytree(matrix.records.directory, tmp_dir / RECORDS_DIR)
+    (tmp_dir / "manifest.json").write_text(
+        json.dumps({
+            "index_version": version,
+            "fingerprint": content_fingerprint(matrix.iter_records()),
+            "scheme": scheme,
+            "count": len(matrix),
+        }, indent=2),
+        encoding="utf-8",
+    )
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    tmp_dir.rename(out_dir)
+
+
+def _index_records(persist_dir: Path):
+    """
+    Records of the index the codes were built from, or None when the
+    index directory holds nothing but codes.
+    """
+    from .backends import ChromaBackend
+
+    if (persist_dir / "chroma.sqlite3").exists():
+        return ChromaBackend(persist_dir).iter_records()
+    float_dir = persist_dir / "numpy_index"
+    if RecordTable.exists(float_dir / RECORDS_DIR):
+        return RecordTable(float_dir / RECORDS_DIR).iter_records()
+    return None
+
+
+def _train_int8(vectors):
+    max_abs = np.zeros(vectors.shape[1] if vectors.ndim == 2 else 0, dtype=np.float32)
+    for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+        block = np.abs(np.asarray(vectors[start:start + SCAN_BLOCK_ROWS]))
+        max_abs = np.maximum(max_abs, block.max(axis=0))
+    scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+    def encode(block):
+        return np.clip(np.rint(block / scale), -127, 127).astype(np.int8)
+
+    return {"scale": scale}, encode
+
+
+def _train_pq(vectors):
+    dim = vectors.shape[1]
+    if dim % PQ_SUBVECTOR_DIM:
+        raise ValueError(
+            f"Embedding dimension {dim} is not divisible by "
+            f"PQ sub-vector size {PQ_SUBVECTOR_DIM}."
+        )
+    m = dim // PQ_SUBVECTOR_DIM
+
+    rng = np.random.default_rng(RANDOM_SEED)
+    sample_rows = np.sort(rng.choice(len(vectors), min(len(vectors), PQ_TRAIN_ROWS), replace=False))
+    sample = np.asarray(vectors[sample_rows], dtype=np.float32).reshape(-1, m, PQ_SUBVECTOR_DIM)
+    n_centroids = min(PQ_CENTROIDS, len(sample))
+
+    centroids = np.stack([
+        _kmeans(sample[:, j, :], n_centroids, rng) for j in range(m)
+    ]).astype(np.float32)
+
+    def encode(block):
+        sub = block.reshape(len(block), m, PQ_SUBVECTOR_DIM)
+        # Squared distance to each centroid, minimised per sub-space
+        dists = (
+            (sub ** 2).sum(-1)[:, :, None]
+            - 2 * np.einsum("nmd,mcd->nmc", sub, centroids)
+            + (centroids ** 2).sum(-1)[None, :, :]
+        )
+        return dists.argmin(axis=2).astype(np.uint8)
+
+    return {"centroids": centroids}, encode
+
+
+def _kmeans(points: np.ndarray, k: int, rng) -> np.ndarray:
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+    point_norms = (points ** 2).sum(-1)[:, None]
+    for _ in range(PQ_KMEANS_ITERS):
+        dists = point_norms - 2 * points @ centroids.T + (centroids ** 2).sum(-1)[None, :]
+        assign = dists.argmin(axis=1)
+        for c in range(k):
+            members = points[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+    return centroids
+
+
+# ------------------------------------------------------------------
+# Recall comparison
+# ------------------------------------------------------------------
+
+def compare_recall(
+    persist_dir: Path,
+    query_embeddings,
+    k: int = 10,
+    schemes=("int8", "pq"),
+) -> list[dict]:
+    """
+    Measure recall@k of each quantised format against exact float search.
+
+    `query_embeddings` should be real query embeddings: the index's own
+    vectors sit exactly on stored points and overstate recall. Returns one
+    row per format with recall, code size and mean query latency.
+    """
+    from .backends import NumpyBackend
+
+    queries = normalize(query_embeddings)
+    if not len(queries):
+        raise ValueError("compare_recall needs at least one query embedding.")
+    exact = NumpyBackend(persist_dir)
+
+    t0 = time.perf_counter()
+    truth = exact.query(queries, k)["ids"]
+    float_ms = (time.perf_counter() - t0) * 1000 / max(len(queries), 1)
+
+    report = [{
+        "format": "float32",
+        "recall_at_k": 1.0,
+        "bytes_per_vector": int(exact.matrix.embeddings.shape[1] * 4),
+        "ms_per_query": round(float_ms, 4),
+    }]
+
+    for scheme in schemes:
+        for rescore in (False, True):
+            backend = QUANTIZED_BACKENDS[scheme](persist_dir, rescore=rescore)
+            t0 = time.perf_counter()
+            got = backend.query(queries, k)["ids"]
+            ms = (time.perf_counter() - t0) * 1000 / max(len(queries), 1)
+            hits = sum(len(set(g) & set(t)) for g, t in zip(got, truth))
+            wanted = sum(len(t) for t in truth)
+            report.append({
+                "format": f"{scheme}+rescore" if rescore else scheme,
+                "recall_at_k": round(hits / wanted, 4) if wanted else 0.0,
+                "bytes_per_vector": int(backend.codes.shape[1] * backend.codes.dtype.itemsize),
+                "ms_per_query": round(ms, 4),
+            })
+
+    return report
@@ -0,0 +1,113 @@
+"""
+search/query_vectors.py
+
+Precomputed query embeddings stored next to a queries file.
+
+Query sets are authored once and built many times. `compile_queries` embeds
+a queries.json into `<queries>.vectors.npz`:
+    vectors — (N, dim) float32, row-aligned with the queries in the file
+    meta    — JSON: encoder, inference backend, dim, count, text hash
+
+`load_query_vectors` returns the vectors only when the sidecar was produced
+by the encoder the build searches with (the one the index was embedded
+with) and its text hash matches the current queries. Anything else is
+stale and ignored, so queries.json stays the source of truth.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .dedupe import dedupe_queries
+from .models import registry
+
+logger = logging.getLogger("ToolStorePy")
+
+SIDECAR_SUFFIX = ".vectors.npz"
+
+
+def sidecar_path(queries_path) -> Path:
+    """queries.json → queries.vectors.npz in the same directory."""
+    queries_path = Path(queries_path)
+    return queries_path.with_name(queries_path.stem + SIDECAR_SUFFIX)
+
+
+def text_hash(queries: list[str]) -> str:
+    digest = hashlib.sha256()
+    for query in queries:
+        digest.update(query.encode("utf-8") + b"\0")
+    return digest.hexdigest()[:16]
+
+
+def compile_queries(
+    queries_path,
+    queries: list[str],
+    encoder_model: str,
+    inference_backend: str = "torch",
+    device: Optional[str] = None,
+    models=None,
+) -> Path:
+    """
+    Embed queries exactly as SemanticSearcher would (normalised, repeats
+    encoded once) and write the sidecar. Returns its path.
+    """
+    if not queries:
+        raise ValueError("No queries to compile.")
+
+    unique, positions = dedupe_queries(queries)
+    encoder = (models or registry).encoder(encoder_model, device, inference_backend)
+    vectors = np.asarray(encoder.encode(unique), dtype=np.float32)[positions]
+
+    meta = {
+        "encoder":           encoder_model,
+        "inference_backend": inference_backend,
+        "dim":               int(vectors.shape[1]),
+        "count":             len(queries),
+        "text_hash":         text_hash(queries),
+    }
+
+    path = sidecar_path(queries_path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, vectors=vectors, meta=np.array(json.dumps(meta)))
+    tmp_path.replace(path)
+    return path
+
+
+def load_query_vectors(
+    queries_path,
+    queries: list[str],
+    encoder_model: str,
+    inference_backend: str = "torch",
+) -> Optional[np.ndarray]:
+    """
+    Vectors for queries from a valid sidecar, or None when it is missing
+    or stale.
+    """
+    path = sidecar_path(queries_path)
+    if not path.exists():
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            vectors = np.asarray(data["vectors"], dtype=np.float32)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"[QUERIES] Ignoring unreadable sidecar {path.name}: {e}")
+        return None
+
+    if meta.get("encoder") != encoder_model or meta.get("inference_backend") != inference_backend:
+        reason = f"encoded with {meta.get('encoder')} ({meta.get('inference_backend')})"
+    elif meta.get("count") != len(queries) or meta.get("text_hash") != text_hash(queries):
+        reason = "queries changed since it was compiled"
+    elif vectors.shape != (len(queries), meta.get("dim")):
+        reason = f"unexpected shape {vectors.shape}"
+    else:
+        return vectors
+
+    logger.info(f"[QUERIES] Ignoring stale sidecar {path.name}: {reason}")
+    return None
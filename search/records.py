@@ -0,0 +1,348 @@
+"""
+search/records.py
+
+id → tool record lookups for the index.
+
+Retrieval backends only return candidate ids and distances; everything
+else a search result needs (tool fields for the final answer, document text
+for the reranker) is resolved through `ToolRecords`.
+
+Records come from structured Chroma metadata (tool_id / name / description /
+git_link) when the index was published with it, and otherwise from a single
+parse of each document's "ID: / Name: / Description: / Git Link:" lines.
+
+They are stored in memory-mapped record tables, so lookups cost a binary
+search and a few page reads rather than a resident copy of the catalog.
+Layout of a record table directory:
+    strings.bin   — UTF-8 text of every cell, back to back
+    ends.npy      — int64, end offset of each cell (rows × columns, row-major)
+    nulls.npy     — bool, (rows, columns), cells that hold None
+    hashes.npy    — uint64, sorted record-id hashes
+    rows.npy      — int64, row for each entry of hashes.npy
+    manifest.json — row count, whether document text is stored
+
+Matrix exports, shards and quantised codes carry their own table in a
+`records/` subdirectory, which is used in place (one table per shard).
+Chroma indexes get a fields-only table in `<persist_dir>/tool_records/`,
+rebuilt when the index version changes; their document text stays in
+Chroma and is fetched for rerank candidates only.
+"""
+
+import hashlib
+import json
+import shutil
+from array import array
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .cache import index_version
+from .doctokens import _text_hash
+
+
+RECORDS_DIR = "records"
+TOOL_RECORDS_DIR = "tool_records"
+
+# Chroma metadata key → result field
+METADATA_FIELDS = {
+    "tool_id":     "tool_id",
+    "name":        "tool_name",
+    "description": "tool_description",
+    "git_link":    "tool_git_link",
+}
+
+# Document line prefix → result field
+DOCUMENT_FIELDS = {
+    "ID:":          "tool_id",
+    "Name:":        "tool_name",
+    "Description:": "tool_description",
+    "Git Link:":    "tool_git_link",
+}
+
+EMPTY_FIELDS = {field: None for field in DOCUMENT_FIELDS.values()}
+
+COLUMNS = ("id", *EMPTY_FIELDS, "document")
+DOCUMENT_COLUMN = COLUMNS.index("document")
+GIT_LINK_COLUMN = COLUMNS.index("tool_git_link")
+
+
+def parse_chunk(chunk_text: str) -> dict:
+    """Extract tool fields from a legacy plain-text index document."""
+    result = dict(EMPTY_FIELDS)
+
+    for line in chunk_text.split("\n"):
+        for prefix, field in DOCUMENT_FIELDS.items():
+            if line.startswith(prefix):
+                result[field] = line[len(prefix):].strip()
+                break
+
+    return result
+
+
+def record_from(document: Optional[str], metadata: Optional[dict]) -> dict:
+    """Build one record, preferring structured metadata over document text."""
+    if metadata and all(key in metadata for key in METADATA_FIELDS):
+        fields = {
+            field: (str(metadata[key]) if metadata[key] is not None else None)
+            for key, field in METADATA_FIELDS.items()
+        }
+    else:
+        fields = parse_chunk(document or "")
+
+    return {**fields, "document": document or ""}
+
+
+# ------------------------------------------------------------------
+# Record tables
+# ------------------------------------------------------------------
+
+class RecordWriter:
+    """
+    Streams (id, document, metadata) records into a table directory.
+    Only offsets are kept in memory; call close() to finish the table.
+    """
+
+    def __init__(self, directory: Path, documents: bool = True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.documents = documents
+        self._strings = open(self.directory / "strings.bin", "wb")
+        self._offset = 0
+        self._ends = array("q")
+        self._nulls = bytearray()
+        self._hashes = array("Q")
+
+    def add(self, record_id, document: Optional[str], metadata: Optional[dict] = None):
+        record = record_from(document, metadata)
+        values = [str(record_id), *(record[field] for field in EMPTY_FIELDS)]
+        values.append(record["document"] if self.documents else None)
+
+        for value in values:
+            if value is not None:
+                data = value.encode("utf-8")
+                self._strings.write(data)
+                self._offset += len(data)
+            self._ends.append(self._offset)
+            self._nulls.append(value is None)
+        self._hashes.append(_text_hash(str(record_id)))
+
+    def close(self, manifest: Optional[dict] = None) -> int:
+        """Write the offset arrays and manifest. Returns the row count."""
+        self._strings.close()
+        rows = len(self._hashes)
+        hashes = np.array(self._hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+
+        np.save(self.directory / "ends.npy", np.array(self._ends, dtype=np.int64))
+        np.save(
+            self.directory / "nulls.npy",
+            np.frombuffer(bytes(self._nulls), dtype=np.bool_).reshape(rows, len(COLUMNS)),
+        )
+        np.save(self.directory / "hashes.npy", hashes[order])
+        np.save(self.directory / "rows.npy", order.astype(np.int64))
+        (self.directory / "manifest.json").write_text(
+            json.dumps({**(manifest or {}), "rows": rows, "documents": self.documents}),
+            encoding="utf-8",
+        )
+        return rows
+
+
+class RecordTable:
+    """
+    Read-only, memory-mapped record table.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        self.has_documents = self.manifest.get("documents", True)
+        self.ends = np.load(self.directory / "ends.npy", mmap_mode="r")
+        self.nulls = np.load(self.directory / "nulls.npy", mmap_mode="r")
+        self.hashes = np.load(self.directory / "hashes.npy", mmap_mode="r")
+        self.rows = np.load(self.directory / "rows.npy", mmap_mode="r")
+
+        # np.memmap refuses empty files
+        strings = self.directory / "strings.bin"
+        self.strings = (
+            np.memmap(strings, dtype=np.uint8, mode="r")
+            if strings.stat().st_size else np.zeros(0, dtype=np.uint8)
+        )
+
+    @classmethod
+    def build(
+        cls,
+        directory: Path,
+        source: Iterable[tuple],
+        documents: bool = True,
+        manifest: Optional[dict] = None,
+    ) -> "RecordTable":
+        """
+        Write a table from `source` — an iterable of (id, document,
+        metadata) — to a temporary sibling and rename it into place.
+        """
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+
+        writer = RecordWriter(tmp_dir, documents=documents)
+        for record_id, document, metadata in source:
+            writer.add(record_id, document, metadata)
+        writer.close(manifest)
+
+        if directory.exists():
+            shutil.rmtree(directory)
+        tmp_dir.rename(directory)
+        return cls(directory)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (Path(directory) / "manifest.json").exists()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def row(self, record_id) -> Optional[int]:
+        """Row of record_id, or None if it is not in this table."""
+        record_id = str(record_id)
+        target = np.uint64(_text_hash(record_id))
+        i = int(np.searchsorted(self.hashes, target))
+        while i < len(self.hashes) and self.hashes[i] == target:
+            row = int(self.rows[i])
+            if self.id(row) == record_id:
+                return row
+            i += 1
+        return None
+
+    def same_ids(self, other: "RecordTable") -> bool:
+        """Whether both tables hold the same record ids in the same rows."""
+        return (
+            len(self) == len(other)
+            and np.array_equal(self.hashes, other.hashes)
+            and np.array_equal(self.rows, other.rows)
+        )
+
+    def _value(self, row: int, column: int) -> Optional[str]:
+        if self.nulls[row, column]:
+            return None
+        cell = row * len(COLUMNS) + column
+        start = int(self.ends[cell - 1]) if cell else 0
+        return self.strings[start:int(self.ends[cell])].tobytes().decode("utf-8")
+
+    def id(self, row: int) -> str:
+        return self._value(row, 0)
+
+    def fields(self, row: int) -> dict:
+        return {field: self._value(row, c) for c, field in enumerate(EMPTY_FIELDS, start=1)}
+
+    def repo(self, row: int) -> Optional[str]:
+        return self._value(row, GIT_LINK_COLUMN)
+
+    def document(self, row: int) -> Optional[str]:
+        """Document text, or None when the table stores fields only."""
+        return self._value(row, DOCUMENT_COLUMN)
+
+    def iter_records(self) -> Iterable[tuple]:
+        """(id, document, None) per row, in row order."""
+        return ((self.id(r), self.document(r), None) for r in range(len(self)))
+
+
+def content_fingerprint(records: Iterable[tuple]) -> str:
+    """
+    Digest of the (id, document) pairs in `records`, independent of order.
+
+    Computed in one streaming pass, so a Chroma collection and a record
+    table holding the same tools fingerprint identically.
+    """
+    total = 0
+    for record_id, document, *_ in records:
+        digest = hashlib.sha256(f"{record_id}\0{document or ''}".encode("utf-8")).digest()
+        total = (total + int.from_bytes(digest[:8], "little")) % (1 << 64)
+    return f"{total:016x}"
+
+
+# ------------------------------------------------------------------
+# Lookups
+# ------------------------------------------------------------------
+
+class ToolRecords:
+    """
+    id → record lookups over the record tables of one index.
+    """
+
+    def __init__(self, tables: list, backend=None):
+        self.tables = tables
+        self.backend = backend      # serves document text for fields-only tables
+
+    @classmethod
+    def load(cls, persist_dir: Path, backend) -> "ToolRecords":
+        """
+        Record lookups for persist_dir. Backends that store record tables
+        (`record_tables()`) are used in place; otherwise a fields-only
+        table is built from `backend.iter_records()` when missing or stale.
+        """
+        persist_dir = Path(persist_dir)
+        if hasattr(backend, "record_tables"):
+            return cls(backend.record_tables(), backend)
+
+        directory = persist_dir / TOOL_RECORDS_DIR
+        version = index_version(persist_dir)
+        if RecordTable.exists(directory):
+            table = RecordTable(directory)
+            if table.manifest.get("index_version") == version:
+                return cls([table], backend)
+
+        table = RecordTable.build(
+            directory, backend.iter_records(), documents=False, manifest={"index_version": version},
+        )
+        return cls([table], backend)
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self.tables)
+
+    def _find(self, record_id) -> tuple:
+        for table in self.tables:
+            row = table.row(record_id)
+            if row is not None:
+                return table, row
+        return None, None
+
+    def fields(self, record_id: str) -> dict:
+        """Result fields (tool_id, tool_name, ...) for record_id."""
+        table, row = self._find(record_id)
+        if table is None:
+            return dict(EMPTY_FIELDS)
+        return table.fields(row)
+
+    def repo(self, record_id: str) -> Optional[str]:
+        """Git link of record_id, used to collapse chunks of one repo."""
+        table, row = self._find(record_id)
+        return None if table is None else table.repo(row)
+
+    def iter_documents(self):
+        """(id, document) for every record, streamed."""
+        if all(table.has_documents for table in self.tables):
+            for table in self.tables:
+                for record_id, document, _ in table.iter_records():
+                    yield record_id, document or ""
+        else:
+            for record_id, document, _ in self.backend.iter_records():
+                yield str(record_id), document or ""
+
+    def documents(self, record_ids: list[str]) -> list[str]:
+        """Rerank text for a list of candidate ids."""
+        documents, missing = [], []
+        for record_id in record_ids:
+            table, row = self._find(record_id)
+            document = table.document(row) if table is not None else ""
+            if document is None:
+                missing.append(str(record_id))
+            documents.append(document)
+
+        # Fields-only table: one backend fetch for every candidate
+        fetched = dict(zip(missing, self.backend.documents(missing))) if missing else {}
+        return [
+            fetched.get(str(record_id), "") if document is None else document
+            for record_id, document in zip(record_ids, documents)
+        ]
@@ -1,15 +1,70 @@
-from sentence_transformers import CrossEncoder
+from .doctokens import predict_pairs
+from .models import model_cache_key, registry
 
 class Reranker:
-    def __init__(self, model_name: str):
-        self.model = CrossEncoder(model_name)
+    def __init__(self, model_name: str, cache=None, device=None, models=None,
+                 inference_backend="torch"):
+        self.model_name = model_name
+        self.cache = cache      # SearchCache instance, optional
+        self.device = device
+        self.models = models or registry
+        self.inference_backend = inference_backend
+        self.doc_tokens = None  # DocumentTokens for this model, optional
+
+    @property
+    def model(self):
+        # Resolved on first use so fully cached runs never touch the model;
+        # the registry shares one instance per (model, device) process-wide
+        return self.models.cross_encoder(self.model_name, self.device, self.inference_backend)
 
     def rank(self, query: str, documents: list[str]):
-        if not documents:
-            return None, None
+        return self.rank_batch([query], [documents])[0]
+
+    def rank_batch(self, queries: list[str], documents: list[list[str]]):
+        """
+        Return the best (document, score) per query, in input order.
+        """
+        best = []
+        for docs, scores in zip(documents, self.score_batch(queries, documents)):
+            if not scores:
+                best.append((None, None))
+                continue
+            top = max(range(len(scores)), key=scores.__getitem__)
+            best.append((docs[top], scores[top]))
+        return best
+
+    def score_batch(self, queries: list[str], documents: list[list[str]]) -> list[list[float]]:
+        """
+        Score every (query, document) pair in a single predict call and
+        return one score list per query, aligned with its documents.
+        """
+        pairs = [[query, doc] for query, docs in zip(queries, documents) for doc in docs]
+        scores = self.score_pairs(pairs) if pairs else []
+
+        grouped = []
+        start = 0
+        for docs in documents:
+            grouped.append(scores[start:start + len(docs)])
+            start += len(docs)
+        return grouped
+
+    def score_pairs(self, pairs: list) -> list[float]:
+        """
+        Score (query, document) pairs, serving cached scores where possible
+        and predicting the rest in one batch.
+        """
+        if self.cache is None:
+            return predict_pairs(self.model, pairs, self.doc_tokens)
+
+        cache_key = model_cache_key(self.model_name, self.inference_backend)
+        scores = self.cache.get_scores(cache_key, pairs)
+        missing = [i for i, s in enumerate(scores) if s is None]
 
-        pairs = [[query, doc] for doc in documents]
-        scores = self.model.predict(pairs)
+        if missing:
+            missing_pairs = [pairs[i] for i in missing]
+            predicted = predict_pairs(self.model, missing_pairs, self.doc_tokens)
+            for i, s in zip(missing, predicted):
+                scores[i] = s
+            self.cache.put_scores(cache_key, missing_pairs, predicted)
 
-        best_index = int(scores.argmax())
-        return documents[best_index], float(scores[best_index])
+        return scores
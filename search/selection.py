@@ -0,0 +1,102 @@
+"""
+search/selection.py
+
+Repo-minimising tool selection.
+
+Each query's best candidate may live in a different repo, so a large build
+clones, scans and installs one repo per query. `minimize_repos` treats the
+ranked "candidates" of every result as a set-cover instance: a repo covers
+a query when one of its tools scores within `slack` of that query's best
+score. A greedy cover (most newly covered queries first, ties broken by
+summed score) followed by a redundancy pass picks a small set of repos,
+and each query then takes its best tool among the chosen repos.
+
+`slack` is in cross-encoder logits, so selection is only offered when
+every query's candidates are scored by the cross-encoder.
+"""
+
+from typing import Optional
+
+DEFAULT_REPO_SLACK = 1.0
+
+
+def check_score_source(rerank_mode: str, rerank_depth: Optional[int], rerank_margin: Optional[float]):
+    """
+    Raise ValueError unless search scores every query's candidates with
+    the cross-encoder, the unit the repo slack is expressed in.
+    """
+    if rerank_depth == 0:
+        reason = "the search profile ranks by negated dense distance"
+    elif rerank_mode != "cross":
+        reason = f"rerank mode '{rerank_mode}' scores with cosine similarities"
+    elif rerank_margin is not None:
+        reason = "--rerank-margin leaves gated queries with a single scored candidate"
+    else:
+        return
+    raise ValueError(f"--minimize-repos needs cross-encoder scores, but {reason}.")
+
+
+def _eligible(result: dict, slack: float) -> dict:
+    """repo → best candidate for this result within `slack` of its best score."""
+    best = result.get("score")
+    if best is None:
+        return {}
+
+    eligible = {}
+    for candidate in result.get("candidates", []):
+        repo, score = candidate.get("tool_git_link"), candidate.get("score")
+        if not repo or score is None or score < best - slack:
+            continue
+        if repo not in eligible or score > eligible[repo]["score"]:
+            eligible[repo] = candidate
+    return eligible
+
+
+def minimize_repos(results: list[dict], slack: float = DEFAULT_REPO_SLACK) -> list[dict]:
+    """
+    Reassign results so the set of distinct repos is small while every
+    query keeps a tool scoring at least (its best score - slack).
+
+    Results without a scored best candidate are returned unchanged. Each
+    reassigned result keeps its "candidates" list.
+    """
+    options = [_eligible(result, slack) for result in results]
+
+    # repo → queries it can cover, and its summed score over them
+    covers, weight = {}, {}
+    for q, eligible in enumerate(options):
+        for repo, candidate in eligible.items():
+            covers.setdefault(repo, set()).add(q)
+            weight[repo] = weight.get(repo, 0.0) + candidate["score"]
+
+    uncovered = {q for q, eligible in enumerate(options) if eligible}
+    chosen = []
+    while uncovered:
+        repo = max(covers, key=lambda r: (len(covers[r] & uncovered), weight[r]))
+        chosen.append(repo)
+        uncovered -= covers[repo]
+
+    # Drop repos made redundant by later picks, weakest first
+    for repo in sorted(chosen, key=lambda r: weight[r]):
+        others = set().union(*(covers[r] for r in chosen if r != repo))
+        if covers[repo] <= others:
+            chosen.remove(repo)
+
+    selected = []
+    chosen = set(chosen)
+    for result, eligible in zip(results, options):
+        pick: Optional[dict] = max(
+            (c for repo, c in eligible.items() if repo in chosen),
+            key=lambda c: c["score"],
+            default=None,
+        )
+        if pick is None:
+            selected.append(result)
+        else:
+            selected.append({**result, **pick, "query": result["query"]})
+    return selected
+
+
+def repo_count(results: list[dict]) -> int:
+    """Distinct git links across results."""
+    return len({r["tool_git_link"] for r in results if r.get("tool_git_link")})
@@ -1,70 +1,581 @@
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from .backends import open_backend
+from .batching import DEFAULT_BATCH_WINDOW, DEFAULT_MAX_BATCH_SIZE, AsyncBatcher, ThreadBatcher
+from .dedupe import collapse_near_duplicates, dedupe_queries
+from .doctokens import DocumentTokens
+from .encode_pool import DEFAULT_SHARD_SIZE, EncoderPool
+from .federated import FederatedBackend, FederatedDocTokens, FederatedLexical, FederatedRecords
+from .gating import gate_candidates
+from .late_interaction import DocumentTokenEmbeddings, MaxSimReranker
+from .lexical import LexicalIndex, reciprocal_rank_fusion
+from .models import model_cache_key, registry
+from .records import ToolRecords, EMPTY_FIELDS
 from .rerank import Reranker
 
+# Repo-collapsed retrieval stops widening the ANN query at this multiple
+# of the initial fetch
+MAX_OVERFETCH = 8
+
 
 class SemanticSearcher:
-    def __init__(self, persist_dir, encoder_model, cross_encoder_model, top_k=10):
-        self.encoder = SentenceTransformer(encoder_model)
-        self.client = PersistentClient(path=str(persist_dir))
-        self.collection = self.client.get_or_create_collection("tools")
-        self.reranker = Reranker(cross_encoder_model)
+    def __init__(self, persist_dir, encoder_model, cross_encoder_model, top_k=10, cache=None,
+                 backend="chroma", backend_options=None, device=None, models=None,
+                 inference_backend="torch", rerank_margin=None, rerank_depth=None,
+                 rerank_mode="cross", maxsim_model=None,
+                 cascade_model=None, cascade_depth=3, collapse_threshold=None,
+                 hybrid=False, hybrid_depth=None, pretokenized=False, rerank_repos=None,
+                 encode_workers=0, encode_threads=1, encode_shard_size=DEFAULT_SHARD_SIZE,
+                 async_workers=1, thread_batching=False,
+                 batch_window=DEFAULT_BATCH_WINDOW, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self.encoder_model = encoder_model
+        self.device = device
+        self.inference_backend = inference_backend
+        self.models = models or registry      # ModelRegistry, shared by default
+
+        # A list of index directories is searched as one federated index
+        self.persist_dirs = list(persist_dir) if isinstance(persist_dir, (list, tuple)) else [persist_dir]
+        backends = [open_backend(backend, d, **(backend_options or {})) for d in self.persist_dirs]
+        tables = [ToolRecords.load(d, b) for d, b in zip(self.persist_dirs, backends)]
+        if len(backends) == 1:
+            self.backend, self.records = backends[0], tables[0]
+        else:
+            self.backend, self.records = FederatedBackend(backends), FederatedRecords(tables)
+
+        self.cache = cache      # SearchCache instance, optional
+        if rerank_mode == "cross":
+            self.reranker = Reranker(
+                cross_encoder_model,
+                cache=cache,
+                device=device,
+                models=self.models,
+                inference_backend=inference_backend,
+            )
+        elif rerank_mode == "maxsim":
+            # Late interaction over per-token document embeddings built once
+            # per index; defaults to the retrieval encoder
+            self.reranker = MaxSimReranker(
+                maxsim_model or encoder_model,
+                device=device,
+                models=self.models,
+                inference_backend=inference_backend,
+            )
+            if rerank_depth != 0:
+                self.reranker.doc_embeddings = self._federate(FederatedDocTokens, [
+                    DocumentTokenEmbeddings.open(
+                        d, self.reranker.model_name, lambda: self.reranker.model, t.iter_documents(),
+                    )
+                    for d, t in zip(self.persist_dirs, tables)
+                ])
+        else:
+            raise ValueError(
+                f"Unknown rerank mode '{rerank_mode}'. "
+                f"Available modes: cross, maxsim"
+            )
         self.top_k = top_k
+        self.rerank_margin = rerank_margin    # calibrated dense-margin gate, optional
 
-    def batch_search(self, queries):
-        return [self.search(q) for q in queries]
+        # Candidates per query that reach the cross-encoder: None reranks all,
+        # 0 ranks by dense distance alone (no gate, fusion or cascade)
+        self.rerank_depth = rerank_depth
 
-    def search(self, query):
-        # 1️⃣ Embed
-        embedding = self.encoder.encode([query])[0]
-
-        # 2️⃣ Retrieve top-k
-        results = self.collection.query(
-            query_embeddings=[embedding.tolist()],
-            n_results=self.top_k,
-            include=["documents"],
+        # Optional first rerank stage: a small cross-encoder scores every
+        # candidate, only the top `cascade_depth` reach the full model
+        self.cascade = None
+        if cascade_model:
+            self.cascade = Reranker(
+                cascade_model,
+                cache=cache,
+                device=device,
+                models=self.models,
+                inference_backend=inference_backend,
+            )
+        self.cascade_depth = cascade_depth
+
+        # Optional per-model tables of pre-tokenised documents for reranking
+        if pretokenized and rerank_depth != 0:
+            for reranker in (r for r in (self.reranker, self.cascade) if isinstance(r, Reranker)):
+                reranker.doc_tokens = self._federate(FederatedDocTokens, [
+                    DocumentTokens.open(d, reranker.model_name, lambda r=reranker: r.model, t.iter_documents())
+                    for d, t in zip(self.persist_dirs, tables)
+                ])
+
+        # Optional BM25 index fused with dense hits; `hybrid_depth` caps the
+        # fused rerank set (defaults to top_k)
+        self.lexical = None
+        if hybrid:
+            self.lexical = self._federate(FederatedLexical, [
+                LexicalIndex.open(d, t.iter_documents()) for d, t in zip(self.persist_dirs, tables)
+            ])
+        self.hybrid_depth = hybrid_depth or top_k
+
+        # Rerank budget in distinct repos: candidates are collapsed to the
+        # best chunk per git link and the ANN query widened until enough
+        # repos are found
+        self.rerank_repos = rerank_repos
+
+        # Cosine similarity above which queries share one search, optional
+        self.collapse_threshold = collapse_threshold
+
+        # Multi-process encoding for batches larger than one shard; 0 keeps
+        # encoding in-process
+        self.encode_workers = encode_workers
+        self.encode_threads = encode_threads
+        self.encode_shard_size = encode_shard_size
+        self._encoder_pool = None
+
+        # Cumulative per-stage wall time (seconds) and cross-encoder pair counts
+        self.timings = defaultdict(float)
+        self.pair_counts = defaultdict(int)
+        self.query_counts = defaultdict(int)
+
+        # asyncio API: concurrent callers are micro-batched onto a bounded
+        # executor, created on first use
+        self.async_workers = async_workers
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._executor = None
+        self._async_batcher = None
+
+        # Threaded API: with `thread_batching`, concurrent search() callers
+        # share batches through a scheduler thread (same window / size)
+        self.thread_batching = thread_batching
+        self._thread_batcher = None
+
+        # Guards lazy creation of the async executor and encoder pool
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _federate(wrapper, members):
+        return members[0] if len(members) == 1 else wrapper(members)
+
+    @property
+    def encoder(self):
+        # Resolved on first use so fully cached runs never touch the model
+        return self.models.encoder(self.encoder_model, self.device, self.inference_backend)
+
+    def batch_search(self, queries, embeddings=None):
+        """
+        One result per query. `embeddings`, if given, are precomputed and
+        row-aligned with `queries` (see search/query_vectors.py); the
+        encoder is then never loaded.
+        """
+        original = list(queries)
+        if not original:
+            return []
+
+        # 0️⃣ Normalise and fold exact repeats; `positions` maps back to `original`
+        queries, positions = dedupe_queries(original)
+
+        if embeddings is None and self._streams(queries):
+            # Large batches on an encoder pool: search each shard as it is encoded
+            results = self._search_streaming(queries)
+        else:
+            # 1️⃣ Embed all queries in one call, or take each group's first precomputed row
+            t0 = time.perf_counter()
+            if embeddings is None:
+                embeddings = self._encode(queries)
+            else:
+                first = {}
+                for row, p in enumerate(positions):
+                    first.setdefault(p, row)
+                embeddings = np.asarray(embeddings, dtype=np.float32)[[first[p] for p in range(len(queries))]]
+            self.timings["encode"] += time.perf_counter() - t0
+
+            # Near-duplicates: search each cluster once, via its first member
+            if self.collapse_threshold is not None:
+                leaders, owner = collapse_near_duplicates(embeddings, self.collapse_threshold)
+                queries = [queries[i] for i in leaders]
+                embeddings = embeddings[leaders]
+                positions = [owner[p] for p in positions]
+
+            results = self._search_embedded(queries, embeddings)
+
+        self.query_counts["input"] += len(original)
+        self.query_counts["searched"] += len(queries)
+
+        # Map back per query, fanning each group out to its original positions
+        return [
+            {**results[p], "query": query}
+            for query, p in zip(original, positions)
+        ]
+
+    def _search_embedded(self, queries, embeddings):
+        """
+        Retrieval through reranking for already-encoded queries; one
+        result per query.
+        """
+        # 2️⃣ Retrieve top-k ids in one backend query
+        t0 = time.perf_counter()
+        ids_per_query, distances_per_query = self.retrieve(queries, embeddings=embeddings)
+        self.timings["retrieve"] += time.perf_counter() - t0
+        retrieved = ids_per_query
+
+        if self.rerank_depth == 0:
+            # Dense ranking only: score is the negated distance
+            return [
+                self._build_result(query, ids, [-d for d in distances])
+                for query, ids, distances in zip(queries, ids_per_query, distances_per_query)
+            ]
+
+        # Confidence gate: a decisive dense margin shrinks the rerank set
+        gated = [False] * len(queries)
+        if self.rerank_margin is not None:
+            gated_ids = [
+                gate_candidates(ids, distances, self.rerank_margin)
+                for ids, distances in zip(ids_per_query, distances_per_query)
+            ]
+            gated = [len(g) < len(ids) for g, ids in zip(gated_ids, ids_per_query)]
+            ids_per_query = gated_ids
+
+        # Hybrid: fuse BM25 hits into every query the gate left open
+        if self.lexical is not None:
+            t0 = time.perf_counter()
+            ids_per_query = self.fuse(queries, ids_per_query, skip=gated)
+            self.timings["lexical"] += time.perf_counter() - t0
+
+        # Cascade: cheap cross-encoder prunes candidates before the full one
+        if self.cascade is not None:
+            t0 = time.perf_counter()
+            ids_per_query = self.prune(queries, ids_per_query)
+            self.timings["cascade"] += time.perf_counter() - t0
+
+        # Rerank budget: the rest stay in "candidates" unscored
+        if self.rerank_depth is not None:
+            ids_per_query = [ids[:self.rerank_depth] for ids in ids_per_query]
+
+        # 3️⃣ Rerank every (query, candidate) pair in one predict call
+        t0 = time.perf_counter()
+        scores_per_query = self.rerank(queries, ids_per_query)
+        self.timings["rerank"] += time.perf_counter() - t0
+        self.pair_counts["rerank"] += sum(len(ids) for ids in ids_per_query)
+
+        # 4️⃣ Best candidate per query, with the ranked alternates
+        return [
+            self._build_result(query, ids, scores, dense)
+            for query, ids, scores, dense in zip(queries, ids_per_query, scores_per_query, retrieved)
+        ]
+
+    def _streams(self, queries):
+        # Near-duplicate collapsing needs every embedding up front
+        return (
+            self.encode_workers > 0
+            and self.collapse_threshold is None
+            and len(queries) > self.encode_shard_size
         )
 
-        docs = results["documents"][0] if results["documents"] else []
+    def _search_streaming(self, queries):
+        """
+        Encode on the worker pool and run retrieval and reranking for each
+        shard as soon as it arrives. Cached embeddings are searched first.
+        """
+        results = [None] * len(queries)
+
+        def run(rows, embeddings):
+            shard = self._search_embedded([queries[i] for i in rows], embeddings)
+            for i, result in zip(rows, shard):
+                results[i] = result
+
+        cached = {}
+        cache_key = model_cache_key(self.encoder_model, self.inference_backend)
+        if self.cache is not None:
+            cached = self.cache.get_embeddings(cache_key, queries)
+            hit = [i for i, q in enumerate(queries) if q in cached]
+            if hit:
+                run(hit, np.stack([cached[queries[i]] for i in hit]))
+
+        missing = [i for i, q in enumerate(queries) if q not in cached]
+        t0 = time.perf_counter()
+        for start, embeddings in self.encoder_pool().encode_stream([queries[i] for i in missing]):
+            rows = missing[start:start + len(embeddings)]
+            # Time spent waiting on the pool, net of the stages run in between
+            self.timings["encode"] += time.perf_counter() - t0
+            if self.cache is not None:
+                self.cache.put_embeddings(cache_key, dict(zip((queries[i] for i in rows), embeddings)))
+            run(rows, embeddings)
+            t0 = time.perf_counter()
+
+        return results
 
-        # 3️⃣ Rerank
-        best_doc, best_score = self.reranker.rank(query, docs)
+    def encoder_pool(self):
+        """Multi-process encoder pool, started on first use."""
+        with self._lock:
+            if self._encoder_pool is None:
+                if self.inference_backend != "torch":
+                    # Export the model once here rather than racing in every worker
+                    self.encoder
+                self._encoder_pool = EncoderPool(
+                    self.encoder_model,
+                    workers=self.encode_workers,
+                    threads_per_worker=self.encode_threads,
+                    device=self.device,
+                    inference_backend=self.inference_backend,
+                    shard_size=self.encode_shard_size,
+                )
+            return self._encoder_pool
 
-        if not best_doc:
+    def retrieve(self, queries, embeddings=None):
+        """
+        Dense retrieval only: returns (ids, distances) per query, best first.
+        Pass `embeddings` to skip encoding.
+        """
+        if embeddings is None:
+            embeddings = self._encode(queries)
+        if self.rerank_repos:
+            return self._retrieve_repos(embeddings)
+        results = self.backend.query(embeddings, n_results=self.top_k)
+
+        all_ids = results["ids"] or []
+        all_distances = results.get("distances") or []
+        ids_per_query, distances_per_query = [], []
+        for i in range(len(queries)):
+            ids = all_ids[i] if i < len(all_ids) and all_ids[i] else []
+            distances = all_distances[i] if i < len(all_distances) and all_distances[i] else []
+            ids_per_query.append(ids)
+            distances_per_query.append(distances)
+
+        return ids_per_query, distances_per_query
+
+    def _retrieve_repos(self, embeddings):
+        """
+        Retrieval collapsed to one candidate per repo. Queries that come
+        back with fewer than `rerank_repos` distinct repos are re-queried
+        with twice the depth, up to MAX_OVERFETCH times the first fetch.
+        """
+        want = self.rerank_repos
+        total = len(self.records)
+        n_results = min(max(self.top_k, want), total)
+        limit = min(n_results * MAX_OVERFETCH, total)
+
+        ids_per_query = [[] for _ in range(len(embeddings))]
+        distances_per_query = [[] for _ in range(len(embeddings))]
+        pending = list(range(len(embeddings)))
+
+        while pending and n_results > 0:
+            results = self.backend.query(embeddings[pending], n_results=n_results)
+            all_ids = results["ids"] or []
+            all_distances = results.get("distances") or []
+
+            retry = []
+            for row, i in enumerate(pending):
+                ids = all_ids[row] if row < len(all_ids) and all_ids[row] else []
+                distances = all_distances[row] if row < len(all_distances) and all_distances[row] else []
+                ids_per_query[i], distances_per_query[i] = self._collapse_repos(ids, distances, want)
+                if len(ids_per_query[i]) < want and len(ids) >= n_results and n_results < limit:
+                    retry.append(i)
+
+            self.query_counts["overfetch"] += len(retry)
+            pending = retry
+            n_results = min(n_results * 2, limit)
+
+        return ids_per_query, distances_per_query
+
+    def _collapse_repos(self, ids, distances, limit):
+        """Best-ranked chunk per git link, at most `limit` repos."""
+        seen = set()
+        kept_ids, kept_distances = [], []
+        for j, record_id in enumerate(ids):
+            repo = self.records.repo(record_id) or record_id
+            if repo in seen:
+                continue
+            seen.add(repo)
+            kept_ids.append(record_id)
+            if j < len(distances):
+                kept_distances.append(distances[j])
+            if len(kept_ids) == limit:
+                break
+        return kept_ids, kept_distances
+
+    def rerank(self, queries, ids_per_query):
+        """
+        Cross-encoder scores per query, aligned with its candidate ids.
+        Document text is fetched for the candidates only.
+        """
+        return self.reranker.score_batch(queries, self._documents(ids_per_query))
+
+    def _documents(self, ids_per_query):
+        # One lookup for the whole batch, so backends that serve text per
+        # candidate are asked once
+        flat = self.records.documents([i for ids in ids_per_query for i in ids])
+        docs_per_query, start = [], 0
+        for ids in ids_per_query:
+            docs_per_query.append(flat[start:start + len(ids)])
+            start += len(ids)
+        return docs_per_query
+
+    def fuse(self, queries, ids_per_query, skip=None):
+        """
+        Reciprocal-rank fusion of dense and BM25 rankings, truncated to
+        `hybrid_depth` candidates per query. Queries flagged in `skip`
+        keep their dense candidates.
+        """
+        skip = skip or [False] * len(queries)
+        open_queries = [q for q, s in zip(queries, skip) if not s]
+        lexical = iter(self.lexical.search_batch(open_queries, self.top_k))
+
+        fused = []
+        for ids, s in zip(ids_per_query, skip):
+            if s:
+                fused.append(ids)
+            else:
+                ranked = reciprocal_rank_fusion([ids, next(lexical)])
+                if self.rerank_repos:
+                    ranked, _ = self._collapse_repos(ranked, [], self.rerank_repos)
+                fused.append(ranked[:self.hybrid_depth])
+        return fused
+
+    def prune(self, queries, ids_per_query):
+        """
+        First cascade stage: keep the `cascade_depth` candidates per query
+        that the small cross-encoder scores highest, in retrieval order.
+        """
+        scores_per_query = self.cascade.score_batch(queries, self._documents(ids_per_query))
+        self.pair_counts["cascade"] += sum(len(ids) for ids in ids_per_query)
+
+        survivors = []
+        for ids, scores in zip(ids_per_query, scores_per_query):
+            if len(ids) <= self.cascade_depth:
+                survivors.append(ids)
+                continue
+            keep = sorted(
+                sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:self.cascade_depth]
+            )
+            survivors.append([ids[i] for i in keep])
+        return survivors
+
+    def timing_report(self) -> str:
+        """One-line summary of cumulative stage timings and pair counts."""
+        parts = []
+        if self.query_counts["input"]:
+            parts.append(f"queries {self.query_counts['input']} → {self.query_counts['searched']} searched")
+        if self.query_counts["overfetch"]:
+            parts.append(f"{self.query_counts['overfetch']} queries over-fetched")
+        for stage in ("encode", "retrieve", "lexical", "cascade", "rerank"):
+            if stage not in self.timings:
+                continue
+            part = f"{stage} {self.timings[stage]:.3f}s"
+            if stage in self.pair_counts:
+                part += f" ({self.pair_counts[stage]} pairs)"
+            parts.append(part)
+        if self._thread_batcher is not None and self._thread_batcher.stats["batches"]:
+            parts.append(f"scheduler {self._thread_batcher.report()}")
+        return ", ".join(parts)
+
+    def search(self, query):
+        if self.thread_batching:
+            return self.batched_search([query])[0]
+        return self.batch_search([query])[0]
+
+    def batched_search(self, queries):
+        """
+        batch_search() through the shared scheduler: coalesced with
+        queries from concurrent threads into one encode / retrieve / rerank.
+        """
+        with self._lock:
+            if self._thread_batcher is None:
+                self._thread_batcher = ThreadBatcher(
+                    self.batch_search,
+                    window=self.batch_window,
+                    max_batch_size=self.max_batch_size,
+                )
+            batcher = self._thread_batcher
+        return batcher.submit(list(queries))
+
+    async def asearch(self, query):
+        """Coroutine form of search(); batched with concurrent callers."""
+        return (await self._batcher().submit([query]))[0]
+
+    async def abatch_search(self, queries):
+        """Coroutine form of batch_search(); batched with concurrent callers."""
+        return await self._batcher().submit(list(queries))
+
+    def close(self):
+        """
+        Shut down the async executor, scheduler thread, encoder pool and
+        the backend's own threads (federated search), if started.
+        """
+        # Swap the references out under the lock, but wait outside it: a
+        # batch still draining may need the lock (e.g. in encoder_pool())
+        with self._lock:
+            thread_batcher, self._thread_batcher = self._thread_batcher, None
+            executor, self._executor = self._executor, None
+            self._async_batcher = None
+
+        if thread_batcher is not None:
+            thread_batcher.close()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+        # Taken last, after any batch that could still use it has finished
+        with self._lock:
+            encoder_pool, self._encoder_pool = self._encoder_pool, None
+        if encoder_pool is not None:
+            encoder_pool.close()
+
+        if hasattr(self.backend, "close"):
+            self.backend.close()
+
+    def _batcher(self):
+        with self._lock:
+            if self._async_batcher is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.async_workers, thread_name_prefix="toolstorepy-search",
+                )
+                self._async_batcher = AsyncBatcher(
+                    self.batch_search,
+                    self._executor,
+                    window=self.batch_window,
+                    max_batch_size=self.max_batch_size,
+                )
+            return self._async_batcher
+
+    def _encode(self, queries):
+        if self.cache is None:
+            return self.encoder.encode(queries)
+
+        cache_key = model_cache_key(self.encoder_model, self.inference_backend)
+        cached = self.cache.get_embeddings(cache_key, queries)
+        missing = list(dict.fromkeys(q for q in queries if q not in cached))
+
+        if missing:
+            fresh = dict(zip(missing, self.encoder.encode(missing)))
+            self.cache.put_embeddings(cache_key, fresh)
+            cached.update(fresh)
+
+        return np.stack([cached[q] for q in queries])
+
+    def _build_result(self, query, candidate_ids, scores, retrieved=()):
+        """
+        Best candidate's fields plus "candidates": every reranked candidate
+        by descending score, then retrieved candidates that were gated or
+        pruned before reranking (score None), in retrieval order.
+        """
+        ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        candidates = [
+            {**self.records.fields(candidate_ids[i]), "score": scores[i]}
+            for i in ranked
+        ]
+        reranked = set(candidate_ids)
+        candidates += [
+            {**self.records.fields(record_id), "score": None}
+            for record_id in retrieved
+            if record_id not in reranked
+        ]
+
+        if not scores:
             return {
                 "query": query,
-                "tool_id": None,
-                "tool_name": None,
-                "tool_description": None,
-                "tool_git_link": None,
+                **EMPTY_FIELDS,
                 "score": None,
+                "candidates": candidates,
             }
 
-        # 4️⃣ Parse structured fields
-        parsed = self._parse_chunk(best_doc)
-
         return {
             "query": query,
-            **parsed,
-            "score": best_score,
-        }
-
-    def _parse_chunk(self, chunk_text):
-        result = {
-            "tool_id": None,
-            "tool_name": None,
-            "tool_description": None,
-            "tool_git_link": None,
+            **candidates[0],
+            "candidates": candidates,
         }
-
-        for line in chunk_text.split("\n"):
-            if line.startswith("ID:"):
-                result["tool_id"] = line.replace("ID:", "").strip()
-            elif line.startswith("Name:"):
-                result["tool_name"] = line.replace("Name:", "").strip()
-            elif line.startswith("Description:"):
-                result["tool_description"] = line.replace("Description:", "").strip()
-            elif line.startswith("Git Link:"):
-                result["tool_git_link"] = line.replace("Git Link:", "").strip()
-
-        return result
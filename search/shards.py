@@ -0,0 +1,195 @@
+"""
+search/shards.py
+
+Sharded retrieval for indexes larger than memory.
+
+Layout of a sharded index directory:
+    SHARDS.json    — {"num_shards": N, "shards": ["shard-000", ...], ...}
+    shard-000/     — one matrix directory per shard (see search/matrix.py),
+    shard-001/       each with its own manifest.json and record table
+    ...
+
+Shards are opened lazily on first use and kept in a bounded LRU cache, so
+resident memory depends on `max_loaded_shards`, not on total index size.
+Tool fields and document text are read from each shard's memory-mapped
+record table, which never loads the shard matrices.
+Each query batch is scored against every shard in parallel and the
+per-shard top-k lists are merged into one global top-k.
+
+Every batch touches every shard, so the bound has a cost: with more shards
+than `max_loaded_shards`, each batch re-opens (and pages back in) all but
+the shards still resident from the previous batch. Those are scanned
+first, so each shard is loaded at most once per batch. Batch queries
+together, or raise `max_loaded_shards`, when the index fits in memory.
+"""
+
+import heapq
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .cache import index_version
+from .matrix import (
+    MatrixShard,
+    hits_to_results,
+    iter_collection,
+    normalize,
+    open_collection,
+    write_matrix,
+)
+from .records import RECORDS_DIR, RecordTable
+
+
+SHARDS_FILE = "SHARDS.json"
+DEFAULT_LOADED_SHARDS = 4
+
+
+class ShardedBackend:
+    """
+    Exact search over N lazily loaded matrix shards.
+    """
+
+    name = "sharded"
+
+    def __init__(self, persist_dir: Path, max_loaded_shards: int = DEFAULT_LOADED_SHARDS):
+        self.persist_dir = Path(persist_dir)
+        shards_file = self.persist_dir / SHARDS_FILE
+
+        if not shards_file.exists():
+            raise FileNotFoundError(
+                f"{shards_file} not found. Build shards with "
+                f"'toolstorepy index shard' or use another search backend."
+            )
+
+        layout = json.loads(shards_file.read_text(encoding="utf-8"))
+        self.shard_names = layout["shards"]
+
+        if any(not RecordTable.exists(self.persist_dir / name / RECORDS_DIR) for name in self.shard_names):
+            raise FileNotFoundError(
+                f"Shards in {self.persist_dir} predate record tables. Rebuild them with "
+                f"'toolstorepy index shard'."
+            )
+        self.max_loaded_shards = max(1, max_loaded_shards)
+
+        # Workers never outnumber cache slots, so in-flight shards stay
+        # within the configured memory bound.
+        self.workers = max(1, min(os.cpu_count() or 1, self.max_loaded_shards, len(self.shard_names)))
+
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="shard")
+
+    # --------------------------------------------------
+    # QUERY
+    # --------------------------------------------------
+
+    def query(self, query_embeddings, n_results: int) -> dict:
+        queries = normalize(query_embeddings)
+
+        # Resident shards first, so the LRU does not evict them before use
+        with self._lock:
+            resident = list(self._loaded)
+        order = resident + [name for name in self.shard_names if name not in resident]
+        per_shard = dict(zip(order, self._executor.map(
+            lambda name: self._shard(name).topk(queries, n_results),
+            order,
+        )))
+        per_shard = [per_shard[name] for name in self.shard_names]
+
+        merged = []
+        for qi in range(len(queries)):
+            candidates = (hits[qi] for hits in per_shard)
+            merged.append(heapq.nlargest(
+                n_results,
+                (hit for shard_hits in candidates for hit in shard_hits),
+                key=lambda hit: hit[0],
+            ))
+
+        return hits_to_results(merged)
+
+    def close(self):
+        """Shut down the shard scan threads."""
+        self._executor.shutdown(wait=True)
+
+    def record_tables(self) -> list[RecordTable]:
+        # Side tables only; shard matrices stay unmapped
+        return [RecordTable(self.persist_dir / name / RECORDS_DIR) for name in self.shard_names]
+
+    def iter_records(self):
+        for table in self.record_tables():
+            yield from table.iter_records()
+
+    # --------------------------------------------------
+    # SHARD CACHE
+    # --------------------------------------------------
+
+    def loaded_shards(self) -> list[str]:
+        with self._lock:
+            return list(self._loaded)
+
+    def _shard(self, name: str) -> MatrixShard:
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+
+        shard = MatrixShard(self.persist_dir / name)
+
+        with self._lock:
+            self._loaded[name] = shard
+            self._loaded.move_to_end(name)
+            while len(self._loaded) > self.max_loaded_shards:
+                self._loaded.popitem(last=False)
+
+        return shard
+
+
+# ------------------------------------------------------------------
+# Building
+# ------------------------------------------------------------------
+
+def build_shards(persist_dir: Path, num_shards: int, out_dir: Path = None) -> Path:
+    """
+    Split the Chroma collection in persist_dir into num_shards contiguous
+    matrix shards under out_dir (defaults to persist_dir). Rows are
+    streamed page by page, so the full index never has to fit in memory.
+    """
+    persist_dir = Path(persist_dir)
+    out_dir = Path(out_dir or persist_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if num_shards < 1:
+        raise ValueError("num_shards must be at least 1.")
+
+    collection = open_collection(persist_dir)
+    total = collection.count()
+    version = index_version(persist_dir)
+    per_shard = -(-total // num_shards) if total else 0
+
+    names = []
+    for i in range(num_shards):
+        start = i * per_shard
+        stop = min(start + per_shard, total)
+        name = f"shard-{i:03d}"
+        write_matrix(
+            out_dir / name,
+            iter_collection(collection, start, stop) if stop > start else [],
+            total=max(stop - start, 0),
+            manifest={"index_version": version, "shard": i, "offset": start},
+        )
+        names.append(name)
+
+    (out_dir / SHARDS_FILE).write_text(
+        json.dumps({
+            "index_version": version,
+            "num_shards": num_shards,
+            "count": total,
+            "shards": names,
+        }, indent=2),
+        encoding="utf-8",
+    )
+
+    return out_dir
@@ -0,0 +1,104 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE  = THIS_DIR / "eval_set/queries.json"
+INDEX_URL     = "http://127.0.0.1:8080/core-tools-v1.zip"
+INDEX_ROOT    = ROOT_DIR / "toolstorepy_workspace/index_db"
+ENCODER       = "all-MiniLM-L6-v2"
+CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+TOP_K         = 10
+TOLERANCE     = 0.01     # accuracy may drop at most one point
+
+OUT_DIR = THIS_DIR / "eval_set/rerank_gate_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+    from search.gating import calibrate_margin
+    from search.semantic import SemanticSearcher
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — CALIBRATION")
+
+    searcher = SemanticSearcher(
+        persist_dir=db_path,
+        encoder_model=ENCODER,
+        cross_encoder_model=CROSS_ENCODER,
+        top_k=TOP_K,
+    )
+    result = calibrate_margin(searcher, queries, expected, tolerance=TOLERANCE)
+
+    step("📏", f"Baseline accuracy : {result['baseline_accuracy'] * 100:.2f}%")
+    step("📏", f"Chosen threshold  : {result['threshold']}")
+    step("📏", f"Gated accuracy    : {result['accuracy'] * 100:.2f}%  (tolerance {TOLERANCE * 100:.1f} pt)")
+    step("📏", f"Queries gated     : {result['gated_fraction'] * 100:.2f}%")
+    step("📏", f"Rerank pairs saved: {result['pairs_saved_fraction'] * 100:.2f}%")
+
+    with open(OUT_DIR / "1_margin_sweep.csv", "w", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=["threshold", "accuracy", "gated_fraction", "pairs_saved_fraction"],
+        )
+        writer.writeheader()
+        writer.writerows(result["sweep"])
+
+    if result["threshold"] is not None:
+        done(f"Use: toolstorepy build ... --rerank-margin {result['threshold']:.6f}")
+    else:
+        done("No threshold keeps accuracy within tolerance; leave gating off.")
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,7 @@ ENCODER       = "all-MiniLM-L6-v2"
 CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 ENCODE_BATCH  = 512
 RERANK_BATCH  = 256
+PRETOKENIZED  = False     # rerank from pre-tokenised index documents
 
 OUT_DIR = THIS_DIR / "eval_set/retrieval_eval"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -199,7 +200,7 @@ def parse_chunk(chunk_text):
 # -------------------------------------------------------
 
 def run_variant(variant_name, perturb_fn, queries_sets, encoder,
-                reranker, collection, device, rng, v_idx, v_total):
+                reranker, collection, device, rng, v_idx, v_total, doc_tokens=None):
 
     rng_copy = random.Random(RANDOM_SEED)
 
@@ -254,11 +255,15 @@ def run_variant(variant_name, perturb_fn, queries_sets, encoder,
     # -- rerank --
     step("🏆", f"[{v_idx}/{v_total}] Reranking  ({variant_name})")
     t0 = time.perf_counter()
-    all_scores = reranker.predict(
-        all_pairs,
-        batch_size=RERANK_BATCH,
-        show_progress_bar=True,
-    )
+    if doc_tokens is not None:
+        from search.doctokens import predict_pairs
+        all_scores = predict_pairs(reranker, all_pairs, doc_tokens, batch_size=RERANK_BATCH)
+    else:
+        all_scores = reranker.predict(
+            all_pairs,
+            batch_size=RERANK_BATCH,
+            show_progress_bar=True,
+        )
     substep(f"Scored {len(all_scores):,} pairs  ({time.perf_counter()-t0:.2f}s)")
 
     # -- group scores --
@@ -417,6 +422,19 @@ def main():
     collection = chroma.get_or_create_collection("tools")
     done(f"ChromaDB ready  ({time.perf_counter()-t0:.2f}s)")
 
+    doc_tokens = None
+    if PRETOKENIZED:
+        from search.doctokens import DocumentTokens
+
+        step("✂️ ", "Loading pre-tokenised documents...")
+        t0 = time.perf_counter()
+        stored = collection.get(include=["documents"])
+        doc_tokens = DocumentTokens.open(
+            db_path, CROSS_ENCODER, lambda: reranker,
+            zip(stored["ids"], stored["documents"]),
+        )
+        done(f"Document tokens ready  ({time.perf_counter()-t0:.2f}s)")
+
     # -------------------------------------------------------
     # STAGE 3 — DATA
     # -------------------------------------------------------
@@ -452,7 +470,7 @@ def main():
         results, subset_sizes = run_variant(
             variant_name, perturb_fn, queries_sets,
             encoder, reranker, collection, device,
-            rng, v_idx, v_total,
+            rng, v_idx, v_total, doc_tokens=doc_tokens,
         )
 
         all_variant_results[variant_name] = results
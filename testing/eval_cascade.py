@@ -0,0 +1,147 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE  = THIS_DIR / "eval_set/queries.json"
+INDEX_URL     = "http://127.0.0.1:8080/core-tools-v1.zip"
+INDEX_ROOT    = ROOT_DIR / "toolstorepy_workspace/index_db"
+ENCODER       = "all-MiniLM-L6-v2"
+CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+CASCADE_MODEL = "cross-encoder/ms-marco-TinyBERT-L-2-v2"
+CASCADE_DEPTHS = (1, 2, 3, 5)
+TOP_K         = 10
+
+OUT_DIR = THIS_DIR / "eval_set/cascade_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# RUN ONE CONFIGURATION
+# -------------------------------------------------------
+
+def run_config(label, db_path, queries, expected, cascade_model=None, cascade_depth=3):
+    from search.semantic import SemanticSearcher
+
+    searcher = SemanticSearcher(
+        persist_dir=db_path,
+        encoder_model=ENCODER,
+        cross_encoder_model=CROSS_ENCODER,
+        top_k=TOP_K,
+        cascade_model=cascade_model,
+        cascade_depth=cascade_depth,
+    )
+
+    # Warm the models so load time does not count as stage time
+    searcher.encoder
+    searcher.reranker.model
+    if searcher.cascade is not None:
+        searcher.cascade.model
+
+    t0 = time.perf_counter()
+    results = searcher.batch_search(queries)
+    wall = time.perf_counter() - t0
+
+    picks = [r["tool_git_link"] for r in results]
+    hits  = sum(int(p == e) for p, e in zip(picks, expected))
+
+    return {
+        "config":          label,
+        "accuracy_pct":    round(hits / len(queries) * 100, 4),
+        "retrieve_s":      round(searcher.timings["retrieve"], 4),
+        "cascade_s":       round(searcher.timings["cascade"], 4),
+        "cascade_pairs":   searcher.pair_counts["cascade"],
+        "rerank_s":        round(searcher.timings["rerank"], 4),
+        "rerank_pairs":    searcher.pair_counts["rerank"],
+        "total_s":         round(wall, 4),
+    }, picks
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — CONFIGURATIONS")
+
+    rows = []
+    base_row, base_picks = run_config("single-stage", db_path, queries, expected)
+    rows.append(base_row)
+    base_hits = [int(p == e) for p, e in zip(base_picks, expected)]
+
+    for depth in CASCADE_DEPTHS:
+        row, picks = run_config(
+            f"cascade@{depth}", db_path, queries, expected,
+            cascade_model=CASCADE_MODEL, cascade_depth=depth,
+        )
+        hits = [int(p == e) for p, e in zip(picks, expected)]
+        row["hits_gained"] = sum(1 for b, h in zip(base_hits, hits) if h and not b)
+        row["hits_lost"]   = sum(1 for b, h in zip(base_hits, hits) if b and not h)
+        rows.append(row)
+
+    base_row["hits_gained"] = 0
+    base_row["hits_lost"]   = 0
+
+    for row in rows:
+        step("📈", f"{row['config']:<14}  acc={row['accuracy_pct']:>7}%  "
+                  f"Δacc={row['accuracy_pct'] - base_row['accuracy_pct']:>+7.2f}  "
+                  f"cascade={row['cascade_s']}s/{row['cascade_pairs']}p  "
+                  f"rerank={row['rerank_s']}s/{row['rerank_pairs']}p  "
+                  f"+{row['hits_gained']}/-{row['hits_lost']}")
+
+    with open(OUT_DIR / "1_cascade_stages.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
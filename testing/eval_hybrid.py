@@ -0,0 +1,131 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE  = THIS_DIR / "eval_set/queries.json"
+INDEX_URL     = "http://127.0.0.1:8080/core-tools-v1.zip"
+INDEX_ROOT    = ROOT_DIR / "toolstorepy_workspace/index_db"
+ENCODER       = "all-MiniLM-L6-v2"
+CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+DEPTHS        = (1, 3, 5, 10)
+TOP_K         = 10
+
+OUT_DIR = THIS_DIR / "eval_set/hybrid_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# CANDIDATE RECALL
+# -------------------------------------------------------
+
+def recall_at(searcher, ids_per_query, expected, depth):
+    """Fraction of queries whose expected git link is among the first `depth` candidates."""
+    hits = 0
+    for ids, link in zip(ids_per_query, expected):
+        links = {searcher.records.fields(i)["tool_git_link"] for i in ids[:depth]}
+        hits += int(link in links)
+    return round(hits / len(expected) * 100, 4)
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+    from search.semantic import SemanticSearcher
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — BM25 INDEX")
+
+    t0 = time.perf_counter()
+    searcher = SemanticSearcher(
+        persist_dir=db_path,
+        encoder_model=ENCODER,
+        cross_encoder_model=CROSS_ENCODER,
+        top_k=TOP_K,
+        hybrid=True,
+    )
+    done(f"BM25 ready in {time.perf_counter() - t0:.2f}s  ({searcher.lexical.doc_count:,} docs)")
+
+    section("STAGE 2 — CANDIDATE RECALL")
+
+    dense_ids, _ = searcher.retrieve(queries)
+    fused_ids    = searcher.fuse(queries, dense_ids)
+
+    rows = []
+    for depth in DEPTHS:
+        row = {
+            "depth":        depth,
+            "dense_recall": recall_at(searcher, dense_ids, expected, depth),
+            "fused_recall": recall_at(searcher, fused_ids, expected, depth),
+        }
+        rows.append(row)
+        step("📈", f"@{depth:<3}  dense={row['dense_recall']:>7}%  fused={row['fused_recall']:>7}%")
+
+    section("STAGE 3 — END TO END")
+
+    for depth in DEPTHS:
+        searcher.hybrid_depth = depth
+        searcher.pair_counts.clear()
+        results = searcher.batch_search(queries)
+        hits = sum(int(r["tool_git_link"] == e) for r, e in zip(results, expected))
+        row = next(r for r in rows if r["depth"] == depth)
+        row["accuracy_pct"] = round(hits / len(queries) * 100, 4)
+        row["rerank_pairs"] = searcher.pair_counts["rerank"]
+        step("🎯", f"@{depth:<3}  acc={row['accuracy_pct']:>7}%  pairs={row['rerank_pairs']}")
+
+    with open(OUT_DIR / "1_hybrid_recall.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
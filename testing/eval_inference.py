@@ -0,0 +1,166 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE  = THIS_DIR / "eval_set/queries.json"
+INDEX_URL     = "http://127.0.0.1:8080/core-tools-v1.zip"
+INDEX_ROOT    = ROOT_DIR / "toolstorepy_workspace/index_db"
+ENCODER       = "all-MiniLM-L6-v2"
+CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+BACKENDS      = ("torch", "onnx-int8")
+TOP_K         = 10
+REPEATS       = 3
+
+OUT_DIR = THIS_DIR / "eval_set/inference_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# TIMING
+# -------------------------------------------------------
+
+def best_of(fn, repeats=REPEATS):
+    """Run fn `repeats` times, return (result, best wall time in seconds)."""
+    best, result = None, None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+# -------------------------------------------------------
+# RUN ONE BACKEND
+# -------------------------------------------------------
+
+def run_backend(backend_name, db_path, queries, expected):
+    from search.semantic import SemanticSearcher
+
+    searcher = SemanticSearcher(
+        persist_dir=db_path,
+        encoder_model=ENCODER,
+        cross_encoder_model=CROSS_ENCODER,
+        top_k=TOP_K,
+        inference_backend=backend_name,
+    )
+
+    t0 = time.perf_counter()
+    searcher.encoder
+    searcher.reranker.model
+    load_s = time.perf_counter() - t0
+
+    embeddings, encode_s = best_of(lambda: searcher.encoder.encode(queries))
+
+    ids = searcher.backend.query(embeddings, n_results=TOP_K)["ids"]
+    docs = [searcher.records.documents(i) for i in ids]
+    pair_count = sum(len(d) for d in docs)
+
+    scores, rerank_s = best_of(lambda: searcher.reranker.score_batch(queries, docs))
+
+    picked = []
+    for cand, s in zip(ids, scores):
+        if not s:
+            picked.append(None)
+            continue
+        best = max(range(len(s)), key=s.__getitem__)
+        picked.append(searcher.records.fields(cand[best])["tool_git_link"])
+
+    hits = sum(int(p == e) for p, e in zip(picked, expected))
+
+    return {
+        "backend":            backend_name,
+        "load_s":             round(load_s, 4),
+        "encode_ms_per_q":    round(encode_s * 1000 / len(queries), 4),
+        "rerank_ms_per_pair": round(rerank_s * 1000 / max(pair_count, 1), 4),
+        "accuracy_pct":       round(hits / len(queries) * 100, 4),
+    }, picked
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — BACKENDS")
+
+    rows, picks = [], {}
+    for backend_name in BACKENDS:
+        step("🧠", f"Running {backend_name}...")
+        row, picked = run_backend(backend_name, db_path, queries, expected)
+        rows.append(row)
+        picks[backend_name] = picked
+        done(f"{backend_name:<10}  acc={row['accuracy_pct']}%  "
+             f"encode={row['encode_ms_per_q']} ms/q  rerank={row['rerank_ms_per_pair']} ms/pair")
+
+    section("STAGE 2 — DELTA vs TORCH")
+
+    base = rows[0]
+    for row in rows:
+        agree = sum(
+            int(a == b) for a, b in zip(picks[base["backend"]], picks[row["backend"]])
+        )
+        row["agreement_pct"]     = round(agree / len(queries) * 100, 4)
+        row["accuracy_delta"]    = round(row["accuracy_pct"] - base["accuracy_pct"], 4)
+        row["encode_speedup_x"]  = round(base["encode_ms_per_q"] / row["encode_ms_per_q"], 3) if row["encode_ms_per_q"] else None
+        row["rerank_speedup_x"]  = round(base["rerank_ms_per_pair"] / row["rerank_ms_per_pair"], 3) if row["rerank_ms_per_pair"] else None
+        step("📈", f"{row['backend']:<10}  Δacc={row['accuracy_delta']:>+8}  "
+                  f"agree={row['agreement_pct']}%  "
+                  f"encode×{row['encode_speedup_x']}  rerank×{row['rerank_speedup_x']}")
+
+    with open(OUT_DIR / "1_backend_latency_accuracy.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE  = THIS_DIR / "eval_set/queries.json"
+INDEX_URL     = "http://127.0.0.1:8080/core-tools-v1.zip"
+INDEX_ROOT    = ROOT_DIR / "toolstorepy_workspace/index_db"
+
+ENCODER_MODEL = "all-MiniLM-L6-v2"
+CROSS_MODEL   = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+MAXSIM_MODEL  = ENCODER_MODEL
+DEVICE        = "cpu"
+
+OUT_DIR = THIS_DIR / "eval_set/late_interaction_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# RUN ONE RERANK MODE
+# -------------------------------------------------------
+
+def run_mode(mode, db_path, queries, expected):
+    from search.semantic import SemanticSearcher
+
+    searcher = SemanticSearcher(
+        persist_dir=db_path,
+        encoder_model=ENCODER_MODEL,
+        cross_encoder_model=CROSS_MODEL,
+        device=DEVICE,
+        rerank_mode=mode,
+        maxsim_model=MAXSIM_MODEL,
+    )
+
+    # Warm the models so load time does not count as search time
+    searcher.encoder
+    searcher.reranker.model
+
+    t0 = time.perf_counter()
+    results = searcher.batch_search(queries)
+    wall = time.perf_counter() - t0
+
+    top1 = sum(int(r["tool_git_link"] == e) for r, e in zip(results, expected))
+
+    return {
+        "rerank_mode":   mode,
+        "model":         MAXSIM_MODEL if mode == "maxsim" else CROSS_MODEL,
+        "accuracy_pct":  round(top1 / len(queries) * 100, 4),
+        "rerank_s":      round(searcher.timings.get("rerank", 0.0), 3),
+        "ms_per_query":  round(wall / len(queries) * 1000, 3),
+        "queries":       len(queries),
+    }
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — TOKEN EMBEDDING TABLE")
+
+    from search.backends import open_backend
+    from search.late_interaction import DocumentTokenEmbeddings
+    from search.models import registry
+    from search.records import ToolRecords
+
+    records = ToolRecords.load(db_path, open_backend("chroma", db_path))
+    t0 = time.perf_counter()
+    table = DocumentTokenEmbeddings.open(
+        db_path, MAXSIM_MODEL, lambda: registry.encoder(MAXSIM_MODEL, DEVICE),
+        records.iter_documents(),
+    )
+    build_s = time.perf_counter() - t0
+    table_mb = sum(p.stat().st_size for p in table.directory.iterdir()) / 1e6
+    done(f"{table.manifest['rows']:,} docs, {table.manifest['tokens']:,} tokens  "
+         f"({table_mb:.1f} MB)  in {build_s:.2f}s")
+
+    section("STAGE 2 — CROSS-ENCODER vs MAXSIM")
+
+    rows = []
+    for mode in ("cross", "maxsim"):
+        row = run_mode(mode, db_path, queries, expected)
+        row["table_build_s"] = round(build_s, 3) if mode == "maxsim" else 0.0
+        row["table_mb"]      = round(table_mb, 3) if mode == "maxsim" else 0.0
+        rows.append(row)
+        step("📈", f"{row['rerank_mode']:<7}  top-1={row['accuracy_pct']:>7}%  "
+                  f"rerank={row['rerank_s']:>8}s  {row['ms_per_query']:>8} ms/query")
+
+    with open(OUT_DIR / "1_rerank_modes.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE = THIS_DIR / "eval_set/queries.json"
+INDEX_URL    = "http://127.0.0.1:8080/core-tools-v1.zip"
+WORKSPACE    = ROOT_DIR / "toolstorepy_workspace"
+INDEX_ROOT   = WORKSPACE / "index_db"
+
+OUT_DIR = THIS_DIR / "eval_set/profile_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# RUN ONE PROFILE
+# -------------------------------------------------------
+
+def run_profile(name, db_path, queries, expected):
+    from search.profiles import get_profile, profile_settings
+    from search.semantic import SemanticSearcher
+
+    profile  = get_profile(name)
+    settings = profile_settings(profile, [str(db_path)])
+    searcher = SemanticSearcher(persist_dir=db_path, **settings)
+
+    # Warm the models so load time does not count as search time
+    searcher.encoder
+    if profile.rerank_depth != 0:
+        searcher.reranker.model
+
+    t0 = time.perf_counter()
+    results = searcher.batch_search(queries)
+    wall = time.perf_counter() - t0
+
+    top1   = sum(int(r["tool_git_link"] == e) for r, e in zip(results, expected))
+    recall = sum(
+        int(any(c["tool_git_link"] == e for c in r["candidates"][:profile.top_k]))
+        for r, e in zip(results, expected)
+    )
+
+    return {
+        "profile":       name,
+        "encoder":       settings["encoder_model"],
+        "tier":          settings["backend_options"].get("collection", "main"),
+        "top_k":         profile.top_k,
+        "rerank_depth":  "all" if profile.rerank_depth is None else profile.rerank_depth,
+        "search_ef":     profile.search_ef or "default",
+        "recall_at_k":   round(recall / len(queries) * 100, 4),
+        "accuracy_pct":  round(top1 / len(queries) * 100, 4),
+        "ms_per_query":  round(wall / len(queries) * 1000, 3),
+        "queries":       len(queries),
+    }
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+    from search.profiles import SEARCH_PROFILES, save_measurements
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — PROFILES")
+
+    rows = []
+    for name in SEARCH_PROFILES:
+        row = run_profile(name, db_path, queries, expected)
+        rows.append(row)
+        step("📈", f"{row['profile']:<9}  recall@{row['top_k']}={row['recall_at_k']:>7}%  "
+                  f"top-1={row['accuracy_pct']:>7}%  {row['ms_per_query']:>8} ms/query  "
+                  f"tier={row['tier']}")
+
+    with open(OUT_DIR / "1_profiles.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # Read back by `toolstorepy profiles` and logged by build()
+    save_measurements(WORKSPACE, {row["profile"]: row for row in rows})
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+    done(f"Measurements    : {WORKSPACE}/profile_recall.json")
+
+
+if __name__ == "__main__":
+    main()
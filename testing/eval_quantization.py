@@ -0,0 +1,121 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------------
+
+THIS_DIR = Path(__file__).parent
+ROOT_DIR = THIS_DIR.parent
+
+sys.path.insert(0, str(ROOT_DIR))
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+
+QUERIES_FILE = THIS_DIR / "eval_set/queries.json"
+INDEX_URL    = "http://127.0.0.1:8080/core-tools-v1.zip"
+INDEX_ROOT   = ROOT_DIR / "toolstorepy_workspace/index_db"
+ENCODER      = "all-MiniLM-L6-v2"
+ENCODE_BATCH = 512
+TOP_K        = 10
+SCHEMES      = ("int8", "pq")
+
+OUT_DIR = THIS_DIR / "eval_set/quantization_eval"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# -------------------------------------------------------
+# LOGGING HELPERS
+# -------------------------------------------------------
+
+def section(title: str):
+    width = 54
+    print("\n" + "=" * width)
+    print(f"  {title}")
+    print("=" * width)
+
+def step(icon: str, msg: str):
+    print(f"  {icon}  {msg}")
+
+def done(msg: str):
+    print(f"  ✔  {msg}")
+
+# -------------------------------------------------------
+# TOP-1 ACCURACY
+# -------------------------------------------------------
+
+def top1_accuracy(backend, records, embeddings, expected):
+    ids  = backend.query(embeddings, 1)["ids"]
+    hits = sum(
+        int(bool(i) and records.fields(i[0])["tool_git_link"] == e)
+        for i, e in zip(ids, expected)
+    )
+    return round(hits / len(expected) * 100, 4) if expected else 0.0
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+
+def main():
+
+    wall_start = time.perf_counter()
+
+    section("STAGE 0 — INDEX + QUERIES")
+
+    from index.downloader import IndexDownloader
+    from search.backends import open_backend
+    from search.quantize import compare_recall
+    from search.records import ToolRecords
+    from sentence_transformers import SentenceTransformer
+
+    downloader = IndexDownloader(INDEX_ROOT)
+    db_path    = downloader.download(INDEX_URL, force_refresh=False)
+    done(f"Index ready  →  {db_path}")
+
+    with open(QUERIES_FILE) as f:
+        items = json.load(f)
+    queries  = [item["query"] for item in items]
+    expected = [item["git_link"] for item in items]
+    done(f"Loaded {len(queries):,} queries")
+
+    section("STAGE 1 — ENCODING")
+
+    t0 = time.perf_counter()
+    encoder    = SentenceTransformer(ENCODER)
+    embeddings = encoder.encode(queries, batch_size=ENCODE_BATCH, convert_to_numpy=True)
+    done(f"Encoded {len(embeddings):,} queries  ({time.perf_counter()-t0:.2f}s)")
+
+    section("STAGE 2 — RECALL vs FLOAT32")
+
+    report  = compare_recall(db_path, embeddings, k=TOP_K, schemes=SCHEMES)
+    records = ToolRecords.load(db_path, open_backend("numpy", db_path))
+
+    for row in report:
+        fmt = row["format"]
+        if fmt == "float32":
+            backend = open_backend("numpy", db_path)
+        else:
+            scheme, _, rescore = fmt.partition("+")
+            backend = open_backend(scheme, db_path, rescore=bool(rescore))
+        row["top1_accuracy_pct"] = top1_accuracy(backend, records, embeddings, expected)
+        step("📈", f"{fmt:<15}  recall@{TOP_K}={row['recall_at_k']:<7}  "
+                  f"top1={row['top1_accuracy_pct']:>7}%  "
+                  f"{row['bytes_per_vector']:>5} B/vec  {row['ms_per_query']} ms/q")
+
+    section("STAGE 3 — WRITING OUTPUTS")
+
+    with open(OUT_DIR / "1_recall_vs_float.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(report[0].keys()))
+        writer.writeheader()
+        writer.writerows(report)
+
+    done(f"Total wall time : {time.perf_counter()-wall_start:.2f}s")
+    done(f"Results saved   : {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()